@@ -0,0 +1 @@
+"""MailSense benchmarks."""
@@ -0,0 +1,75 @@
+"""
+MailSense benchmark suite.
+
+    python -m benchmarks run [--size 500] [--seed 0] [--workers 1] [--only stages|e2e|cold_start] [--out results.json]
+    python -m benchmarks compare baseline.json results.json [--threshold 0.15]
+
+`run` generates a seeded synthetic corpus (benchmarks/corpus.py), runs the
+per-stage microbenchmarks, the end-to-end run_batch benchmark and the
+single-email cold-start benchmark against throwaway stores, and prints the
+results as JSON. `compare` exits with status 1 if any benchmark's mean time
+regressed by more than the threshold.
+"""
+import sys
+import json
+import platform
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks import stages, e2e, cold_start
+from benchmarks.corpus import generate
+from benchmarks.compare import compare_files, format_rows
+
+
+def _run(cli) -> int:
+    results = {}
+    if cli.only in (None, "stages"):
+        results.update(stages.run(list(generate(cli.size, cli.seed))))
+    if cli.only in (None, "e2e"):
+        results.update(e2e.run(cli.size, cli.seed, cli.workers))
+    if cli.only in (None, "cold_start"):
+        results.update(cold_start.run(cli.repeats, cli.seed))
+    out = {
+        "meta": {"created_at": datetime.now().isoformat(timespec="seconds"), "size": cli.size, "seed": cli.seed,
+                 "workers": cli.workers, "python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+    }
+    text = json.dumps(out, indent=2)
+    print(text)
+    if cli.out:
+        Path(cli.out).write_text(text, encoding="utf-8")
+    return 0
+
+
+def _compare(cli) -> int:
+    rows = compare_files(cli.baseline, cli.current, cli.threshold)
+    print(format_rows(rows))
+    regressions = [r for r in rows if r["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {cli.threshold * 100:.0f}%")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="MailSense benchmark suite.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="run benchmarks and emit JSON results")
+    run_p.add_argument("--size", type=int, default=500, help="number of synthetic emails")
+    run_p.add_argument("--seed", type=int, default=0)
+    run_p.add_argument("--workers", type=int, default=1, help="workers for the end-to-end run_batch benchmark")
+    run_p.add_argument("--only", choices=["stages", "e2e", "cold_start"], default=None)
+    run_p.add_argument("--repeats", type=int, default=cold_start.DEFAULT_REPEATS,
+                       help="process launches per cold-start benchmark")
+    run_p.add_argument("--out", type=Path, default=None)
+    cmp_p = sub.add_parser("compare", help="compare results against a saved baseline")
+    cmp_p.add_argument("baseline", type=Path)
+    cmp_p.add_argument("current", type=Path)
+    cmp_p.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown as a fraction (default 0.15)")
+    cli = parser.parse_args(argv)
+    return _run(cli) if cli.command == "run" else _compare(cli)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Cold-start benchmark: a fresh `python -m src.agent_main` process handling one
+email, timed from spawn to exit.
+
+Two emails from the seeded corpus are used: one with date-like text (which
+needs dateparser) and one without (which should never import it). Each run
+gets throwaway stores. The on-disk caches under cache/ are warmed by one
+untimed run first, as they would be for any hook that runs repeatedly.
+"""
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List
+
+from benchmarks.harness import ROOT, summarize
+from benchmarks.corpus import generate
+from src.date_extract import find_candidates
+
+DEFAULT_REPEATS = 5
+
+# runs src.agent_main as __main__ with stores, memory and logs in a temp dir
+_DRIVER = """
+import sys, runpy
+from pathlib import Path
+d = Path(sys.argv[1])
+from src.task_store import TaskStore, set_store
+from src.memory import MemoryStore, set_memory_store
+from src.observability import Observer, set_observer
+set_store(TaskStore(d / "task_store", legacy_path=None))
+set_memory_store(MemoryStore(d / "memory.json"))
+set_observer(Observer(d / "agent.log", d / "metrics.json"))
+sys.argv = ["src.agent_main", sys.argv[2]]
+runpy.run_module("src.agent_main", run_name="__main__")
+"""
+
+
+def _pick_emails(seed: int) -> Dict[str, Dict[str, Any]]:
+    picked = {}
+    for e in generate(200, seed):
+        kind = "dated" if find_candidates(f"{e['subject']}\n{e['body']}") else "plain"
+        picked.setdefault(kind, e)
+        if len(picked) == 2:
+            break
+    return picked
+
+
+def _time_runs(email: Dict[str, Any], repeats: int) -> List[float]:
+    times = []
+    with tempfile.TemporaryDirectory(prefix="mailsense-cold-") as d:
+        src = Path(d) / "email.json"
+        src.write_text(json.dumps([email]), encoding="utf-8")
+        for i in range(repeats + 1):
+            run_dir = Path(d) / f"run{i}"
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", _DRIVER, str(run_dir), str(src)], cwd=ROOT, check=True,
+                           stdout=subprocess.DEVNULL)
+            if i:
+                # run 0 only warms the caches
+                times.append(time.perf_counter() - start)
+    return times
+
+
+def run(repeats: int = DEFAULT_REPEATS, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    return {f"cold_start.agent_main.{kind}_email": summarize(_time_runs(email, repeats))
+            for kind, email in sorted(_pick_emails(seed).items())}
@@ -0,0 +1,37 @@
+"""Compare a benchmark result file against a saved baseline and flag regressions."""
+import json
+from pathlib import Path
+from typing import Dict, Any, List
+
+METRIC = "mean_us"
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.15) -> List[Dict[str, Any]]:
+    """Return one row per benchmark present in both files; `regression` is set when
+    the current mean is more than `threshold` (fraction) slower than the baseline."""
+    rows = []
+    base_res, cur_res = baseline.get("results", {}), current.get("results", {})
+    for name in sorted(set(base_res) & set(cur_res)):
+        b, c = base_res[name].get(METRIC), cur_res[name].get(METRIC)
+        if not b or c is None:
+            continue
+        change = (c - b) / b
+        rows.append({"name": name, "baseline": b, "current": c, "change": round(change, 4),
+                     "regression": change > threshold})
+    return rows
+
+
+def compare_files(baseline_path: Path, current_path: Path, threshold: float = 0.15) -> List[Dict[str, Any]]:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(current_path, "r", encoding="utf-8") as f:
+        current = json.load(f)
+    return compare(baseline, current, threshold)
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':40} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        lines.append(f"{r['name']:40} {r['baseline']:>12.2f} {r['current']:>12.2f} {r['change'] * 100:>7.1f}%{flag}")
+    return "\n".join(lines)
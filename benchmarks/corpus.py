@@ -0,0 +1,143 @@
+"""
+Seeded synthetic email corpus generator.
+
+Produces realistic-looking emails in the pipeline's input shape
+({id, subject, body, from, to, received_at}) across the categories the agent
+handles: invoices, scheduling requests, tasks, delegation, newsletters /
+notifications and long reply threads. The same (size, seed) always yields the
+same corpus.
+
+Usage:
+    python -m benchmarks.corpus 100000 --seed 7 -o corpus.jsonl
+"""
+import sys
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, Iterator
+
+NAMES = ["Priya", "Raj", "Anita", "Tom", "Maria", "Chen", "Fatima", "Lukas", "Sara", "Omar",
+         "Kenji", "Elena", "David", "Aisha", "Noah", "Meera", "Jonas", "Lina", "Arjun", "Grace"]
+COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Ltd", "Stark Supplies", "Wayne Traders", "Hooli"]
+DOCS = ["draft", "slides", "report", "budget sheet", "design doc", "contract", "release notes"]
+TOPICS = ["the PR", "Q3 planning", "the launch", "hiring", "the roadmap", "vendor onboarding", "the audit"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+CURRENCIES = ["$", "₹", "€", "£"]
+
+# category -> relative weight in the generated mix
+MIX = {"invoice": 15, "schedule": 20, "task": 20, "delegate": 10, "newsletter": 25, "thread": 10}
+
+
+def _addr(name: str) -> str:
+    return f"{name.lower()}@example.com"
+
+
+def _invoice(rng: random.Random, name: str) -> Dict[str, str]:
+    n = rng.randint(1000, 99999)
+    month, day = rng.choice(MONTHS), rng.randint(1, 28)
+    amount = f"{rng.choice(CURRENCIES)}{rng.randint(20, 5000)}"
+    company = rng.choice(COMPANIES)
+    return {
+        "subject": f"Invoice #{n} - due {month} {day}",
+        "body": f"Dear Arshwin, your invoice #{n} from {company} for {amount} is due on {month} {day}. "
+                f"Please confirm payment. Regards, {name}.",
+    }
+
+
+def _schedule(rng: random.Random, name: str) -> Dict[str, str]:
+    day = rng.choice(WEEKDAYS)
+    hour = rng.randint(1, 5)
+    topic = rng.choice(TOPICS)
+    bodies = [
+        f"Hi Arshwin, can we meet on {day} at {hour}pm to discuss {topic}? — {name}",
+        f"Are you free next {day} morning for a quick call about {topic}? Best, {name}.",
+        f"Hi, could we schedule a meeting {day} {hour}–{hour + 1}pm? If not, later that week works. {name}",
+    ]
+    return {"subject": rng.choice(["Meeting request", "Schedule a call", f"Sync on {topic}"]),
+            "body": rng.choice(bodies)}
+
+
+def _task(rng: random.Random, name: str) -> Dict[str, str]:
+    doc = rng.choice(DOCS)
+    body = rng.choice([
+        f"Can you send the {doc} by {rng.choice(WEEKDAYS)}? Thanks.",
+        f"Please review the {doc} when convenient. Thanks, {name}",
+        f"Kindly share the updated {doc} for {rng.choice(TOPICS)}. This is urgent.",
+    ])
+    return {"subject": rng.choice(["Quick follow-up", f"Request: {doc}", "Action needed"]), "body": body}
+
+
+def _delegate(rng: random.Random, name: str) -> Dict[str, str]:
+    other = rng.choice(NAMES)
+    return {
+        "subject": f"Fwd: {rng.choice(TOPICS)}",
+        "body": f"Hi Arshwin, please forward this to {other} ({_addr(other)}) and delegate the follow-up. "
+                f"cc: {_addr(name)}",
+    }
+
+
+def _newsletter(rng: random.Random, name: str) -> Dict[str, str]:
+    items = rng.sample(["shipped feature X", "started work on Y", "fixed the login bug", "improved docs",
+                        "onboarded two customers", "cleaned up the backlog", "upgraded dependencies"], 3)
+    return {"subject": rng.choice(["Weekly team update", "Newsletter", "Digest"]),
+            "body": f"Team — here are the updates: {items[0]}, {items[1]}, and {items[2]}. Cheers, {name}."}
+
+
+def _thread(rng: random.Random, name: str, base: datetime) -> Dict[str, str]:
+    topic = rng.choice(TOPICS)
+    parts = [f"Following up on {topic} — can you send the {rng.choice(DOCS)} by {rng.choice(WEEKDAYS)}?"]
+    when = base
+    for _ in range(rng.randint(5, 15)):
+        when -= timedelta(hours=rng.randint(1, 30))
+        who = rng.choice(NAMES)
+        quoted = rng.choice([f"Sounds good, I will look at {topic}.", f"Adding {rng.choice(NAMES)} for visibility.",
+                             "Thanks, noted.", f"Can we talk about {topic} next week?"])
+        parts.append(f"On {when.strftime('%a, %d %b %Y %H:%M')}, {who} <{_addr(who)}> wrote:\n> {quoted}")
+    return {"subject": f"Re: {topic}", "body": "\n\n".join(parts)}
+
+
+GENERATORS = {"invoice": _invoice, "schedule": _schedule, "task": _task,
+              "delegate": _delegate, "newsletter": _newsletter}
+
+
+def generate(size: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """Yield `size` synthetic emails, deterministically for a given seed."""
+    rng = random.Random(seed)
+    cats, weights = list(MIX), list(MIX.values())
+    when = datetime(2025, 11, 1, 8, 0)
+    for i in range(size):
+        when += timedelta(minutes=rng.randint(1, 90))
+        name = rng.choice(NAMES)
+        cat = rng.choices(cats, weights)[0]
+        if cat == "thread":
+            email = _thread(rng, name, when)
+        else:
+            email = GENERATORS[cat](rng, name)
+        email.update({"id": i + 1, "from": _addr(name), "to": "you@example.com",
+                      "received_at": when.isoformat() + "+05:30", "category": cat})
+        yield email
+
+
+def write_jsonl(path: Path, size: int, seed: int = 0) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for e in generate(size, seed):
+            f.write(json.dumps(e, ensure_ascii=False) + "\n")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic MailSense email corpus (JSONL).")
+    parser.add_argument("size", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--out", type=Path, default=None, help="output file (default: stdout)")
+    cli = parser.parse_args()
+    if cli.out:
+        write_jsonl(cli.out, cli.size, cli.seed)
+    else:
+        for e in generate(cli.size, cli.seed):
+            sys.stdout.write(json.dumps(e, ensure_ascii=False) + "\n")
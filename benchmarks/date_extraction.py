@@ -0,0 +1,69 @@
+"""
+Benchmark: fast-path date extraction (src/date_extract.py) vs plain dateparser.
+
+Runs both over a corpus (default: data/examples_emails.json), reports warm
+per-email timings and the speedup, and lists any emails where the extracted
+dates differ.
+
+Usage:
+    python -m benchmarks.date_extraction [corpus] [--repeat N] [--json out.json]
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.ingest import iter_emails  # noqa: E402
+from src.date_extract import extract_dates, search_dates_full  # noqa: E402
+
+DATA_PATH = ROOT / "data" / "examples_emails.json"
+
+
+def _texts(source: Path):
+    return [((e.get("subject") or "") + "\n\n" + (e.get("body") or "")).strip() for e in iter_emails(source)]
+
+
+def _time(fn, texts, repeat):
+    # one untimed pass so one-off dateparser initialisation is not counted
+    outs = [fn(t) for t in texts]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for t in texts:
+            fn(t)
+    elapsed = time.perf_counter() - start
+    return outs, elapsed / (repeat * max(1, len(texts)))
+
+
+def run(source: Path = DATA_PATH, repeat: int = 3):
+    texts = _texts(source)
+    base_out, base_t = _time(search_dates_full, texts, repeat)
+    fast_out, fast_t = _time(extract_dates, texts, repeat)
+    mismatches = [
+        {"index": i, "text": texts[i][:80], "dateparser": b, "fast_path": f}
+        for i, (b, f) in enumerate(zip(base_out, fast_out)) if b != f
+    ]
+    return {
+        "corpus": str(source),
+        "emails": len(texts),
+        "dateparser_ms_per_email": round(base_t * 1000, 3),
+        "fast_path_ms_per_email": round(fast_t * 1000, 3),
+        "speedup": round(base_t / fast_t, 1) if fast_t else None,
+        "mismatches": mismatches,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fast-path date extraction against dateparser.")
+    parser.add_argument("corpus", nargs="?", type=Path, default=DATA_PATH)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, default=None, help="also write results to this file")
+    cli = parser.parse_args()
+    res = run(cli.corpus, cli.repeat)
+    print(json.dumps(res, indent=2, ensure_ascii=False))
+    if cli.json:
+        cli.json.write_text(json.dumps(res, indent=2, ensure_ascii=False), encoding="utf-8")
@@ -0,0 +1,21 @@
+"""End-to-end benchmark: agent_main_refined.run_batch over a generated JSONL corpus."""
+import time
+from typing import Dict, Any
+
+from benchmarks.harness import isolated_state
+from benchmarks.corpus import write_jsonl
+from src.agent_main_refined import run_batch
+
+
+def run(size: int, seed: int = 0, workers: int = 1) -> Dict[str, Dict[str, Any]]:
+    with isolated_state() as d:
+        corpus = write_jsonl(d / "corpus.jsonl", size, seed)
+        start = time.perf_counter()
+        run_batch(corpus, workers=workers, report_path=d / "reports.jsonl")
+        total = time.perf_counter() - start
+    return {f"e2e.run_batch.workers{workers}": {
+        "n": size,
+        "total_s": round(total, 6),
+        "mean_us": round(total / size * 1e6, 2) if size else 0.0,
+        "per_sec": round(size / total, 1) if total else None,
+    }}
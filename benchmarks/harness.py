@@ -0,0 +1,65 @@
+"""Shared helpers for the benchmarks: isolated stores and timing statistics."""
+import sys
+import time
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterable
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.task_store import TaskStore, set_store  # noqa: E402
+from src.memory import MemoryStore, set_memory_store  # noqa: E402
+from src.extract_cache import get_extract_cache  # noqa: E402
+
+
+@contextmanager
+def isolated_state():
+    """Point the task store and memory at a temp directory for the duration of a benchmark."""
+    with tempfile.TemporaryDirectory(prefix="mailsense-bench-") as d:
+        d = Path(d)
+        prev_tasks = set_store(TaskStore(d / "task_store", legacy_path=None))
+        prev_mem = set_memory_store(MemoryStore(d / "memory.json"))
+        cache = get_extract_cache()
+        if cache is not None:
+            cache.clear()
+        try:
+            yield d
+        finally:
+            set_store(prev_tasks)
+            set_memory_store(prev_mem)
+
+
+def _pct(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[i]
+
+
+def summarize(times_s) -> Dict[str, Any]:
+    vals = sorted(times_s)
+    total = sum(vals)
+    n = len(vals)
+    return {
+        "n": n,
+        "total_s": round(total, 6),
+        "mean_us": round(total / n * 1e6, 2) if n else 0.0,
+        "p50_us": round(_pct(vals, 0.50) * 1e6, 2),
+        "p95_us": round(_pct(vals, 0.95) * 1e6, 2),
+        "p99_us": round(_pct(vals, 0.99) * 1e6, 2),
+        "per_sec": round(n / total, 1) if total else None,
+    }
+
+
+def measure(fn: Callable[[Any], Any], items: Iterable[Any]) -> Dict[str, Any]:
+    """Call fn on each item, timing every call individually."""
+    clock = time.perf_counter
+    times = []
+    for item in items:
+        t0 = clock()
+        fn(item)
+        times.append(clock() - t0)
+    return summarize(times)
@@ -0,0 +1,308 @@
+"""
+Asynchronous MailSense pipeline.
+
+Stages are connected by bounded asyncio queues, so a slow stage applies
+backpressure upstream instead of letting work pile up in memory:
+
+    ingest -> [q_in] -> extract x N -> [q_plan] -> plan (input order) -> dispatch -> reports
+
+- extract: analyze_email runs off the event loop with `extract_concurrency`
+  requests in flight. By default that is a single worker thread: extraction is
+  CPU-bound, so more threads would not help and the extractor caches stay
+  single-threaded. With --workers it is a process pool.
+- plan: runs in input order on the event loop through
+  agent_main_refined.plan_email, the same memory/contacts/planning path as the
+  serial committer, with runs of emails wrapped in TaskStore.batch().
+- dispatch: each plan's tool call goes through an async ToolRegistry with a
+  concurrency limit per tool. Ordered tools (by default every plain function,
+  i.e. the local tools that write the task store) run inline on the loop and
+  finish before the next email is planned, so duplicate and conflict checks
+  see every earlier email's tasks. Unordered tools (by default coroutine
+  functions: external calendar/task/reply backends) run under a timeout and
+  overlap their I/O with later emails.
+
+With the local tools, the reports and the task store match
+agent_main_refined.run_batch; reports are yielded in input order. Concurrency
+comes from extraction and from unordered tools only.
+
+CLI:
+    python -m src.agent_async [batch_file] [--extract-concurrency 4] [--dispatch-concurrency 16]
+                              [--queue-size 64] [--workers N] [--tool-limit create_task=4]
+                              [--tool-timeout 30] [--report out.jsonl] [--profile-imports]
+"""
+import asyncio
+import argparse
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterable, AsyncIterator, Callable, Optional, List
+
+from src.agent_main_refined import analyze_email, plan_email, build_report, execute_tool_call, DATA_PATH
+from src.tool_dispatch import dispatch_batch_size
+from src.task_store import get_store
+from src.memory import flush_memory
+from src.ingest import iter_emails, JsonlReportWriter
+from src.observability import timer, timed_iter, flush_logs, get_observer, init_worker
+
+DEFAULT_TOOL_LIMIT = 8
+DEFAULT_TOOL_TIMEOUT = 30.0
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class ToolRegistry:
+    """
+    Async tool dispatcher. Tools take (tool_call, source_email) and return a
+    result dict; they may be plain functions or coroutine functions.
+    Coroutine tools are cancelled after `timeout` seconds; plain functions run
+    inline on the loop to completion, so the timeout does not apply to them.
+    Ordered tools complete before the next email is planned (see module doc).
+    """
+
+    def __init__(self, default_limit: int = DEFAULT_TOOL_LIMIT, timeout: Optional[float] = DEFAULT_TOOL_TIMEOUT):
+        self.default_limit = default_limit
+        self.timeout = timeout
+        self._tools: Dict[str, Callable] = {}
+        self._limits: Dict[str, int] = {}
+        self._sems: Dict[str, asyncio.Semaphore] = {}
+        self._ordered: Dict[str, bool] = {}
+
+    def register(self, name: str, fn: Callable, limit: Optional[int] = None, ordered: Optional[bool] = None) -> None:
+        """Register a tool; `ordered` defaults to True for plain functions and False for coroutine functions."""
+        self._tools[name] = fn
+        self._limits[name] = limit or self.default_limit
+        self._ordered[name] = not asyncio.iscoroutinefunction(fn) if ordered is None else ordered
+        self._sems.pop(name, None)
+
+    def ordered(self, name: Optional[str]) -> bool:
+        # unknown tools fail immediately, so they may as well be ordered
+        return self._ordered.get(name, True)
+
+    def set_limit(self, name: str, limit: int) -> None:
+        self._limits[name] = limit
+        self._sems.pop(name, None)
+
+    def _sem(self, name: str) -> asyncio.Semaphore:
+        # created lazily so the semaphore binds to the running loop
+        sem = self._sems.get(name)
+        if sem is None:
+            sem = self._sems[name] = asyncio.Semaphore(self._limits.get(name, self.default_limit))
+        return sem
+
+    async def call(self, tool_call: Dict[str, Any], source_email: Dict[str, Any]) -> Dict[str, Any]:
+        name = tool_call.get("name")
+        fn = self._tools.get(name)
+        if fn is None:
+            return {"status": "error", "message": f"Unknown tool {name}"}
+        async with self._sem(name):
+            if not asyncio.iscoroutinefunction(fn):
+                return fn(tool_call, source_email)
+            try:
+                return await asyncio.wait_for(fn(tool_call, source_email), self.timeout)
+            except asyncio.TimeoutError:
+                return {"status": "error", "message": f"Tool {name} timed out after {self.timeout}s"}
+
+
+def default_registry(limits: Optional[Dict[str, int]] = None, timeout: Optional[float] = DEFAULT_TOOL_TIMEOUT) -> ToolRegistry:
+    """Registry with the local tools from agent_main_refined.execute_tool_call."""
+    reg = ToolRegistry(timeout=timeout)
+    for name in ("create_task", "schedule_event", "compose_reply", "notify_user"):
+        reg.register(name, execute_tool_call, (limits or {}).get(name))
+    return reg
+
+
+def _analyze_remote(email_obj: Dict[str, Any]):
+    # process-pool variant: ship the worker's stage timings back with the result
+    return analyze_email(email_obj), get_observer().drain()
+
+
+async def iter_reports_async(emails: Iterable[Dict[str, Any]], registry: Optional[ToolRegistry] = None,
+                             extract_concurrency: int = 4, dispatch_concurrency: int = 16,
+                             queue_size: int = 64, executor: Optional[Executor] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one report per email, in input order, from the staged async pipeline."""
+    loop = asyncio.get_running_loop()
+    registry = registry or default_registry()
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mailsense-extract")
+    remote = isinstance(executor, ProcessPoolExecutor)
+    q_in: asyncio.Queue = asyncio.Queue(queue_size)
+    q_plan: asyncio.Queue = asyncio.Queue(queue_size)
+    q_out: asyncio.Queue = asyncio.Queue(queue_size)
+    dispatch_slots = asyncio.Semaphore(dispatch_concurrency)
+    inflight: set = set()
+
+    async def produce():
+        for i, e in enumerate(timed_iter(emails, "ingest")):
+            await q_in.put((i, e))
+        for _ in range(extract_concurrency):
+            await q_in.put(_DONE)
+
+    async def extract():
+        while True:
+            item = await q_in.get()
+            if item is _DONE:
+                await q_plan.put(_DONE)
+                return
+            i, e = item
+            if remote:
+                analysis, metrics = await loop.run_in_executor(executor, _analyze_remote, e)
+                get_observer().merge(metrics)
+            else:
+                analysis = await loop.run_in_executor(executor, analyze_email, e)
+            await q_plan.put((i, analysis))
+
+    async def finish(i: int, analysis, plans, results, pending, source):
+        # the email's unordered tool calls overlap with later emails; its report waits for them
+        try:
+            for j, call in pending:
+                with timer("tool_dispatch"):
+                    results[j] = await registry.call(call, source)
+            await q_out.put((i, build_report(analysis, plans, results)))
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            # fail the stream now: later reports would otherwise pile up behind this one
+            await q_out.put(_Failure(exc))
+        finally:
+            dispatch_slots.release()
+
+    async def commit(i: int, analysis):
+        await dispatch_slots.acquire()
+        plans, source = plan_email(analysis)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(plans)
+        pending = []
+        for j, p in enumerate(plans):
+            call = p.get("tool_call")
+            if not call:
+                continue
+            if registry.ordered(call.get("name")):
+                # store-writing tools finish before the next email is planned
+                with timer("tool_dispatch"):
+                    results[j] = await registry.call(call, source)
+            else:
+                pending.append((j, call))
+        t = asyncio.ensure_future(finish(i, analysis, plans, results, pending, source))
+        inflight.add(t)
+        t.add_done_callback(inflight.discard)
+
+    async def plan():
+        # plan strictly in input order; extraction may finish out of order
+        waiting: Dict[int, Dict[str, Any]] = {}
+        next_i = 0
+        finished = 0
+        store = get_store()
+        batch_size = dispatch_batch_size()
+        while finished < extract_concurrency:
+            item = await q_plan.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            waiting[item[0]] = item[1]
+            # like iter_reports: the tasks of a run of emails go to the store in one write
+            while next_i in waiting:
+                with store.batch():
+                    while next_i in waiting:
+                        await commit(next_i, waiting.pop(next_i))
+                        next_i += 1
+                        if next_i % batch_size == 0:
+                            break
+        if inflight:
+            await asyncio.gather(*list(inflight))
+        await q_out.put(_DONE)
+
+    async def guard(coro):
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            await q_out.put(_Failure(exc))
+
+    stages = [asyncio.ensure_future(guard(produce()))]
+    stages += [asyncio.ensure_future(guard(extract())) for _ in range(extract_concurrency)]
+    stages.append(asyncio.ensure_future(guard(plan())))
+    try:
+        ready: Dict[int, Dict[str, Any]] = {}
+        next_out = 0
+        while True:
+            item = await q_out.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.exc
+            ready[item[0]] = item[1]
+            while next_out in ready:
+                yield ready.pop(next_out)
+                next_out += 1
+    finally:
+        # also runs on cancellation or when the consumer stops early
+        for t in stages + list(inflight):
+            t.cancel()
+        await asyncio.gather(*stages, *list(inflight), return_exceptions=True)
+        if own_executor:
+            executor.shutdown(wait=False)
+        with timer("persistence"):
+            flush_memory()
+        flush_logs()
+
+
+async def run_batch_async(batch_file: Path = DATA_PATH, report_path: Optional[Path] = None,
+                          workers: int = 0, **kwargs) -> List[Dict[str, Any]]:
+    """Async counterpart of agent_main_refined.run_batch."""
+    if not Path(batch_file).exists():
+        print(f"No data file found at {batch_file}.")
+        return []
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker) if workers > 1 else None
+    try:
+        reports = iter_reports_async(iter_emails(batch_file), executor=executor, **kwargs)
+        if report_path:
+            with JsonlReportWriter(report_path) as writer:
+                async for r in reports:
+                    writer.write(r)
+            return []
+        return [r async for r in reports]
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def _parse_limits(values: List[str]) -> Dict[str, int]:
+    limits = {}
+    for v in values or []:
+        name, _, n = v.partition("=")
+        limits[name] = int(n)
+    return limits
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the MailSense agent as an asyncio pipeline.")
+    parser.add_argument("batch_file", nargs="?", type=Path, default=DATA_PATH)
+    parser.add_argument("--extract-concurrency", type=int, default=4)
+    parser.add_argument("--dispatch-concurrency", type=int, default=16)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=0, help="run extraction in a process pool of this size")
+    parser.add_argument("--tool-limit", action="append", default=[], metavar="TOOL=N",
+                        help="max concurrent calls for a tool (repeatable)")
+    parser.add_argument("--tool-timeout", type=float, default=DEFAULT_TOOL_TIMEOUT)
+    parser.add_argument("--report", type=Path, default=None, help="stream reports to this JSONL file")
+    parser.add_argument("--profile-imports", action="store_true", help="report import times for this run instead of its output")
+    cli = parser.parse_args()
+    if cli.profile_imports:
+        import sys
+        from src.import_profile import run_profiled
+        sys.exit(run_profiled("src.agent_async", sys.argv[1:]))
+    registry = default_registry(_parse_limits(cli.tool_limit), cli.tool_timeout)
+    out = asyncio.run(run_batch_async(cli.batch_file, report_path=cli.report, workers=cli.workers,
+                                      registry=registry, extract_concurrency=cli.extract_concurrency,
+                                      dispatch_concurrency=cli.dispatch_concurrency, queue_size=cli.queue_size))
+    if cli.report:
+        print(f"Reports written to {cli.report}")
+    else:
+        import pprint
+        pprint.pprint(out)
+    print("Async agent run complete.")
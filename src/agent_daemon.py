@@ -0,0 +1,250 @@
+"""
+Resident MailSense agent.
+
+Loads the extraction engine (dateparser, keyword tables, extract cache), the
+task store with its schedule and duplicate indexes, and memory once, then
+serves emails over a Unix domain socket (default) or localhost HTTP. Per-email
+latency is then the steady-state extract + plan + tool cost, with no imports or
+store replay in the way.
+
+Requests are JSON over HTTP/1.1 (keep-alive), on either transport:
+
+    POST /emails     an email object        -> one report (process_email_obj shape)
+                     a list of emails       -> a list of reports, in order
+                     {"path": ..., "report": optional .jsonl}
+                                            -> the server ingests the source itself
+                                               (JSON, JSONL, mbox, Maildir, .eml)
+    GET  /health     {"status", "pid", "uptime_s", "emails_processed"}
+    GET  /metrics    stage latencies and counters (observability snapshot)
+    POST /flush      persist memory and logs now
+    POST /shutdown   flush and stop
+
+Emails are processed one request at a time, like the batch runner, because
+planning reads what earlier emails' tool calls wrote. Memory is written back
+at most every `flush_interval` seconds while emails arrive, and on shutdown
+(SIGTERM/SIGINT included). Task appends are written immediately.
+src/daemon_client.py is the matching stdlib-only client.
+
+CLI:
+    python -m src.agent_daemon [--socket run/mailsense.sock | --port 8765] [--flush-interval 5]
+"""
+import os
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from src.daemon_client import daemon_config, DEFAULT_HOST, DEFAULT_PORT, DEFAULT_FLUSH_INTERVAL
+from src.agent_main_refined import process_email_obj, iter_reports
+from src.tools import extract_actions
+from src.task_store import get_store
+from src.memory import get_memory_store, flush_memory
+from src.contacts import get_contact_directory
+from src.schedule_index import user_timezone
+from src.dedup_index import detection_enabled
+from src.ingest import iter_emails, JsonlReportWriter
+from src.records import to_jsonable
+from src.observability import get_observer, flush_logs, log_action
+
+_WARM_UP_EMAIL = ("Sync tomorrow", "Can we meet tomorrow at 10am to review the invoice #1234 for $250?")
+
+
+class AgentDaemon:
+    def __init__(self, flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.started = time.time()
+        self.processed = 0
+        self._lock = threading.Lock()
+
+    def warm_up(self) -> None:
+        """Import and prime everything a first email would otherwise pay for."""
+        memory = get_memory_store()
+        memory.flush_interval = self.flush_interval
+        get_contact_directory().flush_interval = self.flush_interval
+        store = get_store()
+        store.schedule_index(user_timezone(memory.other))
+        if detection_enabled():
+            store.dedup_index()
+        extract_actions(*_WARM_UP_EMAIL)
+
+    def health(self) -> Dict[str, Any]:
+        return {"status": "ok", "pid": os.getpid(), "uptime_s": round(time.time() - self.started, 3),
+                "emails_processed": self.processed}
+
+    def handle(self, payload: Any) -> Any:
+        with self._lock:
+            if isinstance(payload, list):
+                # one task-store write for the whole list
+                with get_store().batch():
+                    reports = [process_email_obj(e) for e in payload]
+                self.processed += len(reports)
+                return reports
+            if isinstance(payload, dict) and "path" in payload:
+                return self._handle_path(Path(payload["path"]), payload.get("report"))
+            report = process_email_obj(payload)
+            self.processed += 1
+            return report
+
+    def _handle_path(self, source: Path, report_path: Optional[str]) -> Any:
+        if not source.exists():
+            raise ValueError(f"No data file found at {source}")
+        reports = iter_reports(iter_emails(source))
+        if not report_path:
+            out = list(reports)
+            self.processed += len(out)
+            return out
+        with JsonlReportWriter(Path(report_path)) as writer:
+            count = writer.write_all(reports)
+        self.processed += count
+        return {"status": "ok", "count": count, "report": str(report_path)}
+
+    def flush(self) -> None:
+        with self._lock:
+            flush_memory()
+            flush_logs()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MailSense"
+    protocol_version = "HTTP/1.1"
+    # buffer the response so headers and body leave in one write (no Nagle / delayed-ACK stall)
+    wbufsize = -1
+
+    def log_message(self, format, *args):
+        # requests are counted in the observability metrics instead
+        pass
+
+    def _send(self, status: int, obj: Any) -> None:
+        data = json.dumps(obj, ensure_ascii=False, default=to_jsonable).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def do_GET(self):
+        agent = self.server.agent
+        if self.path == "/health":
+            self._send(200, agent.health())
+        elif self.path == "/metrics":
+            self._send(200, get_observer().snapshot())
+        else:
+            self._send(404, {"status": "error", "message": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        agent = self.server.agent
+        try:
+            payload = self._read_json()
+        except ValueError as exc:
+            self._send(400, {"status": "error", "message": f"Invalid JSON: {exc}"})
+            return
+        if self.path == "/emails":
+            if not isinstance(payload, (dict, list)):
+                self._send(400, {"status": "error", "message": "Expected an email object, a list of emails or {\"path\": ...}"})
+                return
+            try:
+                self._send(200, agent.handle(payload))
+            except ValueError as exc:
+                self._send(400, {"status": "error", "message": str(exc)})
+            except Exception as exc:
+                log_action("daemon", f"request failed: {exc!r}")
+                self._send(500, {"status": "error", "message": repr(exc)})
+        elif self.path == "/flush":
+            agent.flush()
+            self._send(200, {"status": "ok"})
+        elif self.path == "/shutdown":
+            self._send(200, {"status": "ok"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            self._send(404, {"status": "error", "message": f"Unknown endpoint {self.path}"})
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ("local", 0)
+
+
+def _claim_socket(path: Path) -> None:
+    """Remove a stale socket file left by a daemon that did not exit cleanly."""
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        path.unlink()
+        return
+    finally:
+        probe.close()
+    raise RuntimeError(f"A daemon is already listening on {path}")
+
+
+def make_server(agent: AgentDaemon, socket_path: Optional[str] = None, host: str = DEFAULT_HOST,
+                port: int = DEFAULT_PORT):
+    """HTTP server for `agent` on a Unix socket if socket_path is given, else on host:port."""
+    if socket_path:
+        path = Path(socket_path)
+        _claim_socket(path)
+        server = _UnixHTTPServer(str(path), _Handler)
+        os.chmod(path, 0o600)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.agent = agent
+    return server
+
+
+def serve(socket_path: Optional[str] = None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          flush_interval: Optional[float] = DEFAULT_FLUSH_INTERVAL) -> None:
+    agent = AgentDaemon(flush_interval)
+    start = time.perf_counter()
+    agent.warm_up()
+    server = make_server(agent, socket_path, host, port)
+    where = socket_path or "http://%s:%d" % server.server_address[:2]
+    print(f"MailSense daemon (pid {os.getpid()}) warmed up in {time.perf_counter() - start:.2f}s, listening on {where}",
+          flush=True)
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if socket_path:
+            Path(socket_path).unlink(missing_ok=True)
+        agent.flush()
+        print("MailSense daemon stopped.", flush=True)
+
+
+if __name__ == "__main__":
+    defaults = daemon_config()
+    parser = argparse.ArgumentParser(description="Run the MailSense agent as a resident service.")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--socket", default=None, help=f"Unix socket path (default: {defaults['socket_path']})")
+    transport.add_argument("--port", type=int, default=None, help="serve HTTP on localhost:PORT instead of a socket")
+    parser.add_argument("--host", default=defaults["host"])
+    parser.add_argument("--flush-interval", type=float, default=defaults["flush_interval"],
+                        help="seconds between memory write-backs")
+    cli = parser.parse_args()
+    if cli.port is not None or not defaults["socket_path"]:
+        serve(None, cli.host, cli.port if cli.port is not None else defaults["port"], cli.flush_interval)
+    else:
+        serve(cli.socket or defaults["socket_path"], flush_interval=cli.flush_interval)
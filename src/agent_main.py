@@ -1,47 +1,59 @@
 # src/agent_main.py
-import json
 import sys
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from src.tools import extract_actions, create_task, summarize_email
+from src.tools import extract_actions, create_tasks_bulk
+from src.free_slots import suggest_slots, format_slot, get_slot_finder
+from src.tool_dispatch import ToolBatch, dispatch, dispatch_batch_size
+from src.task_store import get_store
 from src.planner import plan_actions
-from src.memory import add_recent_email
+from src.memory import add_recent_email, flush_memory
+from src.contacts import get_contact_directory, contact_addresses
+from src.ingest import iter_emails, stable_email_id
+from src.observability import timer, timed_iter, log_action, record_plan, record_extraction, flush_logs
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_PATH = ROOT / "data" / "examples_emails.json"
 
 
-def execute_tool_call(tool_call: Dict[str, Any], source_email: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Tool execution dispatcher. Matches the tool_call['name'] to actual functions.
-    Tool arg shapes follow src/tools_spec.md.
-    """
-    if not tool_call:
-        return {"status": "noop", "message": "No tool call provided"}
-    name = tool_call.get("name")
-    args = tool_call.get("args", {}) or {}
+def _create_tasks(calls) -> List[Dict[str, Any]]:
+    # the basic agent does not apply planner priorities
+    return create_tasks_bulk([{"action": args.get("action"), "source_email": source} for args, source in calls])
 
-    # map to real functions
-    if name == "create_task":
-        action = args.get("action")
-        return create_task(action, source_email)
-    elif name == "schedule_event":
-        # For now, schedule_event will be treated as a task placeholder using create_task
-        action = args.get("action")
-        data = args.get("start")
-        # attach chosen start time into action for persistence
-        if data:
-            action["dates"] = [data]
-        return create_task(action, source_email)
-    elif name == "compose_reply":
-        # return a simple reply template
+
+def _compose_replies(calls) -> List[Dict[str, Any]]:
+    # return a simple reply template per call; free slots come from one SlotFinder for the batch
+    finder = None
+    results = []
+    for args, _ in calls:
         action = args.get("action")
         preferred = args.get("preferred_slot")
+        slots = []
+        if not preferred and action.get("type") == "schedule":
+            finder = finder or get_slot_finder()
+            slots = suggest_slots(action, finder=finder)
+        if slots:
+            preferred = "any of " + ", ".join(format_slot(s) for s in slots)
         reply = f"Hi {action.get('contacts')[0].get('name') if action.get('contacts') else 'there'}, I can do {preferred or 'please suggest a slot'}."
-        return {"status": "ok", "reply_text": reply}
-    else:
-        return {"status": "error", "message": f"Unknown tool {name}"}
+        result = {"status": "ok", "reply_text": reply}
+        if slots:
+            result["suggested_slots"] = slots
+        results.append(result)
+    return results
+
+
+# where the basic agent's tools differ from the bulk tools in src/tool_dispatch.py
+TOOLS = {"create_task": _create_tasks, "compose_reply": _compose_replies}
+
+
+def execute_tool_call(tool_call: Dict[str, Any], source_email: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Tool execution dispatcher: runs one call as a batch of one (see src/tool_dispatch.py).
+    Tool arg shapes follow src/tools_spec.md.
+    """
+    return dispatch([tool_call], [source_email], TOOLS)[0]
 
 
 def process_email_obj(email_obj: Dict[str, Any]) -> None:
@@ -49,18 +61,38 @@ def process_email_obj(email_obj: Dict[str, Any]) -> None:
     body = email_obj.get("body", "")
     print("\n" + "=" * 60)
     print("Processing email:", subject)
-    extractor_out = extract_actions(subject, body)
+    with timer("extract"):
+        extractor_out = extract_actions(subject, body)
+    email_id = email_obj.get("email_id", email_obj.get("id"))
+    if email_id not in (None, ""):
+        extractor_out["email_id"] = stable_email_id(email_id, email_obj.get("source"))
+    record_extraction(extractor_out)
     print("Summary:", extractor_out.get("summary_text"))
     # add to memory recent
     add_recent_email({"email_id": extractor_out.get("email_id"), "subject": subject, "summary": extractor_out.get("summary_text")})
-    plans = plan_actions(extractor_out)
-    for p in plans.get("plans", []):
+    contacts = get_contact_directory()
+    extractor_out["actions"] = contacts.resolve_actions(extractor_out.get("actions", []))
+    with timer("plan"):
+        plans = plan_actions(extractor_out)
+    contacts.observe(email_obj.get("from"), email_obj.get("to"),
+                     contact_addresses(extractor_out["actions"]), email_obj.get("received_at"))
+    # this email's tool calls run as one batch, grouped by tool
+    batch = ToolBatch(TOOLS)
+    source = {"email_id": extractor_out.get("email_id"), "subject": subject, "body": body}
+    slots = [batch.add(p["tool_call"], source) if p.get("tool_call") else None for p in plans.get("plans", [])]
+    with timer("tool_dispatch"):
+        results = batch.run() if len(batch) else []
+    for p, slot in zip(plans.get("plans", []), slots):
         print(f"Plan for action {p['action_id']}: {p['recommendation']} (conf={p['confidence']}) — reason: {p['reason']}")
-        if p.get("tool_call"):
-            res = execute_tool_call(p["tool_call"], {"email_id": extractor_out.get("email_id"), "subject": subject, "body": body})
+        res = None
+        if slot is not None:
+            res = results[slot]
             print("Tool execution result:", res)
         else:
             print("No tool call for this plan.")
+        record_plan(p["recommendation"], (p.get("tool_call") or {}).get("name"), res)
+    log_action("email", subject[:80], {"email_id": extractor_out.get("email_id"),
+                                       "recommendations": [p["recommendation"] for p in plans.get("plans", [])]})
 
 
 def main(batch_file: Path = DATA_PATH):
@@ -68,17 +100,31 @@ def main(batch_file: Path = DATA_PATH):
     if not batch_file.exists():
         print(f"No data file found at {batch_file}. Provide path to single email JSON as argument.")
         return
-    with open(batch_file, "r", encoding="utf-8") as f:
-        emails = json.load(f)
-    for e in emails:
-        process_email_obj(e)
+    # stream emails (JSON, JSONL, mbox, Maildir or .eml) rather than loading the batch up front
+    emails = iter(timed_iter(iter_emails(batch_file), "ingest"))
+    store = get_store()
+    # the tasks of each run of emails go to the store in one write
+    for chunk in iter(lambda: list(islice(emails, dispatch_batch_size())), []):
+        with store.batch():
+            for e in chunk:
+                process_email_obj(e)
+    with timer("persistence"):
+        flush_memory()
+    flush_logs()
     print("\nAgent run complete.")
 
 
 if __name__ == "__main__":
+    if "--profile-imports" in sys.argv:
+        from src.import_profile import run_profiled
+        sys.exit(run_profiled("src.agent_main", sys.argv[1:]))
+    # --profile: per-stage cProfile / tracemalloc / collapsed stacks (src/profiling.py)
+    profile = "--profile" in sys.argv
+    args = [a for a in sys.argv[1:] if a != "--profile"]
     # allow optional CLI argument: path to a single email json file
-    if len(sys.argv) > 1:
-        path = Path(sys.argv[1])
-        main(path)
+    path = Path(args[0]) if args else DATA_PATH
+    if profile:
+        from src.profiling import run_profiled
+        run_profiled(main, path)
     else:
-        main()
+        main(path)
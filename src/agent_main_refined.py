@@ -1,72 +1,201 @@
 # src/agent_main_refined.py
-import json
 import sys
+import argparse
+from collections import deque
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Iterable, Iterator, Optional
 
-from src.tools import extract_actions, create_task, summarize_email
+from src.tools import extract_actions
+from src.tool_dispatch import ToolBatch, dispatch, dispatch_batch_size
+from src.task_store import get_store
 from src.planner_refined import plan_actions_refined
-from src.memory import add_recent_email
+from src.memory import add_recent_email, flush_memory
+from src.contacts import get_contact_directory, contact_addresses
+from src.ingest import iter_emails, stable_email_id, JsonlReportWriter
+from src.records import Email
+from src.observability import (timer, timed_iter, log_action, record_plan, record_extraction,
+                               flush_logs, get_observer, init_worker)
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_PATH = ROOT / "data" / "examples_emails.json"
 
 def execute_tool_call(tool_call: Dict[str, Any], source_email: Dict[str, Any]) -> Dict[str, Any]:
-    if not tool_call:
-        return {"status": "noop", "message": "No tool call provided"}
-    name = tool_call.get("name")
-    args = tool_call.get("args", {}) or {}
-    if name == "create_task":
-        action = args.get("action")
-        # pass priority if provided
-        if "priority" in args:
-            action["priority"] = args.get("priority")
-        return create_task(action, source_email)
-    elif name == "schedule_event":
-        action = args.get("action")
-        data = args.get("start")
-        if data:
-            action["dates"] = [data]
-        return create_task(action, source_email)
-    elif name == "compose_reply":
-        action = args.get("action")
-        preferred = args.get("preferred_slot")
-        # craft a simple reply using available contact name
-        name = (action.get("contacts") or [{}])[0].get("name") or "there"
-        reply = f"Hi {name}, thanks — could you confirm: {preferred or 'which of these slots works for you?'}"
-        return {"status": "ok", "reply_text": reply}
-    else:
-        return {"status": "error", "message": f"Unknown tool {name}"}
+    # a batch of one; see src/tool_dispatch.py for the bulk tool implementations
+    return dispatch([tool_call], [source_email])[0]
 
-def process_email_obj(email_obj: Dict[str, Any]) -> Dict[str, Any]:
-    subject = email_obj.get("subject", "")
-    body = email_obj.get("body", "")
-    extractor_out = extract_actions(subject, body)
+def analyze_email(email_obj: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Side-effect-free stage (summary + extraction). Safe to run in a worker process.
+    """
+    email = Email.coerce(email_obj)
+    subject, body = email.subject, email.body
+    with timer("extract"):
+        extractor_out = extract_actions(subject, body)
+    if email.email_id not in (None, ""):
+        # input id / Message-ID: keep the same pipeline id for this message across runs
+        extractor_out["email_id"] = stable_email_id(email.email_id, email.source)
+    return {"subject": subject, "body": body, "extractor_out": extractor_out,
+            "sender": email.sender, "to": email.to, "received_at": email.received_at}
+
+def plan_email(analysis: Dict[str, Any]):
+    """
+    Memory and contact updates + planning for one analysed email; returns
+    (plans, source_email). Must run in input order, after the previous email's
+    tool calls: planning reads the task store that those calls write to.
+    """
+    subject = analysis["subject"]
+    extractor_out = analysis["extractor_out"]
+    record_extraction(extractor_out)
     add_recent_email({"email_id": extractor_out.get("email_id"), "subject": subject, "summary": extractor_out.get("summary_text")})
-    plans = plan_actions_refined(extractor_out)
-    report = {"email": {"subject": subject, "summary": extractor_out.get("summary_text")}, "plans": []}
-    for p in plans.get("plans", []):
-        entry = {"action_id": p["action_id"], "recommendation": p["recommendation"], "confidence": p["confidence"], "reason": p["reason"], "tool_result": None}
-        if p.get("tool_call"):
-            res = execute_tool_call(p["tool_call"], {"email_id": extractor_out.get("email_id"), "subject": subject, "body": body})
-            entry["tool_result"] = res
+    # contact names from the directory (display names seen in earlier headers)
+    contacts = get_contact_directory()
+    extractor_out["actions"] = contacts.resolve_actions(extractor_out.get("actions", []))
+    with timer("plan"):
+        plans = plan_actions_refined(extractor_out, sender=analysis.get("sender"))
+    contacts.observe(analysis.get("sender"), analysis.get("to"), contact_addresses(extractor_out["actions"]),
+                     analysis.get("received_at"))
+    source = {"email_id": extractor_out.get("email_id"), "subject": subject, "body": analysis["body"]}
+    return plans.get("plans", []), source
+
+def build_report(analysis: Dict[str, Any], plans: List[Dict[str, Any]], results: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """The email's report from its plans and their tool results (None where a plan has no tool call)."""
+    extractor_out = analysis["extractor_out"]
+    report = {"email": {"subject": analysis["subject"], "summary": extractor_out.get("summary_text")}, "plans": []}
+    for p, result in zip(plans, results):
+        entry = {"action_id": p["action_id"], "recommendation": p["recommendation"], "confidence": p["confidence"], "reason": p["reason"],
+                 "tool_result": result}
+        record_plan(p["recommendation"], (p.get("tool_call") or {}).get("name"), result)
         report["plans"].append(entry)
+    log_action("email", analysis["subject"][:80], {"email_id": extractor_out.get("email_id"),
+                                                   "recommendations": [e["recommendation"] for e in report["plans"]]})
     return report
 
-def run_batch(batch_file: Path = DATA_PATH):
-    if not batch_file.exists():
+def commit_email(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Planning + side effects (memory, tool calls) for one analysed email.
+    Must run in input order in a single process: planning reads the task store
+    that earlier emails' tool calls write to.
+    """
+    plans, source = plan_email(analysis)
+    # this email's tool calls run as one batch, grouped by tool (src/tool_dispatch.py)
+    batch = ToolBatch()
+    slots = [batch.add(p["tool_call"], source) if p.get("tool_call") else None for p in plans]
+    with timer("tool_dispatch"):
+        results = batch.run() if len(batch) else []
+    return build_report(analysis, plans, [results[slot] if slot is not None else None for slot in slots])
+
+def process_email_obj(email_obj: Dict[str, Any]) -> Dict[str, Any]:
+    return commit_email(analyze_email(email_obj))
+
+def _analyze_chunk(chunk: List[Dict[str, Any]]):
+    # ship the worker's stage timings back with the results
+    return [analyze_email(e) for e in chunk], get_observer().drain()
+
+def _chunks(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _commit_chunk(result) -> List[Dict[str, Any]]:
+    analyses, worker_metrics = result
+    get_observer().merge(worker_metrics)
+    with get_store().batch():
+        return [commit_email(analysis) for analysis in analyses]
+
+def iter_reports(emails: Iterable[Dict[str, Any]], workers: int = 1, chunksize: int = 16,
+                 batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one report per email as it is processed. With workers > 1 the extraction
+    stage runs in a process pool and results are committed (planned + tools
+    executed) in input order, so the reports match serial mode. At most
+    2 * workers chunks are in flight, so memory stays bounded for any input size.
+    Tasks created by a run of `batch_size` emails (a worker chunk with workers > 1)
+    are written to the store in one write; the run's reports are yielded after it.
+    """
+    emails = timed_iter(emails, "ingest")
+    try:
+        if workers and workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                pending = deque()
+                for chunk in _chunks(emails, chunksize):
+                    pending.append(pool.submit(_analyze_chunk, chunk))
+                    if len(pending) >= workers * 2:
+                        yield from _commit_chunk(pending.popleft().result())
+                while pending:
+                    yield from _commit_chunk(pending.popleft().result())
+        else:
+            store = get_store()
+            for chunk in _chunks(emails, batch_size or dispatch_batch_size()):
+                with store.batch():
+                    reports = [process_email_obj(e) for e in chunk]
+                yield from reports
+    finally:
+        # memory updates are write-back; persist them once for the whole batch
+        with timer("persistence"):
+            flush_memory()
+        flush_logs()
+
+def run_batch(batch_file: Path = DATA_PATH, workers: int = 1, report_path: Optional[Path] = None,
+              incremental: bool = False, checkpoint_every: Optional[int] = None):
+    """
+    Process a batch source (JSON, JSONL, mbox, Maildir or .eml; see src/ingest.py).
+    Returns the list of reports, or streams them to `report_path` as JSONL and
+    returns an empty list so nothing accumulates in memory.
+    With `incremental`, emails already in the processed-email ledger are
+    skipped and progress is checkpointed (src/ledger.py).
+    """
+    if not Path(batch_file).exists():
         print(f"No data file found at {batch_file}.")
         return []
-    with open(batch_file, "r", encoding="utf-8") as f:
-        emails = json.load(f)
-    results = []
-    for e in emails:
-        r = process_email_obj(e)
-        results.append(r)
-    return results
+    if incremental:
+        from src.ledger import iter_incremental
+
+        reports = iter_incremental(batch_file, iter_emails, lambda emails: iter_reports(emails, workers=workers),
+                                   checkpoint_every=checkpoint_every)
+    else:
+        reports = iter_reports(iter_emails(batch_file), workers=workers)
+    if report_path:
+        with JsonlReportWriter(report_path) as writer:
+            writer.write_all(reports)
+        return []
+    return list(reports)
 
 if __name__ == "__main__":
-    out = run_batch()
-    import pprint
-    pprint.pprint(out)
+    parser = argparse.ArgumentParser(description="Run the refined MailSense agent over a batch of emails.")
+    parser.add_argument("batch_file", nargs="?", type=Path, default=DATA_PATH)
+    parser.add_argument("--workers", type=int, default=1, help="extraction worker processes (default: 1, serial)")
+    parser.add_argument("--report", type=Path, default=None, help="stream reports to this JSONL file instead of printing")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip emails already processed (ledger.jsonl) and checkpoint progress")
+    parser.add_argument("--checkpoint-every", type=int, default=None,
+                        help="incremental mode: emails between checkpoints (default: ledger.checkpoint_every)")
+    parser.add_argument("--profile-imports", action="store_true", help="report import times for this run instead of its output")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile the run per stage: cProfile, tracemalloc, collapsed stacks (src/profiling.py)")
+    parser.add_argument("--profile-dir", type=Path, default=None, help="--profile output directory (default: profiling.dir)")
+    cli = parser.parse_args()
+    if cli.profile_imports:
+        from src.import_profile import run_profiled
+        sys.exit(run_profiled("src.agent_main_refined", sys.argv[1:]))
+    kwargs = {"workers": cli.workers, "report_path": cli.report, "incremental": cli.incremental,
+              "checkpoint_every": cli.checkpoint_every}
+    if cli.profile:
+        from src.profiling import run_profiled
+        if cli.workers > 1:
+            print("--profile covers this process only; extraction in worker processes is not profiled", file=sys.stderr)
+        out = run_profiled(run_batch, cli.batch_file, out_dir=cli.profile_dir, **kwargs)
+    else:
+        out = run_batch(cli.batch_file, **kwargs)
+    if cli.report:
+        print(f"Reports written to {cli.report}")
+    else:
+        import pprint
+        pprint.pprint(out)
     print("Refined agent run complete.")
@@ -0,0 +1,69 @@
+"""
+Project configuration loader (config/project_config.yaml).
+
+Sections are read once and cached. If PyYAML is unavailable or the file is
+missing, callers get an empty section and fall back to their own defaults.
+
+The parsed config is also kept as JSON in cache/project_config.json, keyed on
+the YAML file's size and mtime. Short-lived processes then skip importing
+PyYAML and parsing the YAML file.
+"""
+import os
+import json
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+CONFIG_PATH = ROOT / "config" / "project_config.yaml"
+CONFIG_CACHE_PATH = ROOT / "cache" / "project_config.json"
+
+
+def _read_cached(stamp: list) -> Optional[Dict[str, Any]]:
+    try:
+        with open(CONFIG_CACHE_PATH, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cached.get("config") if cached.get("stamp") == stamp else None
+
+
+def _write_cached(stamp: list, config: Dict[str, Any]) -> None:
+    try:
+        CONFIG_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = CONFIG_CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stamp": stamp, "config": config}, f)
+        os.replace(tmp, CONFIG_CACHE_PATH)
+    except (OSError, TypeError, ValueError):
+        # unwritable cache dir or values JSON cannot hold; just parse the YAML next time
+        pass
+
+
+@lru_cache(maxsize=1)
+def load_config() -> Dict[str, Any]:
+    try:
+        st = os.stat(CONFIG_PATH)
+    except OSError:
+        return {}
+    stamp = [st.st_size, st.st_mtime_ns]
+    cached = _read_cached(stamp)
+    if cached is not None:
+        return cached
+    try:
+        import yaml
+    except ImportError:
+        return {}
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+    except Exception:
+        return {}
+    _write_cached(stamp, config)
+    return config
+
+
+def get_section(name: str) -> Dict[str, Any]:
+    """Return a top-level config section as a dict (empty if absent)."""
+    section = load_config().get(name)
+    return section if isinstance(section, dict) else {}
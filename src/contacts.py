@@ -0,0 +1,285 @@
+"""
+Contact directory built from processed mail.
+
+Each committed email is recorded against every address it involves: the
+sender (From), the To recipients, and the addresses extracted from the body.
+Entries are keyed by lower-cased address:
+
+  {"name": display name from a From/To header, or null,
+   "messages": emails the address appeared in, "sent": emails it sent,
+   "first_seen": UTC ISO time, "last_seen": UTC ISO time}
+
+The directory is a dict held in memory, so looking up a name or a count is
+O(1). Like MemoryStore it is write-back. Updates only mark it dirty, and
+flush_memory() persists it together with memory. With the files backend it is
+written to ``contacts.json`` (temp file + rename). With the SQLite backend the
+changed entries are upserted into the ``contacts`` table.
+
+Updates since the last flush are kept as deltas, so in shared mode (and on
+SQLite) another process's counts are added to, not overwritten.
+
+Uses:
+  - resolve_actions(): contacts extracted from a body get the display name seen
+    in headers, else the cached local-part name (polite_name_from_email).
+  - sender_messages(): how many earlier emails came from a sender. When
+    frequent_sender_messages is set, the refined planner raises an inferred
+    "medium" task priority to "high" for frequent senders (see
+    planner_rules.PlanContext and planner_rules.md).
+
+Extraction itself stays side-effect free: names are resolved and the directory
+is updated at commit time, in input order, in the process that owns the stores.
+
+Config (config/project_config.yaml -> contacts):
+  path, frequent_sender_messages (0 = off)
+
+CLI:
+    python -m src.contacts stats
+    python -m src.contacts top [n]
+"""
+import os
+import sys
+import json
+import time
+import atexit
+from dataclasses import replace
+from functools import lru_cache
+from datetime import datetime, timezone
+from email.utils import getaddresses, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+from src.config import get_section
+from src.file_lock import FileLock
+from src.records import Action, Contact
+from src.tools_enhanced import polite_name_from_email
+
+ROOT = Path(__file__).resolve().parents[1]
+CONTACTS_PATH = ROOT / "contacts.json"
+# off unless configured: it makes plans depend on mail processed by earlier runs
+FREQUENT_SENDER_MESSAGES = 0
+
+
+def contacts_config() -> Dict[str, Any]:
+    cfg = get_section("contacts")
+    path = Path(cfg.get("path") or CONTACTS_PATH)
+    if not path.is_absolute():
+        path = ROOT / path
+    return {"path": path,
+            "frequent_sender_messages": int(cfg.get("frequent_sender_messages", FREQUENT_SENDER_MESSAGES))}
+
+
+@lru_cache(maxsize=4096)
+def parse_addresses(header: Optional[str]) -> Tuple[Tuple[str, str], ...]:
+    """(display name, lower-cased address) pairs from a From/To header value (cached: headers repeat)."""
+    if not header:
+        return ()
+    return tuple((name.strip(), addr.strip().lower()) for name, addr in getaddresses([str(header)]) if "@" in addr)
+
+
+@lru_cache(maxsize=4096)
+def normalize_address(value: Optional[str]) -> Optional[str]:
+    """The lower-cased address in a plain address or a "Name <address>" header."""
+    if not value:
+        return None
+    if "<" not in value and "," not in value:
+        return value.strip().lower() or None
+    found = parse_addresses(value)
+    return found[0][1] if found else None
+
+
+def _seen_at(received_at: Optional[str]) -> str:
+    """received_at (RFC 2822 or ISO) as a UTC ISO string; now if missing or unparseable."""
+    dt = None
+    if received_at:
+        try:
+            dt = parsedate_to_datetime(received_at)
+        except (TypeError, ValueError, IndexError):
+            try:
+                dt = datetime.fromisoformat(str(received_at))
+            except ValueError:
+                dt = None
+    if dt is None:
+        dt = datetime.now(timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat(timespec="seconds")
+
+
+def _merge(entry: Optional[Dict[str, Any]], delta: Dict[str, Any]) -> Dict[str, Any]:
+    if entry is None:
+        return dict(delta)
+    return {"name": delta["name"] or entry.get("name"),
+            "messages": entry.get("messages", 0) + delta["messages"],
+            "sent": entry.get("sent", 0) + delta["sent"],
+            "first_seen": min(entry.get("first_seen") or delta["first_seen"], delta["first_seen"]),
+            "last_seen": max(entry.get("last_seen") or delta["last_seen"], delta["last_seen"])}
+
+
+class ContactDirectory:
+    """In-process, write-back directory of correspondents keyed by address (contacts.json)."""
+
+    def __init__(self, path: Path = CONTACTS_PATH, flush_interval: Optional[float] = None, shared: bool = False):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.shared = shared
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._last_flush = time.monotonic()
+        self._load()
+
+    def _read(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("contacts", {})
+        except Exception:
+            return None
+
+    def _load(self) -> None:
+        self.entries = self._read() or {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, address: str) -> bool:
+        return normalize_address(address) in self.entries
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._pending)
+
+    def get(self, address: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self.entries.get(normalize_address(address))
+
+    def name_for(self, address: str) -> str:
+        """Display name seen in headers for address, else the name guessed from its local part."""
+        entry = self.entries.get(address.lower())
+        return (entry or {}).get("name") or polite_name_from_email(address)
+
+    def sender_messages(self, sender: Optional[str]) -> int:
+        """How many recorded emails came from sender (an address or a From header)."""
+        entry = self.get(sender)
+        return entry.get("sent", 0) if entry else 0
+
+    def resolve(self, contacts: Iterable[Contact]) -> Tuple[Contact, ...]:
+        return tuple(Contact(self.name_for(c.email), c.email) if c.email else c for c in contacts)
+
+    def resolve_actions(self, actions: List[Any]) -> List[Any]:
+        """Actions with their contacts renamed from the directory; unchanged actions are returned as given."""
+        out = []
+        for a in actions:
+            record = Action.coerce(a)
+            contacts = self.resolve(record.contacts)
+            out.append(a if contacts == record.contacts else replace(record, contacts=contacts))
+        return out
+
+    def observe(self, sender: Optional[str] = None, to: Optional[str] = None,
+                addresses: Iterable[str] = (), received_at: Optional[str] = None) -> None:
+        """Record one email: its sender, recipients and extracted addresses."""
+        names: Dict[str, str] = {}
+        from_addr = None
+        for name, addr in parse_addresses(sender):
+            from_addr = from_addr or addr
+            names[addr] = name
+        for name, addr in parse_addresses(to):
+            names[addr] = names.get(addr) or name
+        for addr in addresses:
+            if addr and "@" in addr:
+                names.setdefault(addr.strip().lower(), "")
+        if not names:
+            return
+        seen = _seen_at(received_at)
+        for addr, name in names.items():
+            delta = {"name": name or None, "messages": 1, "sent": int(addr == from_addr),
+                     "first_seen": seen, "last_seen": seen}
+            self.entries[addr] = _merge(self.entries.get(addr), delta)
+            self._pending[addr] = _merge(self._pending.get(addr), delta)
+        self._touch()
+
+    def top(self, n: int = 10, by: str = "sent") -> List[Tuple[str, Dict[str, Any]]]:
+        return sorted(self.entries.items(), key=lambda kv: (-kv[1].get(by, 0), kv[0]))[:n]
+
+    def _touch(self) -> None:
+        if self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _flushed(self) -> None:
+        self._pending = {}
+        self._last_flush = time.monotonic()
+
+    def flush(self) -> bool:
+        """Write contacts.json if there are pending changes; returns True if written."""
+        if not self._pending:
+            return False
+        if not self.shared:
+            self._write()
+        else:
+            with FileLock(self.path.with_suffix(self.path.suffix + ".lock")).exclusive():
+                # re-apply this process's deltas on top of what is on disk now
+                disk = self._read() or {}
+                for addr, delta in self._pending.items():
+                    disk[addr] = _merge(disk.get(addr), delta)
+                self.entries = disk
+                self._write()
+        self._flushed()
+        return True
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"contacts": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": str(self.path), "contacts": len(self.entries),
+                "senders": sum(1 for e in self.entries.values() if e.get("sent"))}
+
+
+def contact_addresses(actions: Iterable[Any]) -> List[str]:
+    """Addresses of the contacts extracted into actions."""
+    return [c.email for a in actions for c in Action.coerce(a).contacts if c.email]
+
+
+_DIRECTORY: Optional[ContactDirectory] = None
+
+
+def get_contact_directory() -> ContactDirectory:
+    """Return the process-wide contact directory, loading it (files or SQLite backend) on first use."""
+    global _DIRECTORY
+    if _DIRECTORY is None:
+        storage = get_section("storage")
+        if storage.get("backend", "files") == "sqlite":
+            from src.sqlite_store import SqliteContactDirectory, db_path
+            _DIRECTORY = SqliteContactDirectory(db_path())
+        else:
+            _DIRECTORY = ContactDirectory(contacts_config()["path"], shared=bool(storage.get("shared", False)))
+        atexit.register(_DIRECTORY.flush)
+    return _DIRECTORY
+
+
+def set_contact_directory(directory: Optional[ContactDirectory]) -> Optional[ContactDirectory]:
+    """Replace the process-wide contact directory; returns the previous one."""
+    global _DIRECTORY
+    prev, _DIRECTORY = _DIRECTORY, directory
+    return prev
+
+
+def flush_contacts() -> None:
+    """Persist pending directory updates (if the directory has been loaded)."""
+    if _DIRECTORY is not None:
+        _DIRECTORY.flush()
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    directory = get_contact_directory()
+    if cmd == "stats":
+        print(json.dumps(directory.stats(), indent=2))
+    elif cmd == "top":
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        for addr, entry in directory.top(n):
+            print(f"{entry.get('sent', 0):6d} sent {entry.get('messages', 0):6d} total  {addr}"
+                  + (f"  ({entry['name']})" if entry.get("name") else ""))
+    else:
+        print("usage: python -m src.contacts [stats|top [n]]")
+        sys.exit(2)
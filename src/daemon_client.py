@@ -0,0 +1,203 @@
+"""
+Thin client for the resident agent (src/agent_daemon.py).
+
+Imports only the standard library and src.config, so a hook that sends one
+email starts in a few tens of milliseconds. The connection is kept alive
+across requests.
+
+    from src.daemon_client import DaemonClient
+    report = DaemonClient().process({"subject": "...", "body": "..."})
+
+CLI:
+    python -m src.daemon_client emails.json [--report out.jsonl] [--chunk 64]
+    python -m src.daemon_client inbox.mbox          # mbox / Maildir / .eml are read by the daemon
+    python -m src.daemon_client --health | --metrics | --flush | --shutdown
+    (add --socket PATH or --port N to match the daemon)
+"""
+import sys
+import json
+import socket
+import argparse
+import http.client
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterable, Iterator
+
+from src.config import get_section
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SOCKET = "run/mailsense.sock"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_CHUNK = 64
+
+
+def daemon_config() -> Dict[str, Any]:
+    """Transport settings from the `daemon` config section (shared by the daemon and the client)."""
+    cfg = get_section("daemon")
+    sock = cfg.get("socket_path", DEFAULT_SOCKET)
+    if sock and not Path(sock).is_absolute():
+        sock = str(ROOT / sock)
+    return {
+        # no Unix sockets on this platform: fall back to localhost HTTP
+        "socket_path": sock if hasattr(socket, "AF_UNIX") else None,
+        "host": cfg.get("host", DEFAULT_HOST),
+        "port": int(cfg.get("port", DEFAULT_PORT)),
+        "flush_interval": float(cfg.get("flush_interval", DEFAULT_FLUSH_INTERVAL)),
+    }
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+class DaemonError(RuntimeError):
+    pass
+
+
+class DaemonClient:
+    def __init__(self, socket_path: Optional[str] = None, host: Optional[str] = None, port: Optional[int] = None,
+                 timeout: Optional[float] = 300.0):
+        cfg = daemon_config()
+        if port is None and socket_path is None:
+            socket_path = cfg["socket_path"]
+        self.socket_path = socket_path if port is None else None
+        self.host = host or cfg["host"]
+        self.port = port if port is not None else cfg["port"]
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            if self.socket_path:
+                self._conn = _UnixHTTPConnection(self.socket_path, self.timeout)
+            else:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def request(self, method: str, path: str, payload: Any = None) -> Any:
+        body = None if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in (0, 1):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # the daemon closed an idle keep-alive connection; reconnect once
+                self.close()
+                if attempt:
+                    raise
+        result = json.loads(data or b"null")
+        if resp.status >= 400:
+            raise DaemonError(result.get("message") if isinstance(result, dict) else str(result))
+        return result
+
+    def process(self, email: Dict[str, Any]) -> Dict[str, Any]:
+        """Report for one email (same shape as agent_main_refined.process_email_obj)."""
+        return self.request("POST", "/emails", email)
+
+    def process_many(self, emails: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self.request("POST", "/emails", list(emails))
+
+    def process_path(self, source: Path, report_path: Optional[Path] = None) -> Any:
+        """Have the daemon ingest a batch source itself (JSON, JSONL, mbox or Maildir)."""
+        payload = {"path": str(Path(source).resolve())}
+        if report_path:
+            payload["report"] = str(Path(report_path).resolve())
+        return self.request("POST", "/emails", payload)
+
+    def health(self) -> Dict[str, Any]:
+        return self.request("GET", "/health")
+
+    def metrics(self) -> Dict[str, Any]:
+        return self.request("GET", "/metrics")
+
+    def flush(self) -> Dict[str, Any]:
+        return self.request("POST", "/flush", {})
+
+    def shutdown(self) -> Dict[str, Any]:
+        return self.request("POST", "/shutdown", {})
+
+
+def _read_emails(source: Path) -> Iterator[Dict[str, Any]]:
+    if source.suffix.lower() in (".jsonl", ".ndjson"):
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        return
+    with open(source, "r", encoding="utf-8") as f:
+        emails = json.load(f)
+    yield from [emails] if isinstance(emails, dict) else emails
+
+
+def _chunked(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Send emails to a running MailSense daemon.")
+    parser.add_argument("source", nargs="?", type=Path, help="JSON / JSONL file, mbox file, Maildir or .eml")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--socket", default=None)
+    transport.add_argument("--port", type=int, default=None)
+    parser.add_argument("--report", type=Path, default=None, help="write reports to this JSONL file")
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="emails per request")
+    for cmd in ("health", "metrics", "flush", "shutdown"):
+        parser.add_argument(f"--{cmd}", action="store_true")
+    cli = parser.parse_args(argv)
+    client = DaemonClient(socket_path=cli.socket, port=cli.port)
+    try:
+        for cmd in ("health", "metrics", "flush", "shutdown"):
+            if getattr(cli, cmd):
+                print(json.dumps(getattr(client, cmd)(), indent=2))
+                return 0
+        if cli.source is None or not cli.source.exists():
+            parser.error("give an existing source file or one of --health/--metrics/--flush/--shutdown")
+        if cli.source.is_dir() or cli.source.suffix.lower() in (".mbox", ".eml"):
+            print(json.dumps(client.process_path(cli.source, cli.report), indent=2, ensure_ascii=False))
+            return 0
+        out = open(cli.report, "w", encoding="utf-8") if cli.report else None
+        try:
+            for chunk in _chunked(_read_emails(cli.source), cli.chunk):
+                for report in client.process_many(chunk):
+                    if out:
+                        out.write(json.dumps(report, ensure_ascii=False) + "\n")
+                    else:
+                        print(json.dumps(report, indent=2, ensure_ascii=False))
+        finally:
+            if out:
+                out.close()
+    except (ConnectionRefusedError, FileNotFoundError) as exc:
+        print(f"MailSense daemon is not running ({exc}); start it with python -m src.agent_daemon", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Fast-path date extraction in front of dateparser.
+
+Three stages:
+  1. A compiled-regex candidate scanner built from dateparser's own vocabulary
+     for the configured languages (month/weekday names, units, relative terms,
+     am/pm, digits). Text with no candidate token cannot yield a date, so
+     dateparser is not called at all.
+  2. dateparser.search restricted to the configured languages and settings
+     (config/project_config.yaml -> date_extraction). This skips language
+     detection across every locale, which is where most of the time goes.
+  3. A fallback to full, auto-detecting dateparser for text the fast path
+     cannot resolve: text containing words outside the configured scripts
+     (non-ASCII letters) when the restricted pass found nothing.
+
+dateparser is imported on first use only. Importing it costs ~0.3s because it
+compiles every timezone and locale table. The stage-1 vocabulary is cached
+under cache/ (keyed on the installed dateparser), so a process that never
+reaches stage 2 never imports dateparser at all.
+"""
+import os
+import re
+import json
+import importlib.util
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from src.config import get_section
+
+ROOT = Path(__file__).resolve().parents[1]
+VOCAB_CACHE_DIR = ROOT / "cache"
+
+DEFAULT_LANGUAGES = ["en"]
+DEFAULT_SETTINGS = {"PREFER_DATES_FROM": "future"}
+
+# letters outside the ASCII range, e.g. "mañana", "завтра", "明天"
+FOREIGN_WORD_RE = re.compile(r"[^\W\d_a-zA-Z]+")
+
+_VOCAB_KEYS = [
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "am", "pm", "decade", "year", "month", "week", "day", "hour", "minute", "second",
+]
+
+
+@lru_cache(maxsize=1)
+def engine_config() -> Dict[str, Any]:
+    """Restricted parser configuration, read once from the project config."""
+    cfg = get_section("date_extraction")
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(cfg.get("settings") or {})
+    return {
+        "languages": list(cfg.get("languages") or DEFAULT_LANGUAGES),
+        "settings": settings,
+        "fallback_full_parser": bool(cfg.get("fallback_full_parser", True)),
+    }
+
+
+def _dateparser_stamp() -> Optional[str]:
+    # identifies the installed dateparser without importing it
+    spec = importlib.util.find_spec("dateparser")
+    if spec is None or not spec.origin:
+        return None
+    return f"{spec.origin}:{os.stat(spec.origin).st_mtime_ns}"
+
+
+def _language_vocabulary(languages: List[str]) -> List[str]:
+    """Vocabulary for the candidate scanner, from the on-disk cache when it matches the installed dateparser."""
+    path = VOCAB_CACHE_DIR / f"date_vocab-{'-'.join(languages)}.json"
+    stamp = _dateparser_stamp()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("dateparser") == stamp:
+            return cached["words"]
+    except (OSError, ValueError, KeyError):
+        pass
+    words = _build_vocabulary(languages)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"dateparser": stamp, "words": words}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return words
+
+
+def _build_vocabulary(languages: List[str]) -> List[str]:
+    from dateparser.languages.loader import default_loader
+
+    words = {"noon", "midnight"}
+    for lang in languages:
+        info = default_loader.get_locale(lang).info
+        for key in _VOCAB_KEYS:
+            words.update(info.get(key) or [])
+        for phrases in (info.get("relative-type") or {}).values():
+            for phrase in phrases:
+                words.update(phrase.split())
+    return sorted((w.lower() for w in words if w.strip()), key=len, reverse=True)
+
+
+@lru_cache(maxsize=8)
+def _candidate_re(languages: Tuple[str, ...]):
+    alternation = "|".join(re.escape(w) for w in _language_vocabulary(list(languages)))
+    return re.compile(r"\d|(?<![^\W\d_])(?:" + alternation + r")(?![^\W\d_])", re.IGNORECASE)
+
+
+def find_candidates(text: str, languages: Optional[List[str]] = None) -> List[Tuple[int, int]]:
+    """Return (start, end) spans of date-like tokens in text."""
+    languages = languages or engine_config()["languages"]
+    return [m.span() for m in _candidate_re(tuple(languages)).finditer(text or "")]
+
+
+def _search(text: str, languages: Optional[List[str]], settings: Dict[str, Any]) -> List[str]:
+    import dateparser.search
+
+    found = dateparser.search.search_dates(text, languages=languages, settings=settings)
+    return [d[1].isoformat() for d in found] if found else []
+
+
+def search_dates_full(text: str, settings: Optional[Dict[str, Any]] = None) -> List[str]:
+    """Unrestricted dateparser search (language auto-detection)."""
+    return _search(text, None, settings if settings is not None else engine_config()["settings"])
+
+
+def extract_dates(text: str) -> List[str]:
+    """Return ISO strings for dates found in text, in order of appearance."""
+    if not text:
+        return []
+    cfg = engine_config()
+    foreign = cfg["fallback_full_parser"] and FOREIGN_WORD_RE.search(text) is not None
+    if not foreign and _candidate_re(tuple(cfg["languages"])).search(text) is None:
+        return []
+    dates = _search(text, cfg["languages"], cfg["settings"])
+    if not dates and foreign:
+        dates = search_dates_full(text, cfg["settings"])
+    return dates
@@ -0,0 +1,201 @@
+"""
+Near-duplicate index over recently created tasks (planner_rules.md: duplicate
+detection).
+
+Each task's title + description is reduced to a set of word shingles and a
+MinHash signature. The signature is cut into bands; tasks sharing any band
+bucket with a query become candidates (LSH), and candidates are confirmed with
+the exact Jaccard similarity of their shingle sets. A lookup therefore touches
+only the handful of tasks in matching buckets instead of every stored task,
+and a confirmed match is never a hash false positive.
+
+Words are Unicode word characters (plus #, $ and currency signs), so non-Latin
+text is compared on its own words. A text with fewer than two shingles (empty,
+or a single word) carries too little to call anything a duplicate and never
+matches.
+
+Only tasks created within the last `window_days` are kept; older ones are
+expired from the buckets as time moves on. The task store keeps the index up to
+date on every append (TaskStore.dedup_index()). The SQLite backend keeps the
+band keys in an indexed table instead (sqlite_store.SqlDuplicateIndex).
+
+Config (config/project_config.yaml -> duplicate_detection):
+  enabled, window_days, threshold, num_perm, bands
+"""
+import re
+import heapq
+import hashlib
+import random
+from functools import lru_cache
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, FrozenSet, Iterable
+
+from src.config import get_section
+
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+
+_MERSENNE = (1 << 61) - 1
+_WORD_RE = re.compile(r"[\w#$€£₹]+", re.UNICODE)
+# shingle sets smaller than this never match
+MIN_SHINGLES = 2
+
+
+def shingles(text: str, n: int = 2) -> FrozenSet[str]:
+    """Lowercased word n-grams of text (the words themselves if it is shorter than n)."""
+    words = _WORD_RE.findall((text or "").lower())
+    if len(words) < n:
+        return frozenset(words)
+    return frozenset(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two shingle sets; 0.0 if either has fewer than MIN_SHINGLES."""
+    if len(a) < MIN_SHINGLES or len(b) < MIN_SHINGLES:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def task_text(title: Optional[str], description: Optional[str]) -> str:
+    return f"{title or ''}\n{description or ''}"
+
+
+def band_id(key: tuple) -> int:
+    """Stable signed 64-bit id for a band key (fits an SQLite INTEGER column)."""
+    digest = hashlib.blake2b(repr(key).encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def _created_epoch(created_at: Optional[str]) -> Optional[float]:
+    if not created_at:
+        return None
+    try:
+        # naive created_at values are local time, like datetime.now().isoformat()
+        return datetime.fromisoformat(created_at).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._perms = [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(num_perm)]
+
+    def signature(self, shingle_set: Iterable[str]) -> Tuple[int, ...]:
+        values = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                  for s in shingle_set]
+        if not values:
+            return (_MERSENNE,) * self.num_perm
+        return tuple(min((a * v + b) % _MERSENNE for v in values) for a, b in self._perms)
+
+
+class DuplicateIndex:
+    def __init__(self, window_days: float = DEFAULT_WINDOW_DAYS, threshold: float = DEFAULT_THRESHOLD,
+                 num_perm: int = DEFAULT_NUM_PERM, bands: int = DEFAULT_BANDS):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.window = window_days * 86400
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm)
+        # task_id -> (created epoch, shingles, band keys)
+        self._entries: Dict[str, Tuple[float, FrozenSet[str], List[tuple]]] = {}
+        self._buckets: Dict[tuple, set] = {}
+        self._expiry: List[Tuple[float, str]] = []
+        # the planner's find() and create_task's add() see the same text back to back
+        self._sketch = lru_cache(maxsize=1024)(self._compute_sketch)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, sig: Tuple[int, ...]) -> List[tuple]:
+        r = self.rows
+        return [(i,) + sig[i * r:(i + 1) * r] for i in range(self.bands)]
+
+    def _compute_sketch(self, text: str) -> Tuple[FrozenSet[str], List[tuple]]:
+        sh = shingles(text)
+        return sh, self._band_keys(self.hasher.signature(sh))
+
+    def sketch(self, title: Optional[str], description: Optional[str]) -> Tuple[FrozenSet[str], List[tuple]]:
+        """Shingle set and LSH band keys for a task's title + description."""
+        return self._sketch(task_text(title, description))
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window
+        while self._expiry and self._expiry[0][0] < cutoff:
+            created, tid = heapq.heappop(self._expiry)
+            entry = self._entries.get(tid)
+            if entry is not None and entry[0] == created:
+                self.remove(tid)
+
+    def add(self, task: Dict[str, Any], now: Optional[float] = None) -> None:
+        tid = task.get("task_id")
+        created = _created_epoch(task.get("created_at"))
+        if not tid or created is None:
+            return
+        self.remove(tid)
+        now = datetime.now().timestamp() if now is None else now
+        if created < now - self.window:
+            return
+        sh, keys = self._sketch(task_text(task.get("title"), task.get("description")))
+        self._entries[tid] = (created, sh, keys)
+        for k in keys:
+            self._buckets.setdefault(k, set()).add(tid)
+        heapq.heappush(self._expiry, (created, tid))
+
+    def remove(self, task_id: str) -> None:
+        entry = self._entries.pop(task_id, None)
+        if entry is None:
+            return
+        for k in entry[2]:
+            ids = self._buckets.get(k)
+            if ids is not None:
+                ids.discard(task_id)
+                if not ids:
+                    del self._buckets[k]
+
+    def find(self, title: Optional[str], description: Optional[str],
+             now: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """Most similar task created within the window, as (task_id, similarity), or None."""
+        self._expire(datetime.now().timestamp() if now is None else now)
+        if not self._entries:
+            return None
+        sh, keys = self._sketch(task_text(title, description))
+        if len(sh) < MIN_SHINGLES:
+            return None
+        candidates = set()
+        for k in keys:
+            candidates.update(self._buckets.get(k, ()))
+        best = None
+        for tid in candidates:
+            sim = jaccard(sh, self._entries[tid][1])
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (tid, sim)
+        return best
+
+
+def detection_enabled() -> bool:
+    return bool(get_section("duplicate_detection").get("enabled", True))
+
+
+def duplicate_params() -> Dict[str, Any]:
+    """DuplicateIndex keyword arguments from the duplicate_detection config section."""
+    cfg = get_section("duplicate_detection")
+    return {
+        "window_days": float(cfg.get("window_days", DEFAULT_WINDOW_DAYS)),
+        "threshold": float(cfg.get("threshold", DEFAULT_THRESHOLD)),
+        "num_perm": int(cfg.get("num_perm", DEFAULT_NUM_PERM)),
+        "bands": int(cfg.get("bands", DEFAULT_BANDS)),
+    }
+
+
+def build_duplicate_index(tasks: Iterable[Dict[str, Any]]) -> DuplicateIndex:
+    index = DuplicateIndex(**duplicate_params())
+    now = datetime.now().timestamp()
+    for t in tasks:
+        index.add(t, now)
+    return index
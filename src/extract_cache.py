@@ -0,0 +1,222 @@
+"""
+Content-hash memoization for extract_actions (summary + actions).
+
+Results are keyed by a hash of the exact subject/body plus a settings
+fingerprint, so a hit returns the same description, title and summary the
+email itself would produce. The fingerprint covers the extractor configuration
+and today's date, since day-relative dates ("next Monday") resolve against it.
+Changing either invalidates every entry.
+
+Dates resolved against the current time of day ("in 2 hours", "tomorrow" with
+no time) are never cached: dateparser fills their time from the clock, so they
+carry fractional seconds, which parsed times never do. Results containing such
+a date are recomputed on every call.
+
+Tiers:
+  - in-process LRU (OrderedDict) with max size and max age
+  - optional on-disk tier: one JSON file per key under cache/extract/
+
+Cached results are handed out with fresh email/action ids, matching what an
+uncached extract_actions call would generate. Actions are immutable records, so
+entries are shared rather than deep-copied.
+
+Config (config/project_config.yaml -> extract_cache):
+  enabled, max_entries, max_age_seconds, disk, disk_dir, disk_max_entries
+"""
+import os
+import json
+import time
+import uuid
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import date
+from pathlib import Path
+from typing import Dict, Any, Optional, Callable
+
+from src.config import get_section
+from src.date_extract import engine_config
+from src.keywords import get_matcher
+from src.large_body import body_config
+from src.records import Action, to_jsonable
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_VERSION = 2
+DEFAULT_DISK_DIR = ROOT / "cache" / "extract"
+
+
+@lru_cache(maxsize=1)
+def _static_fingerprint() -> str:
+    parts = {"version": CACHE_VERSION, "dates": engine_config(), "keywords": get_matcher().tables,
+             "large_body": body_config()}
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def settings_fingerprint() -> str:
+    return _static_fingerprint() + "-" + date.today().isoformat()
+
+
+def content_key(subject: str, body: str, fingerprint: str) -> str:
+    h = hashlib.sha256()
+    for part in (fingerprint, subject or "", body or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def with_fresh_ids(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "email_id": "e-" + uuid.uuid4().hex[:8],
+        "summary_text": result.get("summary_text"),
+        "actions": [a.replace(id="a-" + uuid.uuid4().hex[:8]) for a in result.get("actions", [])],
+    }
+
+
+def depends_on_clock(result: Dict[str, Any]) -> bool:
+    """True if an extracted date was resolved against the current time of day (see module docstring)."""
+    return any("." in d for a in result.get("actions", []) for d in Action.coerce(a).dates)
+
+
+def _freeze(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {"summary_text": result.get("summary_text"),
+            "actions": tuple(Action.coerce(a) for a in result.get("actions", []))}
+
+
+class ExtractCache:
+    def __init__(self, max_entries: int = 2048, max_age: float = 24 * 3600,
+                 disk_dir: Optional[Path] = None, disk_max_entries: int = 100000):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_entries = disk_max_entries
+        self._lru: "OrderedDict[str, tuple]" = OrderedDict()
+        self._fingerprint = None
+        self._disk_puts = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0,
+                      "uncacheable": 0}
+
+    def _check_fingerprint(self) -> str:
+        fp = settings_fingerprint()
+        if fp != self._fingerprint:
+            if self._fingerprint is not None:
+                self._lru.clear()
+                self.stats["invalidations"] += 1
+            self._fingerprint = fp
+        return fp
+
+    def _fresh(self, stored_at: float) -> bool:
+        return self.max_age is None or time.time() - stored_at <= self.max_age
+
+    # ---- disk tier -----------------------------------------------------
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / (key + ".json")
+
+    def _disk_get(self, key: str):
+        if not self.disk_dir:
+            return None
+        p = self._disk_path(key)
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                rec = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not self._fresh(rec.get("stored_at", 0)):
+            p.unlink(missing_ok=True)
+            return None
+        return rec["stored_at"], _freeze(rec["value"])
+
+    def _disk_put(self, key: str, stored_at: float, value: Dict[str, Any]) -> None:
+        p = self._disk_path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": stored_at, "value": value}, f, ensure_ascii=False, default=to_jsonable)
+        os.replace(tmp, p)
+        self._disk_puts += 1
+        if self._disk_puts % 256 == 0:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Drop expired disk entries and the oldest ones beyond disk_max_entries."""
+        if not self.disk_dir or not self.disk_dir.exists():
+            return 0
+        files = sorted(self.disk_dir.glob("*/*.json"), key=lambda p: p.stat().st_mtime)
+        cutoff = time.time() - self.max_age if self.max_age is not None else None
+        excess = len(files) - self.disk_max_entries
+        removed = 0
+        for i, p in enumerate(files):
+            if i < excess or (cutoff is not None and p.stat().st_mtime < cutoff):
+                p.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+    # ---- public API ----------------------------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._lru.get(key)
+        if entry is not None:
+            if self._fresh(entry[0]):
+                self._lru.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            del self._lru[key]
+        entry = self._disk_get(key)
+        if entry is not None:
+            self._remember(key, entry[0], entry[1])
+            self.stats["disk_hits"] += 1
+            return entry[1]
+        self.stats["misses"] += 1
+        return None
+
+    def _remember(self, key: str, stored_at: float, value: Dict[str, Any]) -> None:
+        self._lru[key] = (stored_at, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        stored_at = time.time()
+        self._remember(key, stored_at, value)
+        if self.disk_dir:
+            self._disk_put(key, stored_at, value)
+
+    def get_or_compute(self, subject: str, body: str,
+                       compute: Callable[[str, str], Dict[str, Any]]) -> Dict[str, Any]:
+        key = content_key(subject, body, self._check_fingerprint())
+        cached = self.get(key)
+        if cached is not None:
+            return with_fresh_ids(cached)
+        result = compute(subject, body)
+        if depends_on_clock(result):
+            self.stats["uncacheable"] += 1
+        else:
+            self.put(key, _freeze(result))
+        return result
+
+    def clear(self) -> None:
+        self._lru.clear()
+
+
+_CACHE: Optional[ExtractCache] = None
+_LOADED = False
+
+
+def get_extract_cache() -> Optional[ExtractCache]:
+    """Process-wide cache built from config; None when caching is disabled."""
+    global _CACHE, _LOADED
+    if not _LOADED:
+        cfg = get_section("extract_cache")
+        if cfg.get("enabled", True):
+            disk_dir = None
+            if cfg.get("disk", False):
+                disk_dir = ROOT / cfg["disk_dir"] if cfg.get("disk_dir") else DEFAULT_DISK_DIR
+            _CACHE = ExtractCache(
+                max_entries=int(cfg.get("max_entries", 2048)),
+                max_age=float(cfg.get("max_age_seconds", 24 * 3600)),
+                disk_dir=disk_dir,
+                disk_max_entries=int(cfg.get("disk_max_entries", 100000)),
+            )
+        _LOADED = True
+    return _CACHE
@@ -0,0 +1,81 @@
+"""
+Advisory inter-process file locks for the shared stores.
+
+FileLock wraps fcntl.flock (shared or exclusive) on a small lock file next to
+the data it protects. On Windows, msvcrt byte-range locking is used and every
+lock is exclusive. Locks are re-entrant within a process, so a method holding
+the lock can call another method that takes it. An exclusive request nested
+inside a shared one is an error, because flock would silently convert the lock.
+"""
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class FileLock:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._fd = None
+        self._depth = 0
+        self._exclusive = False
+
+    def _acquire(self, exclusive: bool) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            elif msvcrt is not None:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.01)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._exclusive = exclusive
+
+    def _release(self) -> None:
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+    @contextmanager
+    def hold(self, exclusive: bool = False):
+        if self._depth:
+            if exclusive and not self._exclusive:
+                raise RuntimeError(f"{self.path}: cannot upgrade a shared lock to exclusive")
+        else:
+            self._acquire(exclusive)
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                self._release()
+
+    def shared(self):
+        return self.hold(False)
+
+    def exclusive(self):
+        return self.hold(True)
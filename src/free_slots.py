@@ -0,0 +1,163 @@
+"""
+Free-slot suggestions for compose_reply.
+
+Free time is the user's working-hour windows (memory.user_profile.preferences.
+preferred_hours, e.g. "09:00-12:00", on the configured weekdays, in the user's
+timezone) minus the busy intervals of scheduled tasks. Busy time is read from
+the task store's schedule index (src/schedule_index.py). That index is built
+once and kept up to date on every append, so each suggestion costs a bisect
+plus a pass over the tasks in range, not a scan of the store.
+
+Each free gap yields at most one slot: the first step-aligned start that fits
+the duration. Suggestions are spread across the day's windows and the following
+days instead of being back-to-back. The earliest k are returned.
+
+Config (config/project_config.yaml -> free_slots):
+  duration_minutes, horizon_days, top_k, step_minutes, weekdays (0 = Monday)
+"""
+import math
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Iterator
+
+from src.config import get_section
+from src.schedule_index import IntervalIndex, merge_intervals, user_timezone
+
+DEFAULT_HOURS = ("09:00-12:00", "15:00-18:00")
+DEFAULT_WEEKDAYS = (0, 1, 2, 3, 4)
+
+
+def slot_config() -> Dict[str, Any]:
+    cfg = get_section("free_slots")
+    return {
+        "duration_minutes": int(cfg.get("duration_minutes", 60)),
+        "horizon_days": int(cfg.get("horizon_days", 7)),
+        "top_k": int(cfg.get("top_k", 3)),
+        "step_minutes": int(cfg.get("step_minutes", 30)),
+        "weekdays": tuple(cfg.get("weekdays", DEFAULT_WEEKDAYS)),
+    }
+
+
+@lru_cache(maxsize=64)
+def parse_hours(hours: Tuple[str, ...]) -> Tuple[Tuple[time, time], ...]:
+    """("09:00-12:00", ...) -> sorted, merged (start, end) local times; malformed entries are skipped."""
+    spans = []
+    for h in hours:
+        try:
+            a, b = (time.fromisoformat(part.strip()) for part in h.split("-", 1))
+        except (ValueError, AttributeError):
+            continue
+        if b > a:
+            spans.append((a, b))
+    spans.sort()
+    merged = merge_intervals((a.hour * 60 + a.minute, b.hour * 60 + b.minute) for a, b in spans)
+    return tuple((time(s // 60, s % 60), time(e // 60, e % 60)) for s, e in merged)
+
+
+class SlotFinder:
+    """Top-k free slots over working-hour windows, against a schedule index."""
+
+    def __init__(self, index: IntervalIndex, hours=DEFAULT_HOURS, weekdays=DEFAULT_WEEKDAYS,
+                 step_minutes: int = 30):
+        self.index = index
+        self.tz = index.tz
+        self.windows = parse_hours(tuple(hours or DEFAULT_HOURS))
+        self.weekdays = frozenset(weekdays)
+        self.step = step_minutes * 60
+
+    def _windows(self, first: date, days: int) -> Iterator[Tuple[float, float]]:
+        """Working-hour windows as epoch spans, day by day (DST-correct via the tz)."""
+        for n in range(days):
+            d = first + timedelta(days=n)
+            if d.weekday() not in self.weekdays:
+                continue
+            for a, b in self.windows:
+                yield (datetime.combine(d, a, self.tz).timestamp(), datetime.combine(d, b, self.tz).timestamp())
+
+    def find(self, start: datetime, days: int, duration_minutes: int, k: int) -> List[Tuple[float, float]]:
+        """Up to k (start, end) epoch slots of the given duration, earliest first, from `start` on."""
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=self.tz)
+        not_before = start.timestamp()
+        duration = duration_minutes * 60
+        windows = [(s, max(s, not_before), e) for s, e in self._windows(start.astimezone(self.tz).date(), days)
+                   if e - max(s, not_before) >= duration]
+        if not windows or k <= 0:
+            return []
+        # one range query over the whole horizon, then a merge walk per window
+        busy = self.index.busy(windows[0][1], windows[-1][2])
+        slots = []
+        b = 0
+        for origin, ws, we in windows:
+            while b < len(busy) and busy[b][1] <= ws:
+                b += 1
+            cursor = ws
+            j = b
+            while cursor < we:
+                gap_end = min(busy[j][0], we) if j < len(busy) else we
+                # first start on the window's step grid (09:00, 09:30, ...) at or after cursor
+                slot = origin + math.ceil((cursor - origin) / self.step) * self.step if self.step else cursor
+                if slot + duration <= gap_end:
+                    slots.append((slot, slot + duration))
+                    if len(slots) >= k:
+                        return slots
+                if j >= len(busy) or busy[j][0] >= we:
+                    break
+                cursor = busy[j][1]
+                j += 1
+        return slots
+
+    def suggest(self, start: datetime, days: int, duration_minutes: int, k: int) -> List[Dict[str, str]]:
+        """find() as {"start", "end"} naive ISO strings in the user's timezone (the schedule_event shape)."""
+        out = []
+        for s, e in self.find(start, days, duration_minutes, k):
+            out.append({"start": _local_iso(s, self.tz), "end": _local_iso(e, self.tz)})
+        return out
+
+
+def _local_iso(ts: float, tz) -> str:
+    return datetime.fromtimestamp(ts, tz).replace(tzinfo=None).isoformat()
+
+
+def format_slot(slot: Dict[str, str]) -> str:
+    """{"start": "2026-10-19T09:00:00", "end": ...} -> "Mon 19 Oct 09:00-10:00"."""
+    s, e = datetime.fromisoformat(slot["start"]), datetime.fromisoformat(slot["end"])
+    return f"{s:%a %d %b %H:%M}-{e:%H:%M}"
+
+
+def get_slot_finder() -> SlotFinder:
+    """SlotFinder over the process-wide task store and the user's preferences in memory."""
+    from src.task_store import get_store
+    from src.memory import get_memory_store
+
+    profile = get_memory_store().other.get("user_profile", {}) or {}
+    prefs = profile.get("preferences", {}) or {}
+    cfg = slot_config()
+    index = get_store().schedule_index(user_timezone({"user_profile": profile}))
+    return SlotFinder(index, prefs.get("preferred_hours"), cfg["weekdays"], cfg["step_minutes"])
+
+
+def suggest_slots(action: Any = None, now: Optional[datetime] = None, k: Optional[int] = None,
+                  duration_minutes: Optional[int] = None, days: Optional[int] = None,
+                  finder: Optional[SlotFinder] = None) -> List[Dict[str, str]]:
+    """
+    Free slots to offer in a reply about `action`: from its earliest extracted
+    date (or now, whichever is later) over the configured horizon. Pass `finder`
+    to reuse one SlotFinder across a batch of replies.
+    """
+    cfg = slot_config()
+    finder = finder or get_slot_finder()
+    start = now or datetime.now(finder.tz)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=finder.tz)
+    dates = []
+    for d in (action.get("dates") if action is not None else None) or ():
+        try:
+            dt = datetime.fromisoformat(d)
+        except (TypeError, ValueError):
+            continue
+        dates.append(dt if dt.tzinfo else dt.replace(tzinfo=finder.tz))
+    if dates and min(dates) > start:
+        start = min(dates)
+    return finder.suggest(start, days or cfg["horizon_days"], duration_minutes or cfg["duration_minutes"],
+                          cfg["top_k"] if k is None else k)
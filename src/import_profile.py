@@ -0,0 +1,55 @@
+"""
+--profile-imports: re-run an agent command under `python -X importtime` and
+report which imports its start-up (and first email) paid for.
+
+The report lists the slowest top-level imports by cumulative time, the total
+import time, and the wall time of the whole run, e.g.
+
+    python -m src.agent_main one_email.json --profile-imports
+"""
+import sys
+import time
+import subprocess
+from typing import List, Tuple
+
+FLAG = "--profile-imports"
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, int, str]]:
+    """(self us, cumulative us, nesting depth, module) per line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # the header line
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        rows.append((int(parts[0]), int(parts[1]), (len(name) - len(stripped) - 1) // 2, stripped))
+    return rows
+
+
+def format_report(module: str, rows: List[Tuple[int, int, int, str]], wall: float, top: int = 20) -> str:
+    top_level = sorted((r for r in rows if r[2] == 0), key=lambda r: r[1], reverse=True)
+    total = sum(r[1] for r in top_level)
+    lines = [f"import profile: python -m {module}",
+             f"  wall time {wall * 1e3:8.1f} ms", f"  imports   {total / 1e3:8.1f} ms ({len(rows)} modules)",
+             "", f"  {'cumulative':>12}  {'self':>9}  module"]
+    for self_us, cum_us, _, name in top_level[:top]:
+        lines.append(f"  {cum_us / 1e3:9.1f} ms  {self_us / 1e3:6.1f} ms  {name}")
+    return "\n".join(lines)
+
+
+def run_profiled(module: str, argv: List[str], top: int = 20) -> int:
+    """Run `python -m module argv` (minus the flag) with -X importtime; print the report; return its exit code."""
+    cmd = [sys.executable, "-X", "importtime", "-m", module] + [a for a in argv if a != FLAG]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    rows = parse_importtime(proc.stderr)
+    print(format_report(module, rows, wall, top))
+    if proc.returncode:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        print("\n".join(errors), file=sys.stderr)
+    return proc.returncode
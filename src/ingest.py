@@ -0,0 +1,173 @@
+"""
+Streaming email ingestion.
+
+Every reader is a generator yielding one src.records.Email at a time (the
+io_schemas.md input shape: email_id, subject, body, from, to, received_at; an
+"id" key is read as email_id), so memory use stays flat regardless of the size
+of the source. The JSON readers record the source path in Email.source: plain
+input ids (1, 2, ...) are only unique within their file.
+
+Supported sources:
+  - *.jsonl / *.ndjson : one JSON email object per line
+  - *.mbox             : Unix mbox file
+  - Maildir directory  : directory containing cur/ new/ tmp/
+  - *.eml / directory of *.eml : raw RFC 822 / MIME messages, read through a
+                         memory map without decoding attachments (src/mime_reader.py)
+  - *.json             : legacy JSON array (loaded in one go; use JSONL for large inputs)
+"""
+import json
+import hashlib
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, Any, Iterator, Iterable, Optional
+
+from src.records import Email, to_jsonable
+
+
+def _header(msg, name: str) -> str:
+    from email.header import decode_header, make_header
+
+    value = msg.get(name)
+    if value is None:
+        return ""
+    try:
+        return str(make_header(decode_header(str(value))))
+    except Exception:
+        return str(value)
+
+
+def _text_body(msg) -> str:
+    """Return the first text/plain part of a message, decoded."""
+    parts = msg.walk() if msg.is_multipart() else [msg]
+    for part in parts:
+        if part.get_content_maintype() == "multipart":
+            continue
+        if part.get_content_type() != "text/plain" or part.get_filename():
+            continue
+        payload = part.get_payload(decode=True)
+        if payload is None:
+            continue
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            return payload.decode(charset, errors="replace")
+        except LookupError:
+            return payload.decode("utf-8", errors="replace")
+    return ""
+
+
+def message_to_email(msg) -> Email:
+    """Convert an email.message.Message into the pipeline's Email record."""
+    return Email(
+        email_id=_header(msg, "Message-ID") or None,
+        subject=_header(msg, "Subject"),
+        body=_text_body(msg).strip(),
+        sender=_header(msg, "From"),
+        to=_header(msg, "To"),
+        received_at=_header(msg, "Date") or None,
+    )
+
+
+def is_message_id(email_id) -> bool:
+    """True for a Message-ID ("<local@domain>"), which is unique across sources; plain input ids (1, 2, ...) are not."""
+    return "@" in str(email_id or "")
+
+
+def source_id(source: Path) -> str:
+    return str(Path(source).resolve())
+
+
+def stable_email_id(email_id, source: Optional[str] = None) -> str:
+    """
+    Pipeline email id derived from a Message-ID, or from an input id and its
+    source: the same message gets the same id on every run.
+    """
+    key = str(email_id).strip()
+    if source and not is_message_id(key):
+        key = f"{source}#{key}"
+    return "e-" + hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def iter_jsonl(path: Path) -> Iterator[Email]:
+    sid = source_id(path)
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield replace(Email.from_dict(json.loads(line)), source=sid)
+
+
+def iter_json_array(path: Path) -> Iterator[Email]:
+    with open(path, "r", encoding="utf-8") as f:
+        emails = json.load(f)
+    if isinstance(emails, dict):
+        emails = [emails]
+    sid = source_id(path)
+    for e in emails:
+        yield replace(Email.from_dict(e), source=sid)
+
+
+def iter_mbox(path: Path) -> Iterator[Email]:
+    import mailbox
+
+    box = mailbox.mbox(str(path), create=False)
+    try:
+        for msg in box.itervalues():
+            yield message_to_email(msg)
+    finally:
+        box.close()
+
+
+def iter_maildir(path: Path) -> Iterator[Email]:
+    import mailbox
+
+    box = mailbox.Maildir(str(path), factory=None, create=False)
+    for msg in box.itervalues():
+        yield message_to_email(msg)
+
+
+def iter_emails(source: Path) -> Iterator[Email]:
+    """Pick a reader for `source` by its layout / extension and stream emails from it."""
+    source = Path(source)
+    if source.is_dir():
+        if (source / "cur").is_dir() or (source / "new").is_dir():
+            return iter_maildir(source)
+        if any(source.glob("*.eml")):
+            from src.mime_reader import iter_eml
+            return iter_eml(source)
+        raise ValueError(f"{source} is a directory but neither a Maildir (no cur/ or new/) nor holds *.eml files")
+    suffix = source.suffix.lower()
+    if suffix == ".eml":
+        from src.mime_reader import iter_eml
+        return iter_eml(source)
+    if suffix in (".jsonl", ".ndjson"):
+        return iter_jsonl(source)
+    if suffix == ".mbox":
+        return iter_mbox(source)
+    return iter_json_array(source)
+
+
+class JsonlReportWriter:
+    """Append reports to a JSONL file as they are produced."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._f = None
+        self.count = 0
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "w", encoding="utf-8")
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+        return False
+
+    def write(self, report: Dict[str, Any]) -> None:
+        self._f.write(json.dumps(report, ensure_ascii=False, default=to_jsonable) + "\n")
+        self.count += 1
+
+    def write_all(self, reports: Iterable[Dict[str, Any]]) -> int:
+        for r in reports:
+            self.write(r)
+        return self.count
@@ -0,0 +1,140 @@
+"""
+Single-pass keyword matcher shared by classification, priority inference,
+summary subject checks and planner rules.
+
+All keyword tables are compiled once into one trie-shaped regex. scan() walks
+the lowercased text a single time and reports every hit as
+(keyword, category, offset), with the same semantics as the old per-table
+`any(k in text.lower() for k in table)` checks: keywords that are a prefix of a
+longer keyword matched at the same offset are reported too, and the search
+resumes one character after each match so overlapping keywords are not lost.
+
+Scans of short texts (up to MEMO_MAX_CHARS) are memoized by text, so the call
+sites that look at the same string (e.g. priority inference and planner Rule 1
+on an action description) share one result. Full email bodies are scanned
+without memoizing, so the memo never holds large bodies.
+
+Tables can be extended or overridden from config/project_config.yaml:
+    keywords:
+      priority.high: ["urgent", "asap", ...]
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple, FrozenSet
+
+from src.config import get_section
+
+# longest text kept in the scan() memo (subjects, action descriptions); bounds it to ~2048 * 1 KB
+MEMO_MAX_CHARS = 1024
+
+DEFAULT_TABLES: Dict[str, List[str]] = {
+    # tools._detect_type_and_priority, checked in this order
+    "type.invoice": ["invoice", "due", "payment", "amount", "invoice#"],
+    "type.schedule": ["schedule", "meet", "meeting", "call", "available", "free", "book"],
+    "type.task": ["please", "kindly", "request", "could you", "can you", "send"],
+    "type.delegate": ["forward", "delegate", "cc:", "please assign"],
+    # tools_enhanced.infer_priority_from_text
+    "priority.high": ["urgent", "asap", "immediately", "important", "high priority"],
+    "priority.low": ["please", "when convenient", "whenever", "low", "minor"],
+    # tools.summarize_email: subjects that are already a good summary
+    "summary.subject": ["request", "inv", "meeting"],
+    # planner.plan_actions Rule 1 (description keywords)
+    "planner.invoice": ["invoice", "due", "payment", "amount"],
+}
+
+
+class KeywordHits:
+    __slots__ = ("hits", "categories")
+
+    def __init__(self, hits: List[Tuple[str, str, int]]):
+        self.hits = hits
+        self.categories: FrozenSet[str] = frozenset(h[1] for h in hits)
+
+    def has(self, category: str) -> bool:
+        return category in self.categories
+
+    def in_category(self, category: str) -> List[Tuple[str, int]]:
+        return [(k, off) for k, c, off in self.hits if c == category]
+
+
+def _trie_pattern(words: List[str]) -> str:
+    trie: Dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node) -> str:
+        alts = [re.escape(ch) + build(sub) for ch, sub in sorted(node.items()) if ch != ""]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # greedy optional tail: the longest keyword at an offset wins
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    def __init__(self, tables: Dict[str, List[str]]):
+        self.tables = {cat: [k.lower() for k in kws if k] for cat, kws in tables.items()}
+        owners: Dict[str, List[str]] = {}
+        for cat, kws in self.tables.items():
+            for k in kws:
+                owners.setdefault(k, [])
+                if cat not in owners[k]:
+                    owners[k].append(cat)
+        # for each keyword, the (keyword, category) hits it implies: itself plus
+        # every shorter keyword that is a prefix of it
+        self._implied: Dict[str, List[Tuple[str, str]]] = {}
+        for k in owners:
+            implied = []
+            for other, cats in owners.items():
+                if k.startswith(other):
+                    implied.extend((other, c) for c in cats)
+            self._implied[k] = implied
+        self._re = re.compile(_trie_pattern(sorted(owners))) if owners else None
+
+    def scan(self, text: str) -> KeywordHits:
+        hits: List[Tuple[str, str, int]] = []
+        if self._re is None or not text:
+            return KeywordHits(hits)
+        txt = text.lower()
+        search = self._re.search
+        pos = 0
+        while True:
+            m = search(txt, pos)
+            if m is None:
+                break
+            start = m.start()
+            for k, cat in self._implied[m.group()]:
+                hits.append((k, cat, start))
+            pos = start + 1
+        return KeywordHits(hits)
+
+
+def load_tables() -> Dict[str, List[str]]:
+    tables = {cat: list(kws) for cat, kws in DEFAULT_TABLES.items()}
+    for cat, kws in get_section("keywords").items():
+        if isinstance(kws, list):
+            tables[cat] = [str(k) for k in kws]
+    return tables
+
+
+@lru_cache(maxsize=1)
+def get_matcher() -> KeywordMatcher:
+    return KeywordMatcher(load_tables())
+
+
+def scan(text: str) -> KeywordHits:
+    """Scan text once against every keyword table (memoized for short texts)."""
+    text = text or ""
+    if len(text) > MEMO_MAX_CHARS:
+        return get_matcher().scan(text)
+    return _scan_memo(text)
+
+
+@lru_cache(maxsize=2048)
+def _scan_memo(text: str) -> KeywordHits:
+    return get_matcher().scan(text)
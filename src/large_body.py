@@ -0,0 +1,87 @@
+"""
+Bounded work for very large email bodies.
+
+A multi-megabyte forwarded thread or pasted log would otherwise go whole
+through the sentence splitter, the keyword scan, the contact regex and
+dateparser. dateparser alone takes seconds per hundred kilobytes. Bodies longer
+than ``threshold_chars`` are therefore read through fixed-size windows:
+
+  - scan text: the first ``head_chars`` and last ``tail_chars`` of the body.
+    With ``strip_quoted``, quoted replies are removed first: "> " lines, and
+    everything after an "On ... wrote:" / "-----Original Message-----" line.
+    The tail is dropped too when a reply marker was found, since it belongs to
+    the quoted history. Keywords and contacts are read from the scan text.
+  - budgets: dateparser sees at most ``date_chars`` of it, at most
+    ``max_contacts`` addresses are kept, and the summary is cut to
+    ``summary_chars``.
+
+Smaller bodies are processed exactly as before. Sentence splitting is lazy for
+every body (iter_sentences), so a two-sentence summary never splits the rest.
+
+Config (config/project_config.yaml -> large_body):
+  threshold_chars, head_chars, tail_chars, strip_quoted, date_chars,
+  summary_chars, max_contacts
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Any, Iterator
+
+from src.config import get_section
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_QUOTED_LINE_RE = re.compile(r"^[ \t]*>.*(?:\n|$)", re.MULTILINE)
+_REPLY_MARKER_RE = re.compile(
+    r"^[ \t]*(?:On\b.{0,300}\bwrote:[ \t]*$|-{2,}[ \t]*Original Message[ \t]*-{2,})",
+    re.MULTILINE | re.IGNORECASE)
+_GAP = "\n...\n"
+
+
+@lru_cache(maxsize=1)
+def body_config() -> Dict[str, Any]:
+    cfg = get_section("large_body")
+    return {
+        "threshold_chars": int(cfg.get("threshold_chars", 20000)),
+        "head_chars": int(cfg.get("head_chars", 8000)),
+        "tail_chars": int(cfg.get("tail_chars", 2000)),
+        "strip_quoted": bool(cfg.get("strip_quoted", True)),
+        "date_chars": int(cfg.get("date_chars", 4000)),
+        "summary_chars": int(cfg.get("summary_chars", 400)),
+        "max_contacts": int(cfg.get("max_contacts", 20)),
+    }
+
+
+def is_large(body: str) -> bool:
+    return len(body or "") > body_config()["threshold_chars"]
+
+
+def iter_sentences(text: str) -> Iterator[str]:
+    """Sentences of text, split lazily (same boundaries as re.split on end punctuation + whitespace)."""
+    pos = 0
+    for m in _SENTENCE_END_RE.finditer(text):
+        yield text[pos:m.start()]
+        pos = m.end()
+    yield text[pos:]
+
+
+def strip_quoted(text: str) -> (str, bool):
+    """Drop quoted reply history; returns (text, whether a reply marker cut it short)."""
+    m = _REPLY_MARKER_RE.search(text)
+    cut = m is not None
+    if cut:
+        text = text[:m.start()]
+    return _QUOTED_LINE_RE.sub("", text), cut
+
+
+def scan_window(body: str) -> str:
+    """The bounded part of a large body that extraction reads (head + tail, quoted replies removed)."""
+    cfg = body_config()
+    head = body[:cfg["head_chars"]]
+    tail = body[max(len(head), len(body) - cfg["tail_chars"]):] if cfg["tail_chars"] else ""
+    if cfg["strip_quoted"]:
+        head, cut = strip_quoted(head)
+        tail = "" if cut else strip_quoted(tail)[0]
+    return (head.rstrip() + _GAP + tail.lstrip()) if tail else head
+
+
+def clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
@@ -0,0 +1,241 @@
+"""
+Processed-email ledger for incremental batch runs.
+
+extract_actions gives every email a fresh id, so re-running a batch creates
+every task again. The ledger is an append-only JSONL file (``ledger.jsonl``)
+recording a stable key for each email that has been committed. The key is the
+Message-ID when present, the input ``id`` prefixed with its source (plain ids
+such as 1, 2, 3 repeat across files), or a content hash otherwise. With
+``--incremental`` the batch runner skips emails whose key is already recorded.
+
+Record lines:
+  {"key": ...}                                       one committed email
+  {"checkpoint": source, "position": n, "key": ...}  the first n items of source are done
+
+Keys are appended, unbuffered, as the batch runner yields reports. The runner
+commits emails in chunks (``tool_dispatch.batch_size`` emails, or one worker
+chunk with --workers): a chunk's tasks are written in one TaskStore.batch()
+write, and only then are its reports yielded. Keys are therefore recorded per
+chunk, after the chunk's tasks. A checkpoint is written every
+``checkpoint_every`` committed emails and at the end of the run. It flushes
+memory first, then fsyncs the ledger. A crashed run redoes up to one chunk:
+the emails whose keys were not recorded yet. If the crash came after the
+chunk's task write, those emails' tasks are written again (duplicate
+detection then turns most of them into notify_user). Memory updates made after
+the last checkpoint are lost, just as they are without the ledger. A resumed
+run skips the checkpointed prefix of the source without hashing it. It checks that the item before the resume position still has the
+recorded key, and if not (the source was rewritten) it re-checks every item by
+key instead.
+
+Config (config/project_config.yaml -> ledger): path, checkpoint_every.
+
+CLI:
+    python -m src.ledger stats
+    python -m src.ledger compact
+"""
+import os
+import sys
+import json
+import hashlib
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterator, Callable, Iterable, Tuple
+
+from src.config import get_section
+from src.ingest import is_message_id, source_id
+from src.records import Email
+
+ROOT = Path(__file__).resolve().parents[1]
+LEDGER_PATH = ROOT / "ledger.jsonl"
+CHECKPOINT_EVERY = 500
+
+
+def email_key(email: Email, source: Optional[str] = None) -> str:
+    """Stable identity of an input email: its Message-ID, its input id within `source`, else a hash of its content."""
+    email_id = str(email.email_id).strip() if email.email_id not in (None, "") else ""
+    if is_message_id(email_id):
+        return f"id:{email_id}"
+    if email_id and source:
+        return f"id:{source}#{email_id}"
+    h = hashlib.blake2b(digest_size=16)
+    for part in (email.subject, email.body, email.sender, email.to, email.received_at):
+        h.update(str(part or "").encode("utf-8"))
+        h.update(b"\0")
+    return f"sha:{h.hexdigest()}"
+
+
+class ProcessedLedger:
+    def __init__(self, path: Path = LEDGER_PATH):
+        self.path = Path(path)
+        self._keys = set()
+        self._checkpoints: Dict[str, Dict[str, Any]] = {}
+        self._f = None
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # torn write at the end of the file; that email was not committed
+                    continue
+                if "checkpoint" in rec:
+                    self._checkpoints[rec["checkpoint"]] = rec
+                elif "key" in rec:
+                    self._keys.add(rec["key"])
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        if self._f is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(self.path, "ab", buffering=0)
+        self._f.write((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def record(self, key: str) -> None:
+        """Mark one email as committed."""
+        if key not in self._keys:
+            self._keys.add(key)
+            self._append({"key": key})
+
+    def checkpoint(self, source: str, position: int, key: Optional[str]) -> None:
+        """Record that the first `position` items of `source` are done (the last one has `key`); fsync."""
+        rec = {"checkpoint": source, "position": position, "key": key}
+        self._checkpoints[source] = rec
+        self._append(rec)
+        os.fsync(self._f.fileno())
+
+    def resume_point(self, source: str) -> Tuple[int, Optional[str]]:
+        rec = self._checkpoints.get(source)
+        return (rec["position"], rec["key"]) if rec else (0, None)
+
+    def close(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def compact(self) -> None:
+        """Rewrite the ledger as one line per key plus the latest checkpoint per source."""
+        self.close()
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key in self._keys:
+                f.write(json.dumps({"key": key}, ensure_ascii=False) + "\n")
+            for rec in self._checkpoints.values():
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": str(self.path), "emails": len(self._keys),
+                "checkpoints": {s: r["position"] for s, r in self._checkpoints.items()}}
+
+
+def _resume(source: Path, open_source: Callable[[Path], Iterable[Email]], position: int,
+            key: Optional[str]) -> Tuple[int, Iterator[Email]]:
+    """Skip the checkpointed prefix if its last item still has the recorded key; else start over."""
+    emails = iter(open_source(source))
+    if position:
+        boundary = next(islice(emails, position - 1, None), None)
+        if boundary is not None and email_key(boundary, source_id(source)) == key:
+            return position, emails
+    return 0, iter(open_source(source))
+
+
+def iter_incremental(source: Path, open_source: Callable[[Path], Iterable[Email]],
+                     run: Callable[[Iterable[Email]], Iterable[Dict[str, Any]]],
+                     ledger: Optional["ProcessedLedger"] = None,
+                     checkpoint_every: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield `run`'s reports for the emails of `source` the ledger has not seen.
+    `run` must yield exactly one report per email, in input order (iter_reports does).
+    """
+    from src.memory import flush_memory
+    from src.observability import incr, log_action
+
+    ledger = ledger or get_ledger()
+    every = checkpoint_every or ledger_config()["checkpoint_every"]
+    sid = source_id(source)
+    position, key = ledger.resume_point(sid)
+    start, emails = _resume(Path(source), open_source, position, key)
+    in_flight = deque()  # (position, key) of emails handed to `run`, oldest first
+    last = [start, key if start else None]
+    counts = {"skipped": start, "processed": 0}
+
+    def fresh() -> Iterator[Email]:
+        batch_keys = set()
+        for position, email in enumerate(emails, start + 1):
+            key = email_key(email, sid)
+            last[:] = [position, key]
+            if key in ledger or key in batch_keys:
+                counts["skipped"] += 1
+                continue
+            batch_keys.add(key)
+            in_flight.append((position, key))
+            yield email
+
+    since = 0
+    for report in run(fresh()):
+        position, key = in_flight.popleft()
+        ledger.record(key)
+        counts["processed"] += 1
+        since += 1
+        yield report
+        if since >= every:
+            flush_memory()
+            ledger.checkpoint(sid, position, key)
+            since = 0
+    # run() has flushed memory on exhaustion; everything read from the source is done
+    if ledger.resume_point(sid) != tuple(last):
+        ledger.checkpoint(sid, *last)
+    incr("ledger.skipped", counts["skipped"])
+    log_action("ledger", f"{counts['processed']} processed, {counts['skipped']} already done",
+               {"source": sid, "position": last[0]})
+
+
+def ledger_config() -> Dict[str, Any]:
+    cfg = get_section("ledger")
+    path = Path(cfg.get("path") or LEDGER_PATH)
+    if not path.is_absolute():
+        path = ROOT / path
+    return {"path": path, "checkpoint_every": int(cfg.get("checkpoint_every", CHECKPOINT_EVERY))}
+
+
+_LEDGER: Optional[ProcessedLedger] = None
+
+
+def get_ledger() -> ProcessedLedger:
+    """Return the process-wide ledger, loading it on first use."""
+    global _LEDGER
+    if _LEDGER is None:
+        _LEDGER = ProcessedLedger(ledger_config()["path"])
+    return _LEDGER
+
+
+def set_ledger(ledger: Optional[ProcessedLedger]) -> Optional[ProcessedLedger]:
+    """Replace the process-wide ledger; returns the previous one."""
+    global _LEDGER
+    prev, _LEDGER = _LEDGER, ledger
+    return prev
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    ledger = get_ledger()
+    if cmd == "stats":
+        print(json.dumps(ledger.stats(), indent=2))
+    elif cmd == "compact":
+        ledger.compact()
+        print(f"Compacted ledger to {len(ledger)} emails")
+    else:
+        print("usage: python -m src.ledger [stats|compact]")
+        sys.exit(2)
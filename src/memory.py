@@ -1,10 +1,18 @@
-# src/memory.py
+import os
+import copy
 import json
+import time
+import atexit
+from collections import deque
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+from src.config import get_section
+from src.file_lock import FileLock
 
 ROOT = Path(__file__).resolve().parents[1]
 MEMORY_PATH = ROOT / "memory.json"
+RECENT_EMAILS_LIMIT = 50
 
 DEFAULT_MEMORY = {
     "user_profile": {
@@ -20,39 +28,193 @@ DEFAULT_MEMORY = {
 }
 
 
+class MemoryStore:
+    """
+    In-process, write-back cache of memory.json.
+
+    Updates only mark the store dirty; the file is written on flush() (explicit,
+    every `flush_interval` seconds if set, and at interpreter exit) via a temp
+    file + atomic rename. recent_emails is a bounded deque and tasks_index keeps
+    a set alongside the list for O(1) membership checks.
+
+    In shared mode (several processes on one memory.json) updates since the
+    last flush are also kept as deltas (at most `recent_limit` emails), and
+    flush() holds an exclusive lock on memory.json.lock, re-reads the file, and
+    applies only those deltas, so another process's updates are merged instead
+    of overwritten. After replace(), the whole document is written as given.
+    """
+    # subclasses whose flush() always writes deltas (SqliteMemoryStore) set this
+    delta_flush = False
+
+    def __init__(self, path: Path = MEMORY_PATH, flush_interval: Optional[float] = None,
+                 recent_limit: int = RECENT_EMAILS_LIMIT, shared: bool = False):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.recent_limit = recent_limit
+        self.shared = shared
+        self.dirty = False
+        self._rewrite = False
+        self._clear_pending()
+        self._last_flush = time.monotonic()
+        self._load()
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _load(self) -> None:
+        mem = self._read()
+        if mem is None:
+            # missing or corrupted: start from default and write it on next flush
+            self._set(copy.deepcopy(DEFAULT_MEMORY))
+            self.dirty = True
+        else:
+            self._set(mem)
+
+    def _set(self, mem: Dict[str, Any]) -> None:
+        mem = dict(mem)
+        self.recent_emails = deque(mem.pop("recent_emails", []) or [], maxlen=self.recent_limit)
+        self.tasks_index = list(mem.pop("tasks_index", []) or [])
+        self._task_set = set(self.tasks_index)
+        self.other = mem
+
+    def snapshot(self) -> Dict[str, Any]:
+        mem = dict(self.other)
+        mem["recent_emails"] = list(self.recent_emails)
+        mem["tasks_index"] = list(self.tasks_index)
+        return mem
+
+    def replace(self, mem: Dict[str, Any]) -> None:
+        self._set(mem)
+        self._rewrite = True
+        self._clear_pending()
+        self._touch()
+
+    @property
+    def _tracks_deltas(self) -> bool:
+        # a private memory.json is rewritten whole from the cache, so it needs no deltas
+        return self.shared or self.delta_flush
+
+    def _clear_pending(self) -> None:
+        # only the newest recent_limit emails can survive a merge
+        self._pending_emails: deque = deque(maxlen=self.recent_limit)
+        self._pending_tasks: List[str] = []
+
+    def add_recent_email(self, email_obj: Dict[str, Any]) -> None:
+        self.recent_emails.appendleft(email_obj)
+        if self._tracks_deltas:
+            self._pending_emails.append(email_obj)
+        self._touch()
+
+    def add_task_index(self, task_id: str) -> None:
+        if task_id in self._task_set:
+            return
+        self._task_set.add(task_id)
+        self.tasks_index.append(task_id)
+        if self._tracks_deltas:
+            self._pending_tasks.append(task_id)
+        self._touch()
+
+    def _merge_pending(self, mem: Dict[str, Any]) -> None:
+        # re-apply this process's updates on top of what is on disk now
+        emails, tasks = self._pending_emails, self._pending_tasks
+        self._set(mem)
+        for e in emails:
+            self.recent_emails.appendleft(e)
+        for tid in tasks:
+            if tid not in self._task_set:
+                self._task_set.add(tid)
+                self.tasks_index.append(tid)
+
+    def _flushed(self) -> None:
+        self._rewrite = False
+        self._clear_pending()
+        self.dirty = False
+        self._last_flush = time.monotonic()
+
+    def _touch(self) -> None:
+        self.dirty = True
+        if self.flush_interval is not None and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> bool:
+        """Write memory.json if there are pending changes; returns True if written."""
+        if not self.dirty:
+            return False
+        if not self.shared:
+            self._write()
+        else:
+            with FileLock(self.path.with_suffix(self.path.suffix + ".lock")).exclusive():
+                if not self._rewrite:
+                    disk = self._read()
+                    if disk is not None:
+                        self._merge_pending(disk)
+                self._write()
+        self._flushed()
+        return True
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # per-process temp name: in shared mode another process may be writing too
+        tmp = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+_STORE: Optional[MemoryStore] = None
+
+
+def get_memory_store() -> MemoryStore:
+    """Return the process-wide MemoryStore, loading memory.json (or the SQLite store) on first use."""
+    global _STORE
+    if _STORE is None:
+        cfg = get_section("storage")
+        if cfg.get("backend", "files") == "sqlite":
+            from src.sqlite_store import SqliteMemoryStore, db_path
+            _STORE = SqliteMemoryStore(db_path())
+        else:
+            _STORE = MemoryStore(shared=bool(cfg.get("shared", False)))
+        atexit.register(_STORE.flush)
+    return _STORE
+
+
+def set_memory_store(store: Optional[MemoryStore]) -> Optional[MemoryStore]:
+    """Replace the process-wide MemoryStore (e.g. to point it at another file); returns the previous one."""
+    global _STORE
+    prev, _STORE = _STORE, store
+    return prev
+
+
+def flush_memory() -> None:
+    """Persist pending memory updates, and the contact directory's, now (call at the end of a batch)."""
+    from src.contacts import flush_contacts
+
+    if _STORE is not None:
+        _STORE.flush()
+    flush_contacts()
+
+
 def load_memory() -> Dict[str, Any]:
-    """Load memory.json; create default if missing."""
-    if not MEMORY_PATH.exists():
-        save_memory(DEFAULT_MEMORY)
-        return DEFAULT_MEMORY.copy()
-    try:
-        with open(MEMORY_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        # if corrupted, overwrite with default
-        save_memory(DEFAULT_MEMORY)
-        return DEFAULT_MEMORY.copy()
+    """Return the current memory dict (served from the in-process cache)."""
+    return get_memory_store().snapshot()
 
 
 def save_memory(mem: Dict[str, Any]) -> None:
-    MEMORY_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(MEMORY_PATH, "w", encoding="utf-8") as f:
-        json.dump(mem, f, indent=2, ensure_ascii=False)
+    store = get_memory_store()
+    store.replace(mem)
+    store.flush()
 
 
 def add_recent_email(email_obj: Dict[str, Any]) -> None:
-    mem = load_memory()
-    recent = mem.get("recent_emails", [])
-    recent.insert(0, email_obj)
-    # keep only last 50 emails
-    mem["recent_emails"] = recent[:50]
-    save_memory(mem)
+    # newest first; the deque drops anything past the last 50 emails
+    get_memory_store().add_recent_email(email_obj)
 
 
 def add_task_index(task_id: str) -> None:
-    mem = load_memory()
-    idx = mem.get("tasks_index", [])
-    if task_id not in idx:
-        idx.append(task_id)
-    mem["tasks_index"] = idx
-    save_memory(mem)
+    get_memory_store().add_task_index(task_id)
@@ -0,0 +1,179 @@
+"""
+Raw RFC 822 / MIME ingestion over a memory-mapped file.
+
+email.message_from_bytes() builds a Message tree holding every part,
+attachments included, before the agent reads a single header. This reader
+maps the file and walks the MIME structure with bytes.find on the mapping:
+
+  - only header blocks (message and part headers) are copied out and parsed,
+    with email.parser.BytesHeaderParser;
+  - multipart bodies are split on their boundary lines, recursing into nested
+    multiparts, without reading the parts in between;
+  - the first text/plain part is decoded (base64 / quoted-printable, charset).
+    If there is none, the first text/html part is decoded and converted with
+    html_to_text();
+  - attachments and every other part are never sliced or decoded, so a
+    message with a 50 MB attachment costs about as much as a plain one.
+
+Message-ID, From, To and Date are carried into the Email record (email_id,
+sender, to, received_at), so downstream stages see a stable per-message id.
+
+Sources: a single *.eml file, or a directory of *.eml files (read in name order).
+"""
+import re
+import mmap
+import base64
+import binascii
+from html import unescape
+from pathlib import Path
+from typing import Optional, Tuple, Iterator
+
+from src.records import Email
+
+_HTML_DROP_RE = re.compile(r"<!--.*?-->|<(script|style|head)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_HTML_BREAK_RE = re.compile(r"<\s*/?\s*(?:br|p|div|li|tr|h[1-6]|blockquote|table)\b[^>]*>", re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r"<[^>]*>")
+_SPACE_RE = re.compile(r"[ \t\r\f\v\xa0]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def html_to_text(html: str) -> str:
+    """Readable text from an HTML body: block tags become line breaks, other tags are dropped."""
+    text = _HTML_DROP_RE.sub("", html)
+    text = _HTML_BREAK_RE.sub("\n", text)
+    text = unescape(_HTML_TAG_RE.sub("", text))
+    text = "\n".join(_SPACE_RE.sub(" ", line).strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def _header_end(buf, start: int, end: int) -> Tuple[int, int]:
+    """(end of the header block, start of the body) for the entity in buf[start:end]."""
+    if buf[start:start + 1] == b"\n":
+        return start, start + 1
+    if buf[start:start + 2] == b"\r\n":
+        return start, start + 2
+    crlf = buf.find(b"\r\n\r\n", start, end)
+    # search for a bare-LF blank line only up to the CRLF one, not through the whole body
+    lf = buf.find(b"\n\n", start, end if crlf == -1 else crlf)
+    if lf != -1:
+        return lf, lf + 2
+    if crlf != -1:
+        return crlf, crlf + 4
+    return end, end
+
+
+def _parse_headers(buf, start: int, end: int):
+    from email.parser import BytesHeaderParser
+
+    hend, body = _header_end(buf, start, end)
+    return BytesHeaderParser().parsebytes(buf[start:hend]), body
+
+
+def _parts(buf, start: int, end: int, boundary: bytes) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each body part between `--boundary` lines in buf[start:end]."""
+    delim = b"--" + boundary
+    pos = start if buf[start:start + len(delim)] == delim else buf.find(b"\n" + delim, start, end)
+    if pos == -1:
+        return
+    if pos != start:
+        pos += 1
+    while pos < end:
+        after = pos + len(delim)
+        if buf[after:after + 2] == b"--":
+            return  # close delimiter
+        line_end = buf.find(b"\n", after, end)
+        if line_end == -1:
+            return
+        part_start = line_end + 1
+        nxt = buf.find(b"\n" + delim, part_start, end)
+        part_end = end if nxt == -1 else nxt
+        if part_end > part_start and buf[part_end - 1:part_end] == b"\r":
+            part_end -= 1
+        yield part_start, part_end
+        if nxt == -1:
+            return
+        pos = nxt + 1
+
+
+def _is_attachment(headers) -> bool:
+    disposition = (headers.get("Content-Disposition") or "").split(";", 1)[0].strip().lower()
+    return disposition == "attachment" or headers.get_filename() is not None
+
+
+def _find_text(buf, headers, start: int, end: int, found: dict, depth: int = 0) -> None:
+    """Record the first text/plain and text/html (headers, start, end) under this entity in `found`."""
+    ctype = headers.get_content_type()
+    if ctype.startswith("multipart/"):
+        boundary = headers.get_param("boundary")
+        if not boundary or depth > 20:
+            return
+        for ps, pe in _parts(buf, start, end, str(boundary).encode("ascii", "replace")):
+            part_headers, body = _parse_headers(buf, ps, pe)
+            _find_text(buf, part_headers, body, pe, found, depth + 1)
+            if "text/plain" in found:
+                return
+    elif ctype in ("text/plain", "text/html") and not _is_attachment(headers):
+        found.setdefault(ctype, (headers, start, end))
+
+
+def _decode(buf, headers, start: int, end: int) -> str:
+    payload = buf[start:end]
+    cte = (headers.get("Content-Transfer-Encoding") or "").strip().lower()
+    try:
+        if cte == "base64":
+            payload = base64.b64decode(payload)
+        elif cte == "quoted-printable":
+            payload = binascii.a2b_qp(payload)
+    except (binascii.Error, ValueError):
+        pass
+    charset = headers.get_content_charset() or "utf-8"
+    try:
+        return payload.decode(charset, errors="replace")
+    except LookupError:
+        return payload.decode("utf-8", errors="replace")
+
+
+def parse_message(buf, start: int = 0, end: Optional[int] = None) -> Email:
+    """Email record for the RFC 822 message in buf[start:end] (bytes or an mmap)."""
+    from src.ingest import _header
+
+    end = len(buf) if end is None else end
+    headers, body_start = _parse_headers(buf, start, end)
+    found = {}
+    _find_text(buf, headers, body_start, end, found)
+    if "text/plain" in found:
+        body = _decode(buf, *found["text/plain"])
+    elif "text/html" in found:
+        body = html_to_text(_decode(buf, *found["text/html"]))
+    else:
+        body = ""
+    return Email(
+        email_id=_header(headers, "Message-ID") or None,
+        subject=_header(headers, "Subject"),
+        body=body.strip(),
+        sender=_header(headers, "From"),
+        to=_header(headers, "To"),
+        received_at=_header(headers, "Date") or None,
+    )
+
+
+def read_eml(path: Path) -> Email:
+    """Parse one .eml file through a read-only memory map."""
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file: nothing to map
+            return parse_message(b"")
+        try:
+            return parse_message(buf)
+        finally:
+            buf.close()
+
+
+def iter_eml(path: Path) -> Iterator[Email]:
+    """Emails from a .eml file, or from every *.eml file in a directory (name order)."""
+    path = Path(path)
+    files = sorted(path.glob("*.eml")) if path.is_dir() else [path]
+    for p in files:
+        yield read_eml(p)
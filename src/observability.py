@@ -0,0 +1,289 @@
+"""
+Low-overhead metrics and tracing (the `log_action` tool from tools_spec.md).
+
+- Stage timers: `with timer("extract"): ...` records into a latency histogram
+  per stage (ingest, summarize, extract, plan, tool_dispatch, persistence).
+- Histograms use fixed log-scale buckets, each 10% wider than the last, so
+  percentiles are accurate to ~10%. Recording is a bisect + increment, and
+  p50/p95/p99 come from bucket counts. Histograms from worker processes can be
+  merged into the parent's.
+- Counters: `incr("recommendation.create_task")`, `incr("tool.create_task.ok")`, ...
+- Recording is thread-safe: the async pipeline (src/agent_async.py) extracts on
+  a worker thread while the event loop thread times tool dispatch.
+- Logs are buffered in memory and appended to logs/agent.log every
+  FLUSH_EVERY records or FLUSH_INTERVAL seconds; logs/metrics.json is rewritten
+  with the current process's counters and stage latencies on each flush and at
+  exit.
+"""
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+LOG_DIR = ROOT / "logs"
+LOG_PATH = LOG_DIR / "agent.log"
+METRICS_PATH = LOG_DIR / "metrics.json"
+FLUSH_EVERY = 500
+FLUSH_INTERVAL = 5.0
+_END = object()
+
+# bucket upper bounds in seconds: 100ns .. ~1000s, growing by 10% per bucket
+_BOUNDS: List[float] = []
+_b = 1e-7
+while _b < 1e3:
+    _BOUNDS.append(_b)
+    _b *= 1.1
+del _b
+
+
+class Histogram:
+    __slots__ = ("counts", "total", "n", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.total = 0.0
+        self.n = 0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(_BOUNDS, seconds)] += 1
+        self.total += seconds
+        self.n += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        if not self.n:
+            return 0.0
+        rank = q * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return min(_BOUNDS[i] if i < len(_BOUNDS) else self.max, self.max)
+        return self.max
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        for i, c in other["counts"].items():
+            self.counts[int(i)] += c
+        self.total += other["total"]
+        self.n += other["n"]
+        self.max = max(self.max, other["max"])
+
+    def dump(self) -> Dict[str, Any]:
+        return {"counts": {i: c for i, c in enumerate(self.counts) if c},
+                "total": self.total, "n": self.n, "max": self.max}
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.n,
+            "total_s": round(self.total, 6),
+            "mean_us": round(self.total / self.n * 1e6, 2) if self.n else 0.0,
+            "p50_us": round(self.percentile(0.50) * 1e6, 2),
+            "p95_us": round(self.percentile(0.95) * 1e6, 2),
+            "p99_us": round(self.percentile(0.99) * 1e6, 2),
+            "max_us": round(self.max * 1e6, 2),
+        }
+
+
+class _Timer:
+    __slots__ = ("obs", "stage", "t0")
+
+    def __init__(self, obs: "Observer", stage: str):
+        self.obs = obs
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.obs.observe(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+class Observer:
+    # True for src.profiling.ProfilingObserver (--profile)
+    profiling = False
+
+    def __init__(self, log_path: Path = LOG_PATH, metrics_path: Path = METRICS_PATH,
+                 flush_every: int = FLUSH_EVERY, flush_interval: float = FLUSH_INTERVAL,
+                 autoflush: bool = True):
+        self.log_path = Path(log_path)
+        self.autoflush = autoflush
+        self.metrics_path = Path(metrics_path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.counters: Dict[str, float] = {}
+        self.stages: Dict[str, Histogram] = {}
+        self._lines: List[str] = []
+        self._last_flush = time.monotonic()
+        # guards counters, stages and _lines (recorded from more than one thread)
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str) -> _Timer:
+        return _Timer(self, stage)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            h = self.stages.get(stage)
+            if h is None:
+                h = self.stages[stage] = Histogram()
+            h.record(seconds)
+
+    def incr(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def log(self, stage: str, message: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        line = f"{datetime.now().isoformat(timespec='milliseconds')}\t{stage}\t{message}"
+        if meta:
+            line += "\t" + json.dumps(meta, ensure_ascii=False, default=str)
+        with self._lock:
+            self._lines.append(line)
+            due = len(self._lines) >= self.flush_every
+        if self.autoflush and (due or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    # ---- cross-process merge ------------------------------------------
+
+    def drain(self) -> Dict[str, Any]:
+        """Return and reset everything recorded so far (for shipping from a worker process)."""
+        with self._lock:
+            out = {"counters": self.counters, "stages": {k: h.dump() for k, h in self.stages.items()},
+                   "lines": self._lines}
+            self.counters, self.stages, self._lines = {}, {}, []
+        return out
+
+    def merge(self, drained: Dict[str, Any]) -> None:
+        with self._lock:
+            for k, v in drained.get("counters", {}).items():
+                self.counters[k] = self.counters.get(k, 0) + v
+            for k, d in drained.get("stages", {}).items():
+                self.stages.setdefault(k, Histogram()).merge(d)
+            self._lines.extend(drained.get("lines", []))
+
+    # ---- output --------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {k: h.summary() for k, h in sorted(self.stages.items())}
+        n_actions = counters.get("actions_extracted", 0)
+        if n_actions:
+            counters["avg_extraction_confidence"] = round(counters.get("extraction_confidence_sum", 0) / n_actions, 4)
+        return {
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+            "counters": counters,
+            "stages": stages,
+        }
+
+    def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        with self._lock:
+            if not self._lines and not self.counters and not self.stages:
+                return
+            lines, self._lines = self._lines, []
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        if lines:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        tmp = self.metrics_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, self.metrics_path)
+
+
+_OBSERVER: Optional[Observer] = None
+
+
+def get_observer() -> Observer:
+    global _OBSERVER
+    if _OBSERVER is None:
+        _OBSERVER = Observer()
+        atexit.register(_OBSERVER.flush)
+    return _OBSERVER
+
+
+def set_observer(obs: Optional[Observer]) -> Optional[Observer]:
+    """Replace the process-wide Observer; returns the previous one."""
+    global _OBSERVER
+    prev, _OBSERVER = _OBSERVER, obs
+    return prev
+
+
+def init_worker() -> None:
+    """Process-pool initializer: start from an empty, non-flushing Observer so the
+    parent can drain() and merge() worker metrics without double counting."""
+    set_observer(Observer(autoflush=False))
+
+
+def timer(stage: str) -> _Timer:
+    return get_observer().timer(stage)
+
+
+def incr(name: str, n: float = 1) -> None:
+    get_observer().incr(name, n)
+
+
+def flush_logs() -> None:
+    if _OBSERVER is not None:
+        _OBSERVER.flush()
+
+
+def log_action(stage: str, message: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Tool: append a log line (buffered) for `stage`; see tools_spec.md."""
+    obs = get_observer()
+    obs.incr(f"log.{stage}")
+    obs.log(stage, message, meta)
+    return {"status": "ok"}
+
+
+def record_plan(recommendation: str, tool_name: Optional[str], result: Optional[Dict[str, Any]]) -> None:
+    """Count a planner recommendation and the outcome of its tool call."""
+    obs = get_observer()
+    obs.incr(f"recommendation.{recommendation}")
+    if tool_name:
+        status = (result or {}).get("status", "unknown")
+        obs.incr(f"tool.{tool_name}.{status}")
+        if status == "ok" and tool_name == "create_task":
+            obs.incr("tasks_created")
+        elif status == "ok" and tool_name == "schedule_event":
+            obs.incr("schedule_events_created")
+
+
+def record_extraction(extractor_out: Dict[str, Any]) -> None:
+    obs = get_observer()
+    actions = extractor_out.get("actions", [])
+    obs.incr("emails_processed")
+    obs.incr("actions_extracted", len(actions))
+    obs.incr("extraction_confidence_sum", sum(a.get("confidence") or 0 for a in actions))
+
+
+def timed_iter(iterable, stage: str):
+    """Yield from iterable, timing each next() under `stage` (e.g. ingest)."""
+    obs = get_observer()
+    it = iter(iterable)
+    if obs.profiling:
+        # --profile: through timer() so the stage gets its own profiler
+        while True:
+            with obs.timer(stage):
+                item = next(it, _END)
+            if item is _END:
+                return
+            yield item
+    clock = time.perf_counter
+    while True:
+        t0 = clock()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        obs.observe(stage, clock() - t0)
+        yield item
@@ -0,0 +1,459 @@
+"""
+Declarative planner rule table (planner_rules.md) and its compiled evaluators.
+
+RULES is the single source of truth for both planners. Each row applies to one
+planner ("basic" = planner.plan_actions, "refined" = planner_refined
+.plan_actions_refined, "*" = both) and says:
+
+    when            feature -> required value; all must hold
+    recommendation  the plan's recommendation
+    confidence      float
+    reason          text, may reference features as {name}
+    tool / args     tool_call name and extra args (the action is always passed);
+                    Col("x") takes the value of feature x
+
+Rows are tried in order and the first match wins, which is the old if/elif
+cascade. Rows with `after` are overrides applied to rows whose first-match
+recommendation is listed there (duplicate detection).
+
+Features are either base columns read straight off each action or derived
+features (keyword hits, amounts, schedule conflicts, near-duplicates) that are
+computed only for the rows that reach a condition needing them, once per
+distinct input.
+
+Evaluation:
+  - fewer than `batch_min_actions` actions: plain per-action loop
+  - otherwise: the actions become numpy feature columns, each rule becomes a
+    boolean mask over the rows still unmatched, and derived features are
+    computed once per distinct input (grouped with pandas.factorize) and
+    broadcast back to the rows.
+
+Plans are src.records.Plan records; a plan's tool_call args carry the action
+object the planner was given. Both paths produce identical plans. plan_batch() plans many emails' actions in
+one pass against the current store state, i.e. like calling the planner on each
+email without running any tool calls in between.
+
+A PlanContext is built per email (or per plan_batch call). Besides the store
+indexes it carries how many earlier emails came from the sender, so the
+"priority" feature can favour frequent correspondents (contacts ->
+frequent_sender_messages, off by default). plan_batch() takes each email's
+sender and evaluates frequent and other senders' actions with separate
+contexts, so it agrees with per-email planning.
+
+Config (config/project_config.yaml -> planner):
+  batch_min_actions
+"""
+import string
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from src.config import get_section
+from src.keywords import scan as scan_keywords
+from src.tools_enhanced import extract_amounts, infer_priority_from_text
+from src.records import Action, Plan
+
+DEFAULT_BATCH_MIN_ACTIONS = 256
+
+
+class Col:
+    """Reference to a feature value, for tool args."""
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"Col({self.name!r})"
+
+
+RULES: List[Dict[str, Any]] = [
+    # Rule 1: invoice
+    {"planner": "basic", "when": {"type": "invoice"},
+     "recommendation": "create_task", "confidence": 0.95, "reason": "Invoice/payment detected",
+     "tool": "create_task"},
+    {"planner": "basic", "when": {"invoice_keywords": True},
+     "recommendation": "create_task", "confidence": 0.95, "reason": "Invoice/payment detected",
+     "tool": "create_task"},
+    {"planner": "refined", "when": {"has_amounts": True},
+     "recommendation": "create_task", "confidence": 0.97, "reason": "Invoice/amount detected: {amounts}",
+     "tool": "create_task", "args": {"priority": "high"}},
+    {"planner": "refined", "when": {"type": "invoice"},
+     "recommendation": "create_task", "confidence": 0.9, "reason": "Invoice-like content",
+     "tool": "create_task", "args": {"priority": "high"}},
+    # Rule 2: schedule with dates (+ memory conflict check)
+    {"planner": "basic", "when": {"type": "schedule", "has_exact": True, "conflict": True},
+     "recommendation": "compose_reply", "confidence": 0.6,
+     "reason": "Conflict with existing task; ask for alternate slot",
+     "tool": "compose_reply", "args": {"preferred_slot": None}},
+    {"planner": "refined", "when": {"type": "schedule", "has_exact": True, "conflict": True},
+     "recommendation": "compose_reply", "confidence": 0.6,
+     "reason": "Conflict detected with existing scheduled item",
+     "tool": "compose_reply", "args": {"preferred_slot": None}},
+    {"planner": "basic", "when": {"type": "schedule", "has_exact": True},
+     "recommendation": "schedule_event", "confidence": 0.9, "reason": "Exact time provided",
+     "tool": "schedule_event", "args": {"start": Col("exact_date")}},
+    {"planner": "refined", "when": {"type": "schedule", "has_exact": True},
+     "recommendation": "schedule_event", "confidence": 0.92, "reason": "Exact time present",
+     "tool": "schedule_event", "args": {"start": Col("exact_date")}},
+    {"planner": "basic", "when": {"type": "schedule", "has_dates": True},
+     "recommendation": "compose_reply", "confidence": 0.7, "reason": "Ambiguous dates — ask to confirm slot",
+     "tool": "compose_reply", "args": {"preferred_slot": None}},
+    {"planner": "refined", "when": {"type": "schedule", "has_dates": True},
+     "recommendation": "compose_reply", "confidence": 0.7, "reason": "Ambiguous date; will ask user to confirm",
+     "tool": "compose_reply", "args": {"preferred_slot": None}},
+    # Rule 3: task
+    {"planner": "basic", "when": {"type": "task"},
+     "recommendation": "create_task", "confidence": 0.8, "reason": "General task detected",
+     "tool": "create_task"},
+    {"planner": "refined", "when": {"type": "task"},
+     "recommendation": "create_task", "confidence": 0.8, "reason": "Generic task detected",
+     "tool": "create_task", "args": {"priority": Col("priority")}},
+    # Rule 4: delegate with contacts
+    {"planner": "basic", "when": {"type": "delegate", "has_contacts": True},
+     "recommendation": "compose_reply", "confidence": 0.85, "reason": "Delegation detected",
+     "tool": "compose_reply"},
+    {"planner": "refined", "when": {"type": "delegate", "has_contacts": True},
+     "recommendation": "compose_reply", "confidence": 0.85, "reason": "Delegation action; compose reply",
+     "tool": "compose_reply"},
+    # Rule 5: fallback
+    {"planner": "basic", "when": {},
+     "recommendation": "ignore", "confidence": 0.6, "reason": "No actionable intent or low confidence"},
+    {"planner": "refined", "when": {},
+     "recommendation": "ignore", "confidence": 0.55, "reason": "No clear action"},
+    # Duplicate detection: a similar task created recently -> notify_user
+    {"planner": "*", "after": ("create_task", "schedule_event"), "when": {"duplicate": True},
+     "recommendation": "notify_user", "confidence": 0.85,
+     "reason": "Similar to task {duplicate_id} created recently (similarity {duplicate_similarity:.2f})",
+     "tool": "notify_user", "args": {"task_id": Col("duplicate_id")}},
+]
+
+BASE_FEATURES = ("type", "has_dates", "has_exact", "exact_date", "has_contacts",
+                 "title", "description", "priority_field")
+
+
+class PlanContext:
+    """Store-backed lookups used by derived features."""
+
+    def __init__(self, index=None, dedup=None, sender_messages: int = 0, frequent_sender_messages: int = 0):
+        self.index = index
+        self.dedup = dedup
+        # earlier emails from this email's sender (src/contacts.py) and the "frequent" threshold (0 = off)
+        self.sender_messages = sender_messages
+        self.frequent_sender_messages = frequent_sender_messages
+
+    def sender_priority(self, inferred: str) -> str:
+        # no priority keywords: tasks from frequent senders default to high
+        if (inferred == "medium" and self.frequent_sender_messages
+                and self.sender_messages >= self.frequent_sender_messages):
+            return "high"
+        return inferred
+
+    def conflicts(self, due_iso: Optional[str]) -> bool:
+        if not due_iso or self.index is None:
+            return False
+        try:
+            return self.index.overlaps(due_iso)
+        except Exception:
+            return False
+
+    def duplicate(self, title: Optional[str], description: Optional[str]) -> Optional[Tuple[str, float]]:
+        if self.dedup is None:
+            return None
+        return self.dedup.find(title, description)
+
+
+# name -> (base feature inputs, fn(*inputs, ctx))
+DERIVED: Dict[str, Tuple[Tuple[str, ...], Callable]] = {
+    "invoice_keywords": (("description",), lambda d, ctx: scan_keywords(d).has("planner.invoice")),
+    "amounts": (("description",), lambda d, ctx: extract_amounts(d)),
+    "has_amounts": (("description",), lambda d, ctx: bool(extract_amounts(d))),
+    "priority": (("priority_field", "description"),
+                 lambda p, d, ctx: p or ctx.sender_priority(infer_priority_from_text(d))),
+    "conflict": (("exact_date",), lambda d, ctx: ctx.conflicts(d)),
+    "duplicate_match": (("title", "description"), lambda t, d, ctx: ctx.duplicate(t, d)),
+}
+# features read off duplicate_match
+_MATCH_PARTS = {
+    "duplicate": lambda m: m is not None,
+    "duplicate_id": lambda m: m[0] if m else None,
+    "duplicate_similarity": lambda m: m[1] if m else 0.0,
+}
+
+
+def base_features(a: Action) -> Dict[str, Any]:
+    exact = _first_exact(a.dates)
+    return {
+        "type": a.type,
+        "has_dates": bool(a.dates),
+        "has_exact": exact is not None,
+        "exact_date": exact,
+        "has_contacts": bool(a.contacts),
+        "title": a.title,
+        "description": a.description or "",
+        "priority_field": a.priority,
+    }
+
+
+class _Rule:
+    __slots__ = ("when", "after", "recommendation", "confidence", "reason", "reason_fields", "tool", "args")
+
+    def __init__(self, row: Dict[str, Any]):
+        self.when = tuple(row.get("when", {}).items())
+        self.after = tuple(row.get("after", ()))
+        self.recommendation = row["recommendation"]
+        self.confidence = float(row["confidence"])
+        self.reason = row["reason"]
+        self.reason_fields = tuple(f for _, f, _, _ in string.Formatter().parse(self.reason) if f)
+        self.tool = row.get("tool")
+        self.args = dict(row.get("args", {}))
+
+    def plan(self, action: Any, action_id: Optional[str], value: Callable[[str], Any]) -> Plan:
+        reason = self.reason
+        if self.reason_fields:
+            reason = reason.format_map({f: value(f) for f in self.reason_fields})
+        tool_call = None
+        if self.tool:
+            args = {"action": action}
+            for k, v in self.args.items():
+                args[k] = value(v.name) if isinstance(v, Col) else v
+            tool_call = {"name": self.tool, "args": args}
+        return Plan(action_id, self.recommendation, self.confidence, reason, tool_call)
+
+
+def _first_exact(dates) -> Optional[str]:
+    for d in dates:
+        if "T" in d:
+            return d
+    return None
+
+
+def _object_array(np, values: List[Any], scalars: bool = False):
+    arr = np.empty(len(values), dtype=object)
+    if scalars:
+        arr[:] = values
+    else:
+        # element-wise so list values (e.g. amounts) stay single cells
+        for i, v in enumerate(values):
+            arr[i] = v
+    return arr
+
+
+class _Frame:
+    """Columnar view of a batch of actions with lazily derived feature columns."""
+
+    def __init__(self, actions: List[Action], ctx: PlanContext):
+        import numpy as np
+        import pandas as pd
+        self.np = np
+        self.pd = pd
+        self.ctx = ctx
+        self.n = len(actions)
+        exact = [_first_exact(a.dates) for a in actions]
+        self._cols = {
+            "type": _object_array(np, [a.type for a in actions], True),
+            "has_dates": np.array([bool(a.dates) for a in actions], dtype=bool),
+            "has_exact": np.array([d is not None for d in exact], dtype=bool),
+            "exact_date": _object_array(np, exact, True),
+            "has_contacts": np.array([bool(a.contacts) for a in actions], dtype=bool),
+            "title": _object_array(np, [a.title for a in actions], True),
+            "description": _object_array(np, [a.description or "" for a in actions], True),
+            "priority_field": _object_array(np, [a.priority for a in actions], True),
+        }
+        self._done: Dict[str, Any] = {}
+
+    def values(self, name: str, rows):
+        """Feature `name` for the given row positions (computed for those rows if derived)."""
+        if name in BASE_FEATURES:
+            return self._cols[name][rows]
+        if name in _MATCH_PARTS:
+            part = _MATCH_PARTS[name]
+            return _object_array(self.np, [part(m) for m in self.values("duplicate_match", rows)])
+        self._derive(name, rows)
+        return self._cols[name][rows]
+
+    def _codes(self, inputs: Tuple[str, ...], rows):
+        # one integer per distinct combination of input values
+        factorize = self.pd.factorize
+        codes = factorize(self._cols[inputs[0]][rows], use_na_sentinel=False)[0]
+        for c in inputs[1:]:
+            more = factorize(self._cols[c][rows], use_na_sentinel=False)[0]
+            codes = factorize(codes * (int(more.max()) + 1) + more)[0]
+        return codes
+
+    def _derive(self, name: str, rows) -> None:
+        np = self.np
+        inputs, fn = DERIVED[name]
+        if name not in self._cols:
+            self._cols[name] = np.empty(self.n, dtype=object)
+            self._done[name] = np.zeros(self.n, dtype=bool)
+        col, done = self._cols[name], self._done[name]
+        todo = rows[~done[rows]]
+        if not len(todo):
+            return
+        # call fn once per distinct input and broadcast the result back
+        _, first, inverse = np.unique(self._codes(inputs, todo), return_index=True, return_inverse=True)
+        srcs = [self._cols[c] for c in inputs]
+        ctx = self.ctx
+        results = _object_array(np, [fn(*(s[i] for s in srcs), ctx) for i in todo[first]])
+        col[todo] = results[inverse]
+        done[todo] = True
+
+
+def _row_feature(name: str, feats: Dict[str, Any], ctx: PlanContext) -> Any:
+    """Compute (and remember) a derived feature for one action."""
+    if name in _MATCH_PARTS:
+        m = feats["duplicate_match"] if "duplicate_match" in feats else _row_feature("duplicate_match", feats, ctx)
+        v = _MATCH_PARTS[name](m)
+    else:
+        inputs, fn = DERIVED[name]
+        v = fn(*[feats[c] for c in inputs], ctx)
+    feats[name] = v
+    return v
+
+
+def _matches(rule: "_Rule", feats: Dict[str, Any], ctx: PlanContext) -> bool:
+    for k, want in rule.when:
+        v = feats[k] if k in feats else _row_feature(k, feats, ctx)
+        if v != want:
+            return False
+    return True
+
+
+class RulePlanner:
+    """Rule table for one planner, compiled for per-action and batch evaluation."""
+
+    def __init__(self, planner: str, rules: Optional[List[Dict[str, Any]]] = None,
+                 batch_min_actions: int = DEFAULT_BATCH_MIN_ACTIONS):
+        rows = [r for r in (RULES if rules is None else rules) if r.get("planner") in (planner, "*")]
+        self.planner = planner
+        self.rules = [_Rule(r) for r in rows if not r.get("after")]
+        self.overrides = [_Rule(r) for r in rows if r.get("after")]
+        self.batch_min_actions = batch_min_actions
+
+    def plan(self, actions: List[Any], ctx: PlanContext) -> List[Plan]:
+        """Plan Action records (or action dicts), one Plan per action in order."""
+        if len(actions) < self.batch_min_actions:
+            return [self.plan_one(a, ctx) for a in actions]
+        return self.plan_frame(actions, ctx)
+
+    # ---- per action ----------------------------------------------------
+
+    def plan_one(self, action: Any, ctx: PlanContext) -> Plan:
+        record = Action.coerce(action)
+        feats = base_features(record)
+
+        def value(name: str) -> Any:
+            return feats[name] if name in feats else _row_feature(name, feats, ctx)
+
+        chosen = self.rules[-1]
+        for rule in self.rules:
+            if _matches(rule, feats, ctx):
+                chosen = rule
+                break
+        for rule in self.overrides:
+            if chosen.recommendation in rule.after and _matches(rule, feats, ctx):
+                chosen = rule
+                break
+        return chosen.plan(action, record.id, value)
+
+    # ---- batch ---------------------------------------------------------
+
+    def _match(self, frame: _Frame, rule: _Rule, rows):
+        for k, want in rule.when:
+            if not len(rows):
+                break
+            rows = rows[frame.values(k, rows) == want]
+        return rows
+
+    def _emit(self, frame: _Frame, rule: _Rule, rows, actions: List[Any], records: List[Action],
+              out: List[Any]) -> None:
+        # same Plans as _Rule.plan, built column-wise for every row the rule won
+        rec, conf, tool = rule.recommendation, rule.confidence, rule.tool
+        if rule.reason_fields:
+            fields = {f: frame.values(f, rows) for f in rule.reason_fields}
+            reasons = [rule.reason.format_map({f: v[j] for f, v in fields.items()}) for j in range(len(rows))]
+        else:
+            reasons = None
+        spec = [(k, True, frame.values(v.name, rows)) if isinstance(v, Col) else (k, False, v)
+                for k, v in rule.args.items()]
+        for j, i in enumerate(rows.tolist()):
+            a = actions[i]
+            tool_call = None
+            if tool:
+                args = {"action": a}
+                for k, is_col, v in spec:
+                    args[k] = v[j] if is_col else v
+                tool_call = {"name": tool, "args": args}
+            out[i] = Plan(records[i].id, rec, conf, reasons[j] if reasons is not None else rule.reason, tool_call)
+
+    def plan_frame(self, actions: List[Any], ctx: PlanContext) -> List[Plan]:
+        records = [Action.coerce(a) for a in actions]
+        frame = _Frame(records, ctx)
+        np = frame.np
+        n = len(actions)
+        choice = np.full(n, len(self.rules) - 1)
+        pending = np.arange(n)
+        for r, rule in enumerate(self.rules):
+            if not len(pending):
+                break
+            hit = self._match(frame, rule, pending)
+            choice[hit] = r
+            pending = np.setdiff1d(pending, hit, assume_unique=True)
+        rules = self.rules + self.overrides
+        for o, rule in enumerate(self.overrides, start=len(self.rules)):
+            eligible = [r for r, base in enumerate(self.rules) if base.recommendation in rule.after]
+            rows = np.nonzero(np.isin(choice, eligible))[0]
+            choice[self._match(frame, rule, rows)] = o
+
+        out: List[Optional[Plan]] = [None] * n
+        for r, rule in enumerate(rules):
+            rows = np.nonzero(choice == r)[0]
+            if len(rows):
+                self._emit(frame, rule, rows, actions, records, out)
+        return out
+
+
+@lru_cache(maxsize=None)
+def get_planner(planner: str) -> RulePlanner:
+    cfg = get_section("planner")
+    return RulePlanner(planner, batch_min_actions=int(cfg.get("batch_min_actions", DEFAULT_BATCH_MIN_ACTIONS)))
+
+
+def plan_batch(extractor_outputs: List[Dict[str, Any]], planner: str = "refined",
+               ctx: Optional[PlanContext] = None, senders: Optional[List[Optional[str]]] = None) -> List[Dict[str, Any]]:
+    """
+    Plan every action of several extractor outputs in one evaluation (two with
+    frequent senders); one result per output. `senders` are the emails' From
+    headers, as plan_actions_refined(sender=...) takes them.
+    """
+    if ctx is None:
+        from src.task_store import get_store
+        from src.memory import get_memory_store
+        from src.schedule_index import user_timezone
+        from src.dedup_index import detection_enabled
+        store = get_store()
+        ctx = PlanContext(store.schedule_index(user_timezone(get_memory_store().other)),
+                          store.dedup_index() if detection_enabled() else None)
+    frequent = 0
+    if planner == "refined" and senders and any(senders):
+        from src.contacts import get_contact_directory, contacts_config
+        frequent = contacts_config()["frequent_sender_messages"]
+    if frequent:
+        directory = get_contact_directory()
+        is_frequent = [bool(s) and directory.sender_messages(s) >= frequent for s in senders]
+    else:
+        is_frequent = [False] * len(extractor_outputs)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(extractor_outputs)
+    for flag in (False, True):
+        group = [i for i, f in enumerate(is_frequent) if f is flag]
+        if not group:
+            continue
+        group_ctx = PlanContext(ctx.index, ctx.dedup, frequent if flag else 0, frequent)
+        actions = [a for i in group for a in extractor_outputs[i].get("actions", [])]
+        plans = get_planner(planner).plan(actions, group_ctx)
+        pos = 0
+        for i in group:
+            k = len(extractor_outputs[i].get("actions", []))
+            results[i] = {"email_id": extractor_outputs[i].get("email_id"), "plans": plans[pos:pos + k]}
+            pos += k
+    return results
@@ -0,0 +1,293 @@
+"""
+--profile: where a run's time and memory go, per pipeline stage.
+
+The stages are the observability timers (ingest, extract, summarize, plan,
+tool_dispatch, persistence, ...). A profiled run swaps in a ProfilingObserver
+whose timers also switch profilers, so nothing changes when the flag is off:
+
+  - cProfile: one profiler per stage, enabled only while that stage is the
+    innermost one running (summarize inside extract counts as summarize).
+    Code outside every stage goes to "(other)". Each is written to
+    <dir>/<stage>.pstats for pstats / snakeviz.
+  - tracemalloc: peak traced memory per stage (innermost, as above) and for
+    the run. The allocation snapshot taken at the stage boundary with the most
+    live memory is written to <dir>/memory.tracemalloc, and its largest
+    allocation sites are listed in the report.
+  - stack samples: a background thread samples the main thread's stack every
+    ``sample_interval_ms``. Samples are written to <dir>/stacks.collapsed, one
+    "stage;outer;...;inner count" line per stack, for flamegraph.pl /
+    speedscope / inferno.
+
+Entry points check for the flag themselves and import this module only when it
+is given, so an unprofiled run does not pay for importing it.
+
+Only the current process is profiled: with --workers N, extraction in the
+worker processes is not covered (profile with --workers 1).
+
+Config (config/project_config.yaml -> profiling):
+  dir, sample_interval_ms, tracemalloc_frames, top
+
+    python -m src.agent_main_refined emails.jsonl --profile
+    python -m src.agent_main --profile
+    python -m src.run_tools_test --profile
+"""
+import os
+import sys
+import time
+import atexit
+import pstats
+import cProfile
+import sysconfig
+import threading
+import tracemalloc
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+from src.config import get_section
+from src.observability import Observer, get_observer, set_observer
+
+ROOT = Path(__file__).resolve().parents[1]
+PROFILE_DIR = ROOT / "profile"
+OTHER = "(other)"
+_STDLIB = Path(sysconfig.get_paths()["stdlib"]).resolve()
+
+
+def profile_config() -> Dict[str, Any]:
+    cfg = get_section("profiling")
+    path = Path(cfg.get("dir") or PROFILE_DIR)
+    if not path.is_absolute():
+        path = ROOT / path
+    return {
+        "dir": path,
+        "sample_interval_ms": float(cfg.get("sample_interval_ms", 5)),
+        "tracemalloc_frames": int(cfg.get("tracemalloc_frames", 10)),
+        "top": int(cfg.get("top", 10)),
+    }
+
+
+@lru_cache(maxsize=4096)
+def _frame_file(filename: str) -> str:
+    # repo files as src/tools.py, the stdlib as json/encoder.py, installed packages from their package directory on
+    p = Path(filename)
+    parts = p.parts
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            return "/".join(parts[parts.index(marker) + 1:])
+    for base in (ROOT, _STDLIB):
+        try:
+            return p.resolve().relative_to(base).as_posix()
+        except (ValueError, OSError):
+            pass
+    return p.name
+
+
+class _ProfiledTimer:
+    __slots__ = ("obs", "stage", "t0")
+
+    def __init__(self, obs: "ProfilingObserver", stage: str):
+        self.obs = obs
+        self.stage = stage
+
+    def __enter__(self):
+        self.obs.session.enter(self.stage)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.obs.observe(self.stage, time.perf_counter() - self.t0)
+        self.obs.session.exit(self.stage)
+        return False
+
+
+class ProfilingObserver(Observer):
+    """Observer whose stage timers also switch the session's per-stage profilers."""
+    profiling = True
+
+    def __init__(self, session: "ProfileSession", **kwargs):
+        super().__init__(**kwargs)
+        self.session = session
+
+    def timer(self, stage: str) -> _ProfiledTimer:
+        return _ProfiledTimer(self, stage)
+
+
+class ProfileSession:
+    def __init__(self, out_dir: Optional[Path] = None, sample_interval_ms: Optional[float] = None,
+                 tracemalloc_frames: Optional[int] = None):
+        cfg = profile_config()
+        self.out_dir = Path(out_dir or cfg["dir"])
+        self.interval = (sample_interval_ms or cfg["sample_interval_ms"]) / 1000.0
+        self.frames = tracemalloc_frames or cfg["tracemalloc_frames"]
+        self.profilers: Dict[str, cProfile.Profile] = {}
+        self.stack: List[str] = [OTHER]
+        self.peaks: Dict[str, int] = {}
+        self.samples: Dict[str, int] = {}
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self._snapshot_size = 0
+        self._main = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self.active = False
+        self.wall = 0.0
+        self.peak = 0
+
+    # ---- stage switching -------------------------------------------------
+
+    def _profiler(self, stage: str) -> cProfile.Profile:
+        prof = self.profilers.get(stage)
+        if prof is None:
+            prof = self.profilers[stage] = cProfile.Profile()
+        return prof
+
+    def _account_memory(self, stage: str) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        if peak > self.peaks.get(stage, 0):
+            self.peaks[stage] = peak
+        tracemalloc.reset_peak()
+        # keep the snapshot from the boundary with the most live memory (25% steps: snapshots are costly)
+        if current > self._snapshot_size * 1.25:
+            self.snapshot = tracemalloc.take_snapshot()
+            self._snapshot_size = current
+
+    def enter(self, stage: str) -> None:
+        if not self.active:
+            return
+        outer = self.stack[-1]
+        self.profilers[outer].disable()
+        self._account_memory(outer)
+        self.stack.append(stage)
+        self._profiler(stage).enable()
+
+    def exit(self, stage: str) -> None:
+        if not self.active:
+            return
+        top = self.stack[-1]
+        self.profilers[top].disable()
+        self._account_memory(top)
+        # normally the innermost stage; a timer held across a generator's yield may close out of order
+        for i in range(len(self.stack) - 1, 0, -1):
+            if self.stack[i] == stage:
+                del self.stack[i]
+                break
+        self.profilers[self.stack[-1]].enable()
+
+    # ---- stack sampling --------------------------------------------------
+
+    def _sample(self) -> None:
+        frames = sys._current_frames
+        while not self._stop.wait(self.interval):
+            frame = frames().get(self._main)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{_frame_file(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            names.append(self.stack[-1])
+            key = ";".join(reversed(names))
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    # ---- session ---------------------------------------------------------
+
+    def start(self) -> "ProfileSession":
+        tracemalloc.start(self.frames)
+        # stages recorded so far carry over into the profiling observer
+        prev = get_observer()
+        obs = ProfilingObserver(self, log_path=prev.log_path, metrics_path=prev.metrics_path,
+                                flush_every=prev.flush_every, flush_interval=prev.flush_interval,
+                                autoflush=prev.autoflush)
+        obs.merge(prev.drain())
+        set_observer(obs)
+        atexit.register(obs.flush)
+        self._sampler = threading.Thread(target=self._sample, name="profile-sampler", daemon=True)
+        self._sampler.start()
+        self.wall = time.perf_counter()
+        self.active = True
+        self._profiler(OTHER).enable()
+        return self
+
+    def stop(self) -> None:
+        # stage timers used after this (e.g. at exit) only record latencies
+        self.active = False
+        for prof in self.profilers.values():
+            prof.disable()
+        self.wall = time.perf_counter() - self.wall
+        self._stop.set()
+        self._sampler.join()
+        self._account_memory(self.stack[-1])
+        self.peak = max(self.peaks.values(), default=0)
+        if self.snapshot is None:
+            self.snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    def __enter__(self) -> "ProfileSession":
+        return self.start()
+
+    def __exit__(self, *exc) -> bool:
+        self.stop()
+        self.write()
+        print(self.report(), file=sys.stderr)
+        return False
+
+    # ---- output ----------------------------------------------------------
+
+    def write(self) -> None:
+        """<stage>.pstats per stage, stacks.collapsed and memory.tracemalloc under out_dir."""
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        for stage, prof in self.profilers.items():
+            prof.dump_stats(str(self.out_dir / f"{_file_stem(stage)}.pstats"))
+        tmp = self.out_dir / f"stacks.collapsed.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.samples.items()):
+                f.write(f"{stack} {count}\n")
+        os.replace(tmp, self.out_dir / "stacks.collapsed")
+        self.snapshot.dump(str(self.out_dir / "memory.tracemalloc"))
+
+    def _stage_stats(self) -> List[Tuple[str, pstats.Stats]]:
+        out = []
+        for stage, prof in self.profilers.items():
+            try:
+                out.append((stage, pstats.Stats(prof)))
+            except TypeError:
+                continue  # enabled but never ran any code
+        return sorted(out, key=lambda s: s[1].total_tt, reverse=True)
+
+    def report(self, top: Optional[int] = None) -> str:
+        top = top or profile_config()["top"]
+        mb = 1024 * 1024
+        stats = self._stage_stats()
+        lines = [f"profile: {self.out_dir}", f"  wall time {self.wall:8.3f} s   peak traced memory {self.peak / mb:8.1f} MB",
+                 "", f"  {'stage':<16} {'cpu s':>9} {'peak MB':>9}"]
+        for stage, st in stats:
+            lines.append(f"  {stage:<16} {st.total_tt:9.3f} {self.peaks.get(stage, 0) / mb:9.1f}")
+        for stage, st in stats:
+            rows = sorted(st.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:top]
+            if not rows:
+                continue
+            lines += ["", f"  {stage}: top functions by own time", f"  {'own s':>9} {'cum s':>9} {'calls':>9}  function"]
+            for (filename, line, func), (_, calls, tt, ct, _) in rows:
+                where = f" ({_frame_file(filename)}:{line})" if line else ""
+                lines.append(f"  {tt:9.3f} {ct:9.3f} {calls:9d}  {func}{where}")
+        sites = self.snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        )).statistics("lineno")[:top]
+        lines += ["", "  largest live allocation sites (highest-memory stage boundary)"]
+        for s in sites:
+            frame = s.traceback[0]
+            lines.append(f"  {s.size / mb:9.2f} MB {s.count:9d} blocks  {_frame_file(frame.filename)}:{frame.lineno}")
+        lines += ["", f"  files: <stage>.pstats, stacks.collapsed ({sum(self.samples.values())} samples), memory.tracemalloc"]
+        return "\n".join(lines)
+
+
+def _file_stem(stage: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in stage).strip("_") or "stage"
+
+
+def run_profiled(fn: Callable[..., Any], *args, out_dir: Optional[Path] = None, **kwargs) -> Any:
+    """Call fn(*args, **kwargs) under a ProfileSession; write the profile and print its report to stderr."""
+    with ProfileSession(out_dir):
+        return fn(*args, **kwargs)
@@ -0,0 +1,226 @@
+"""
+Compact record types for the objects that flow through the pipeline.
+
+Email, Action, Plan and Task (plus Contact) are frozen, slotted dataclasses:
+no per-instance __dict__, no repeated string keys, and safe to share without
+defensive copies. Changes go through replace(), which returns a new record.
+
+Wire format is unchanged (io_schemas.md, task_schema.json): to_dict() /
+from_dict() convert field by field, to_json() / from_json() wrap them, and
+to_jsonable() can be passed as json.dumps(default=...). Keys a record does not
+model (e.g. extra fields on an input email or stored task) are kept in `extra`
+and written back out, so a from_dict/to_dict round trip is lossless.
+
+Records also answer read-only dict-style lookups (r["title"], r.get("dates"))
+with their wire keys, so code written against the dict shapes keeps working.
+Sequences come back as tuples.
+"""
+import json
+import dataclasses
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple, ClassVar, Mapping
+
+
+class Record(ABC):
+    """Base for the record types; subclasses define the wire format in to_dict() / from_dict()."""
+    __slots__ = ()
+    # wire key -> attribute name, where they differ
+    _ALIASES: ClassVar[Dict[str, str]] = {}
+
+    def __getitem__(self, key: str) -> Any:
+        attr = self._ALIASES.get(key, key)
+        if attr in self.__dataclass_fields__ and attr != "extra":
+            return getattr(self, attr)
+        extra = getattr(self, "extra", None)
+        if extra and key in extra:
+            return extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def replace(self, **changes: Any) -> "Record":
+        return dataclasses.replace(self, **changes)
+
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        ...
+
+    @classmethod
+    @abstractmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "Record":
+        ...
+
+    @classmethod
+    def coerce(cls, obj: Any) -> "Record":
+        """Return obj if it already is a record of this type, else build one from a mapping."""
+        return obj if isinstance(obj, cls) else cls.from_dict(obj or {})
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Record":
+        return cls.from_dict(json.loads(text))
+
+    # explicit pickle support (frozen + slots dataclasses lack it on older 3.10 releases)
+    def __getstate__(self):
+        return tuple(getattr(self, f) for f in self.__dataclass_fields__)
+
+    def __setstate__(self, state) -> None:
+        for f, v in zip(self.__dataclass_fields__, state):
+            object.__setattr__(self, f, v)
+
+
+def _extra(d: Mapping[str, Any], known: frozenset) -> Optional[Dict[str, Any]]:
+    extra = {k: v for k, v in d.items() if k not in known}
+    return extra or None
+
+
+@dataclass(frozen=True, slots=True)
+class Contact(Record):
+    name: Optional[str] = None
+    email: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "email": self.email}
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "Contact":
+        return cls(d.get("name"), d.get("email"))
+
+
+_EMAIL_KEYS = frozenset(("email_id", "id", "subject", "body", "from", "to", "received_at"))
+
+
+@dataclass(frozen=True, slots=True)
+class Email(Record):
+    _ALIASES: ClassVar[Dict[str, str]] = {"from": "sender", "id": "email_id"}
+
+    email_id: Any = None
+    subject: str = ""
+    body: str = ""
+    sender: Optional[str] = None
+    to: Optional[str] = None
+    received_at: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+    # where the email was read from (set by src.ingest; not part of the wire format)
+    source: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {"email_id": self.email_id, "subject": self.subject, "body": self.body,
+             "from": self.sender, "to": self.to, "received_at": self.received_at}
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "Email":
+        # input files use "id"; io_schemas.md uses "email_id"
+        email_id = d.get("email_id")
+        if email_id is None:
+            email_id = d.get("id")
+        return cls(email_id, d.get("subject") or "", d.get("body") or "", d.get("from"), d.get("to"),
+                   d.get("received_at"), _extra(d, _EMAIL_KEYS))
+
+
+@dataclass(frozen=True, slots=True)
+class Action(Record):
+    id: Optional[str] = None
+    type: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    dates: Tuple[str, ...] = ()
+    contacts: Tuple[Contact, ...] = ()
+    priority: Optional[str] = None
+    confidence: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "type": self.type, "title": self.title, "description": self.description,
+                "dates": list(self.dates), "contacts": [c.to_dict() for c in self.contacts],
+                "priority": self.priority, "confidence": self.confidence}
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "Action":
+        return cls(d.get("id"), d.get("type"), d.get("title"), d.get("description"),
+                   tuple(d.get("dates") or ()), tuple(Contact.coerce(c) for c in d.get("contacts") or ()),
+                   d.get("priority"), d.get("confidence"))
+
+
+def _tool_call_to_dict(tool_call: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not tool_call:
+        return tool_call
+    args = {k: (v.to_dict() if isinstance(v, Record) else v) for k, v in (tool_call.get("args") or {}).items()}
+    return {"name": tool_call.get("name"), "args": args}
+
+
+@dataclass(frozen=True, slots=True)
+class Plan(Record):
+    action_id: Optional[str] = None
+    recommendation: str = "ignore"
+    confidence: float = 0.0
+    reason: str = ""
+    tool_call: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"action_id": self.action_id, "recommendation": self.recommendation,
+                "confidence": self.confidence, "reason": self.reason,
+                "tool_call": _tool_call_to_dict(self.tool_call)}
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "Plan":
+        tool_call = d.get("tool_call")
+        if tool_call and isinstance((tool_call.get("args") or {}).get("action"), Mapping):
+            args = dict(tool_call["args"])
+            args["action"] = Action.from_dict(args["action"])
+            tool_call = {"name": tool_call.get("name"), "args": args}
+        return cls(d.get("action_id"), d.get("recommendation") or "ignore", float(d.get("confidence") or 0.0),
+                   d.get("reason") or "", tool_call)
+
+
+_TASK_KEYS = frozenset(("task_id", "title", "description", "created_at", "due", "status",
+                        "source_email_id", "priority", "tags", "end"))
+
+
+@dataclass(frozen=True, slots=True)
+class Task(Record):
+    task_id: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    created_at: Optional[str] = None
+    due: Optional[str] = None
+    status: str = "pending"
+    source_email_id: Optional[str] = None
+    priority: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+    end: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {"task_id": self.task_id, "title": self.title, "description": self.description,
+             "created_at": self.created_at, "due": self.due, "status": self.status,
+             "source_email_id": self.source_email_id, "priority": self.priority, "tags": list(self.tags)}
+        if self.end is not None:
+            d["end"] = self.end
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "Task":
+        return cls(d.get("task_id"), d.get("title"), d.get("description"), d.get("created_at"), d.get("due"),
+                   d.get("status") or "pending", d.get("source_email_id"), d.get("priority"),
+                   tuple(d.get("tags") or ()), d.get("end"), _extra(d, _TASK_KEYS))
+
+
+def to_jsonable(obj: Any) -> Any:
+    """json.dumps default= hook: records become their wire dicts."""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, tuple):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
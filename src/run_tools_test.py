@@ -1,13 +1,16 @@
 # src/run_tools_test.py
+import sys
 import json
 from pathlib import Path
 
 from src.tools import extract_actions, create_task
-from src.memory import add_recent_email
+from src.memory import add_recent_email, flush_memory
+from src.task_store import get_store
+from src.records import to_jsonable
+from src.observability import timer
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_PATH = ROOT / "data" / "examples_emails.json"
-TASKS_PATH = ROOT / "tasks.json"
 
 
 def main():
@@ -19,7 +22,8 @@ def main():
         body = e.get("body", "")
         print("=" * 60)
         print("Email subject:", subject)
-        out = extract_actions(subject, body)
+        with timer("extract"):
+            out = extract_actions(subject, body)
         print("Summary:", out["summary_text"])
         actions = out.get("actions", [])
         # attach email id to source for create_task
@@ -30,22 +34,30 @@ def main():
             print("Action detected:", a["type"], "| Title:", a["title"], "| Dates:", a["dates"])
             # simple rule: create task if invoice, or if task, or schedule with exact date
             if a["type"] in ("invoice", "task"):
-                res = create_task(a, source_email)
+                with timer("tool_dispatch"):
+                    res = create_task(a, source_email)
                 print("Created task:", res)
             elif a["type"] == "schedule" and a.get("dates"):
                 # create task for schedule as a placeholder event
-                res = create_task(a, source_email)
+                with timer("tool_dispatch"):
+                    res = create_task(a, source_email)
                 print("Created schedule placeholder task:", res)
             else:
                 print("No auto-action taken for this item.")
 
-    # final tasks.json print
-    if TASKS_PATH.exists():
-        with open(TASKS_PATH, "r", encoding="utf-8") as f:
-            tasks = json.load(f)
-        print("\nFinal tasks.json content:")
-        print(json.dumps(tasks, indent=2, ensure_ascii=False))
+    with timer("persistence"):
+        flush_memory()
+
+    # final task store print
+    print("\nFinal task store content:")
+    print(json.dumps({"tasks": get_store().all_tasks()}, indent=2, ensure_ascii=False, default=to_jsonable))
 
 
 if __name__ == "__main__":
-    main()
+    # --profile: per-stage cProfile / tracemalloc / collapsed stacks (src/profiling.py)
+    if "--profile" in sys.argv:
+        from src.profiling import run_profiled
+        sys.argv = [a for a in sys.argv if a != "--profile"]
+        run_profiled(main)
+    else:
+        main()
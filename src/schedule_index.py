@@ -0,0 +1,136 @@
+"""
+Interval index over scheduled task times.
+
+Tasks are stored as [start, end) intervals in UTC epoch seconds, kept sorted by
+start. An overlap query bisects the start list between (query_start - longest
+interval) and query_end, so a conflict check costs O(log n + k) instead of a
+scan over every task. Naive ISO timestamps are interpreted in the user's
+timezone (memory.user_profile.preferences.timezone) before normalising to UTC.
+"""
+import bisect
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # pragma: no cover - python < 3.9
+    ZoneInfo = None
+
+DEFAULT_DURATION_MINUTES = 60
+
+
+def resolve_tz(tz_name: Optional[str]):
+    """Return a tzinfo for tz_name, falling back to UTC if unknown."""
+    if tz_name and ZoneInfo is not None:
+        try:
+            return ZoneInfo(tz_name)
+        except Exception:
+            pass
+    return timezone.utc
+
+
+def user_timezone(memory: Optional[Dict[str, Any]]) -> Optional[str]:
+    return ((memory or {}).get("user_profile", {}).get("preferences", {}) or {}).get("timezone")
+
+
+def to_epoch(dt_str: Optional[str], tz) -> Optional[float]:
+    """Parse an ISO string into UTC epoch seconds; naive values use tz."""
+    if not dt_str:
+        return None
+    try:
+        dt = datetime.fromisoformat(dt_str)
+    except (TypeError, ValueError):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=tz)
+    return dt.timestamp()
+
+
+def merge_intervals(spans: Iterable[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Union of [start, end) spans given in start order, as disjoint sorted spans."""
+    merged: List[Tuple[float, float]] = []
+    for s, e in spans:
+        if merged and s <= merged[-1][1]:
+            if e > merged[-1][1]:
+                merged[-1] = (merged[-1][0], e)
+        else:
+            merged.append((s, e))
+    return merged
+
+
+class IntervalIndex:
+    def __init__(self, tz_name: Optional[str] = None, default_minutes: int = DEFAULT_DURATION_MINUTES):
+        self.tz_name = tz_name
+        self.tz = resolve_tz(tz_name)
+        self.default_seconds = default_minutes * 60
+        self._starts: List[float] = []
+        self._ends: List[float] = []
+        self._keys: List[Any] = []
+        self._max_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _span(self, start_iso: str, end_iso: Optional[str] = None):
+        start = to_epoch(start_iso, self.tz)
+        if start is None:
+            return None
+        end = to_epoch(end_iso, self.tz) if end_iso else None
+        if end is None or end <= start:
+            end = start + self.default_seconds
+        return start, end
+
+    def add(self, start_iso: str, end_iso: Optional[str] = None, key: Any = None) -> bool:
+        span = self._span(start_iso, end_iso)
+        if span is None:
+            return False
+        start, end = span
+        i = bisect.bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+        self._keys.insert(i, key)
+        self._max_len = max(self._max_len, end - start)
+        return True
+
+    def remove(self, start_iso: str, key: Any) -> bool:
+        start = to_epoch(start_iso, self.tz)
+        if start is None:
+            return False
+        i = bisect.bisect_left(self._starts, start)
+        while i < len(self._starts) and self._starts[i] == start:
+            if self._keys[i] == key:
+                del self._starts[i]
+                del self._ends[i]
+                del self._keys[i]
+                return True
+            i += 1
+        return False
+
+    def overlapping(self, start_iso: str, end_iso: Optional[str] = None) -> List[Any]:
+        """Keys of all intervals that overlap [start, end)."""
+        span = self._span(start_iso, end_iso)
+        if span is None:
+            return []
+        qs, qe = span
+        lo = bisect.bisect_right(self._starts, qs - self._max_len)
+        hi = bisect.bisect_left(self._starts, qe)
+        return [self._keys[i] for i in range(lo, hi) if self._ends[i] > qs]
+
+    def overlaps(self, start_iso: str, end_iso: Optional[str] = None) -> bool:
+        return bool(self.overlapping(start_iso, end_iso))
+
+    def busy(self, start: float, end: float) -> List[Tuple[float, float]]:
+        """Merged busy time within epoch range [start, end), as disjoint sorted spans clipped to it."""
+        lo = bisect.bisect_right(self._starts, start - self._max_len)
+        hi = bisect.bisect_left(self._starts, end)
+        return merge_intervals((max(self._starts[i], start), min(self._ends[i], end))
+                               for i in range(lo, hi) if self._ends[i] > start)
+
+
+def build_index(tasks: Iterable[Dict[str, Any]], tz_name: Optional[str] = None) -> IntervalIndex:
+    """Build an interval index over tasks' due (start) and optional end times."""
+    idx = IntervalIndex(tz_name)
+    for t in tasks:
+        if t.get("due"):
+            idx.add(t["due"], t.get("end"), key=t.get("task_id"))
+    return idx
@@ -0,0 +1,628 @@
+"""
+SQLite storage backend for tasks and memory (config: storage.backend: sqlite).
+
+One database file in WAL mode holds:
+
+  tasks          one row per live task: the task_schema.json document plus the
+                 columns queries filter on, indexed on due, status, priority,
+                 source_email_id, start_ts (schedule) and created_ts (dedup window)
+  task_bands     LSH band ids of recently created tasks, indexed on band
+  memory_kv, recent_emails, tasks_index
+                 memory.json, split so an update only writes the rows it changes
+  contacts       the contact directory (src/contacts.py), one row per address
+  meta           parameters the derived columns were computed with
+
+SqliteTaskStore, SqliteMemoryStore and SqliteContactDirectory have the same
+interface as TaskStore, MemoryStore and ContactDirectory. get_store(),
+get_memory_store() and get_contact_directory() pick the backend, so tools.py,
+memory.py and the planners run unchanged. The planners' conflict and duplicate
+checks become indexed SQL range / IN queries (SqlScheduleIndex,
+SqlDuplicateIndex), so nothing has to be rebuilt in memory from every task.
+
+append_many() inserts a batch in one transaction. Inside batch() appends are
+held in memory and written in one short transaction when the block exits, so
+the write lock is never held while emails are extracted or planned and other
+processes writing to the database are not locked out. The planners' conflict
+and duplicate checks see the held tasks through in-memory overlays on the SQL
+indexes. Other queries (and a timezone change) write the held tasks first.
+Memory updates are buffered until flush(), like the JSON store. The stores use
+one connection per database file (shared_connection()). On first open,
+existing task_store/ segments (or tasks.json), memory.json and contacts.json
+are imported.
+
+CLI:
+    python -m src.sqlite_store import [--tasks tasks.json] [--memory memory.json] [--db mailsense.db]
+    python -m src.sqlite_store export [--tasks tasks.json] [--memory memory.json] [--db mailsense.db]
+    python -m src.sqlite_store compact [--db mailsense.db]
+"""
+import os
+import copy
+import json
+import sqlite3
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Union, Iterable
+
+from src.config import get_section
+from src.records import Task
+from src.schedule_index import IntervalIndex, merge_intervals
+from src.dedup_index import (DuplicateIndex, MIN_SHINGLES, band_id, shingles, jaccard, task_text, _created_epoch,
+                              duplicate_params)
+from src.task_store import TaskStore, STORE_DIR, LEGACY_TASKS_PATH
+from src.memory import MemoryStore, MEMORY_PATH, DEFAULT_MEMORY, RECENT_EMAILS_LIMIT
+from src.contacts import ContactDirectory, CONTACTS_PATH
+
+ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = ROOT / "mailsense.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    due TEXT,
+    status TEXT,
+    priority TEXT,
+    source_email_id TEXT,
+    created_ts REAL,
+    start_ts REAL,
+    end_ts REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_due ON tasks(due);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status, priority);
+CREATE INDEX IF NOT EXISTS tasks_priority ON tasks(priority);
+CREATE INDEX IF NOT EXISTS tasks_source ON tasks(source_email_id);
+CREATE INDEX IF NOT EXISTS tasks_start ON tasks(start_ts);
+CREATE INDEX IF NOT EXISTS tasks_created ON tasks(created_ts);
+CREATE TABLE IF NOT EXISTS task_bands (band INTEGER NOT NULL, task_id TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS task_bands_band ON task_bands(band);
+CREATE INDEX IF NOT EXISTS task_bands_task ON task_bands(task_id);
+CREATE TABLE IF NOT EXISTS memory_kv (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS recent_emails (seq INTEGER PRIMARY KEY AUTOINCREMENT, doc TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS tasks_index (seq INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS contacts (
+    address TEXT PRIMARY KEY,
+    name TEXT,
+    messages INTEGER NOT NULL,
+    sent INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+"""
+
+_UPSERT_TASK = """
+INSERT INTO tasks (task_id, due, status, priority, source_email_id, created_ts, start_ts, end_ts, doc)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(task_id) DO UPDATE SET
+    due = excluded.due, status = excluded.status, priority = excluded.priority,
+    source_email_id = excluded.source_email_id, created_ts = excluded.created_ts,
+    start_ts = excluded.start_ts, end_ts = excluded.end_ts, doc = excluded.doc
+"""
+
+# counts are added, so another process's updates since our load are kept
+_UPSERT_CONTACT = """
+INSERT INTO contacts (address, name, messages, sent, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(address) DO UPDATE SET
+    name = COALESCE(excluded.name, contacts.name),
+    messages = contacts.messages + excluded.messages, sent = contacts.sent + excluded.sent,
+    first_seen = MIN(contacts.first_seen, excluded.first_seen), last_seen = MAX(contacts.last_seen, excluded.last_seen)
+"""
+
+
+def sqlite_enabled() -> bool:
+    return get_section("storage").get("backend", "files") == "sqlite"
+
+
+def db_path() -> Path:
+    p = Path(get_section("storage").get("sqlite_path") or DB_PATH)
+    return p if p.is_absolute() else ROOT / p
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open (and if needed create) the database in autocommit mode; transactions are explicit."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # callers serialise access (the daemon handles one request at a time, on any thread)
+    conn = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+_CONNECTIONS: Dict[str, sqlite3.Connection] = {}
+
+
+def shared_connection(path: Path) -> sqlite3.Connection:
+    """The process-wide connection to the database at path, opened on first use."""
+    key = str(Path(path).resolve())
+    if key not in _CONNECTIONS:
+        _CONNECTIONS[key] = connect(path)
+    return _CONNECTIONS[key]
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    if conn.in_transaction:
+        # inside an enclosing transaction: commit with it
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _get_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: str) -> None:
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def _load_task(doc: str) -> Task:
+    return Task.from_dict(json.loads(doc))
+
+
+# ---- planner indexes ---------------------------------------------------
+
+
+class SqlScheduleIndex(IntervalIndex):
+    """
+    IntervalIndex answered by a range query on tasks.start_ts / end_ts, plus an
+    in-memory index of the tasks SqliteTaskStore.batch() has not written yet.
+    """
+
+    def __init__(self, store: "SqliteTaskStore", tz_name: Optional[str] = None):
+        super().__init__(tz_name)
+        self.store = store
+        self._max_len = store.conn.execute("SELECT MAX(end_ts - start_ts) FROM tasks").fetchone()[0] or 0.0
+        self.clear_pending()
+
+    def __len__(self) -> int:
+        self.store.write_pending()
+        return self.store.conn.execute("SELECT COUNT(*) FROM tasks WHERE start_ts IS NOT NULL").fetchone()[0]
+
+    def add_pending(self, task: Task) -> None:
+        if task.due:
+            self._pending.add(task.due, task.end, key=task.task_id)
+
+    def remove_pending(self, task: Task) -> None:
+        if task.due:
+            self._pending.remove(task.due, task.task_id)
+
+    def clear_pending(self) -> None:
+        self._pending = IntervalIndex(self.tz_name)
+
+    def span(self, start_iso: Optional[str], end_iso: Optional[str] = None) -> Tuple[Optional[float], Optional[float]]:
+        span = self._span(start_iso, end_iso) if start_iso else None
+        if span is None:
+            return None, None
+        self._max_len = max(self._max_len, span[1] - span[0])
+        return span
+
+    def overlapping(self, start_iso: str, end_iso: Optional[str] = None) -> List[Any]:
+        span = self._span(start_iso, end_iso)
+        if span is None:
+            return []
+        qs, qe = span
+        rows = self.store.conn.execute(
+            "SELECT task_id FROM tasks WHERE start_ts > ? AND start_ts < ? AND end_ts > ? ORDER BY start_ts",
+            (qs - self._max_len, qe, qs))
+        # a held newer version of a task replaces its row
+        held = self.store.held
+        return [r[0] for r in rows if r[0] not in held] + self._pending.overlapping(start_iso, end_iso)
+
+    def busy(self, start: float, end: float) -> List[Tuple[float, float]]:
+        rows = self.store.conn.execute(
+            "SELECT task_id, start_ts, end_ts FROM tasks WHERE start_ts > ? AND start_ts < ? AND end_ts > ? ORDER BY start_ts",
+            (start - self._max_len, end, start))
+        held = self.store.held
+        spans = [(max(s, start), min(e, end)) for tid, s, e in rows if tid not in held]
+        if len(self._pending):
+            spans = sorted(spans + self._pending.busy(start, end))
+        return merge_intervals(spans)
+
+
+class SqlDuplicateIndex(DuplicateIndex):
+    """
+    DuplicateIndex whose band buckets live in the task_bands table. The tasks
+    SqliteTaskStore.batch() has not written yet are kept in the inherited
+    in-memory buckets.
+    """
+
+    def __init__(self, store: "SqliteTaskStore", **params: Any):
+        super().__init__(**params)
+        self.store = store
+
+    def __len__(self) -> int:
+        self.store.write_pending()
+        cutoff = datetime.now().timestamp() - self.window
+        return self.store.conn.execute("SELECT COUNT(*) FROM tasks WHERE created_ts >= ?", (cutoff,)).fetchone()[0]
+
+    def band_rows(self, task: Task, now: float) -> List[Tuple[int, str]]:
+        """(band id, task_id) rows for a task created within the window."""
+        created = _created_epoch(task.created_at)
+        if not task.task_id or created is None or created < now - self.window:
+            return []
+        _, keys = self.sketch(task.title, task.description)
+        return [(band_id(k), task.task_id) for k in keys]
+
+    def find(self, title: Optional[str], description: Optional[str],
+             now: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        now = datetime.now().timestamp() if now is None else now
+        sh, keys = self.sketch(title, description)
+        if len(sh) < MIN_SHINGLES:
+            return None
+        bands = [band_id(k) for k in keys]
+        rows = self.store.conn.execute(
+            "SELECT task_id, doc FROM tasks WHERE created_ts >= ? AND task_id IN "
+            f"(SELECT task_id FROM task_bands WHERE band IN ({','.join('?' * len(bands))})) ORDER BY rowid",
+            (now - self.window, *bands))
+        best = None
+        held = self.store.held
+        for tid, doc in rows:
+            if tid in held:
+                continue
+            d = json.loads(doc)
+            sim = jaccard(sh, shingles(task_text(d.get("title"), d.get("description"))))
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (tid, sim)
+        pending = super().find(title, description, now)
+        if pending is not None and (best is None or pending[1] > best[1]):
+            best = pending
+        return best
+
+    def clear_pending(self) -> None:
+        self._entries.clear()
+        self._buckets.clear()
+        self._expiry.clear()
+
+
+# ---- task store --------------------------------------------------------
+
+
+class SqliteTaskStore:
+    def __init__(self, path: Path = DB_PATH, legacy_dir: Optional[Path] = STORE_DIR,
+                 legacy_path: Optional[Path] = LEGACY_TASKS_PATH):
+        self.path = Path(path)
+        self.conn = shared_connection(self.path)
+        # task_id -> newest version of each task appended inside batch(), not yet written
+        self._held: Optional[Dict[str, Task]] = None
+        self._schedule = SqlScheduleIndex(self, _get_meta(self.conn, "schedule_tz") or None)
+        self._dedup = SqlDuplicateIndex(self, **duplicate_params())
+        if _get_meta(self.conn, "dedup_params") != self._dedup_key():
+            self._rebuild_bands()
+        if _get_meta(self.conn, "tasks_initialized") is None:
+            self._import_legacy(legacy_dir, legacy_path)
+
+    def _import_legacy(self, legacy_dir: Optional[Path], legacy_path: Optional[Path]) -> None:
+        # first open: take over the segment store, else a legacy tasks.json
+        if legacy_dir and Path(legacy_dir).exists() and any(Path(legacy_dir).iterdir()):
+            self.append_many(TaskStore(legacy_dir, legacy_path=None).all_tasks())
+        elif legacy_path and Path(legacy_path).exists():
+            self.import_json(legacy_path)
+        with transaction(self.conn):
+            _set_meta(self.conn, "tasks_initialized", datetime.now().isoformat(timespec="seconds"))
+
+    def close(self) -> None:
+        _CONNECTIONS.pop(str(self.path.resolve()), None)
+        self.conn.close()
+
+    # ---- derived columns ----------------------------------------------
+
+    def _dedup_key(self) -> str:
+        d = self._dedup
+        return json.dumps([d.hasher.num_perm, d.bands])
+
+    def _row(self, t: Task) -> tuple:
+        start, end = self._schedule.span(t.due, t.end)
+        return (t.task_id, t.due, t.status, t.priority, t.source_email_id, _created_epoch(t.created_at),
+                start, end, json.dumps(t.to_dict(), ensure_ascii=False))
+
+    def _rebuild_bands(self) -> None:
+        now = datetime.now().timestamp()
+        with transaction(self.conn):
+            self.conn.execute("DELETE FROM task_bands")
+            rows = self.conn.execute("SELECT doc FROM tasks WHERE created_ts >= ?", (now - self._dedup.window,)).fetchall()
+            for (doc,) in rows:
+                self.conn.executemany("INSERT INTO task_bands (band, task_id) VALUES (?, ?)",
+                                      self._dedup.band_rows(_load_task(doc), now))
+            _set_meta(self.conn, "dedup_params", self._dedup_key())
+
+    # ---- writes --------------------------------------------------------
+
+    def append(self, task: Union[Task, Dict[str, Any]]) -> None:
+        """Append a task (or a newer version of an existing task)."""
+        self.append_many([task])
+
+    def append_many(self, tasks: Iterable[Union[Task, Dict[str, Any]]]) -> None:
+        """Insert or update several tasks in one transaction (inside batch(): when the block exits)."""
+        tasks = [t for t in (Task.coerce(t) for t in tasks) if t.task_id]
+        if not tasks:
+            return
+        if self._held is not None:
+            for t in tasks:
+                old = self._held.pop(t.task_id, None)
+                if old is not None:
+                    self._schedule.remove_pending(old)
+                self._held[t.task_id] = t
+                self._schedule.add_pending(t)
+                self._dedup.add(t)
+            return
+        self._write(tasks)
+
+    def _write(self, tasks: List[Task]) -> None:
+        now = datetime.now().timestamp()
+        bands = [row for t in tasks for row in self._dedup.band_rows(t, now)]
+        with transaction(self.conn):
+            self.conn.executemany("DELETE FROM task_bands WHERE task_id = ?", [(t.task_id,) for t in tasks])
+            self.conn.executemany(_UPSERT_TASK, [self._row(t) for t in tasks])
+            self.conn.executemany("INSERT INTO task_bands (band, task_id) VALUES (?, ?)", bands)
+
+    @property
+    def held(self) -> Dict[str, Task]:
+        """Tasks appended inside batch() and not written yet, by task_id."""
+        return self._held or {}
+
+    @contextmanager
+    def batch(self):
+        """
+        Hold back the appends made inside the block and write them in one
+        transaction at the end. Planner queries see them immediately; nested
+        blocks join the outermost one.
+        """
+        if self._held is not None:
+            yield self
+            return
+        self._held = {}
+        try:
+            yield self
+        finally:
+            try:
+                self.write_pending()
+            finally:
+                self._held = None
+
+    def write_pending(self) -> None:
+        """Write the tasks held back by batch() now, in one short transaction."""
+        if not self._held:
+            return
+        tasks = list(self._held.values())
+        self._held.clear()
+        self._schedule.clear_pending()
+        self._dedup.clear_pending()
+        self._write(tasks)
+
+    def replace_all(self, tasks: Iterable[Union[Task, Dict[str, Any]]]) -> None:
+        """Replace the whole store content with `tasks`."""
+        self.write_pending()
+        with transaction(self.conn):
+            self.conn.execute("DELETE FROM tasks")
+            self.conn.execute("DELETE FROM task_bands")
+        self._schedule = SqlScheduleIndex(self, self._schedule.tz_name)
+        self.append_many(tasks)
+
+    def compact(self) -> None:
+        """Drop band rows of tasks that left the duplicate window, checkpoint the WAL and VACUUM."""
+        self.write_pending()
+        cutoff = datetime.now().timestamp() - self._dedup.window
+        with transaction(self.conn):
+            self.conn.execute("DELETE FROM task_bands WHERE task_id IN "
+                              "(SELECT task_id FROM tasks WHERE created_ts IS NULL OR created_ts < ?)", (cutoff,))
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+
+    # ---- import / export ----------------------------------------------
+
+    def import_json(self, path: Path) -> int:
+        """Import tasks from a tasks.json file; returns the number imported."""
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        tasks = obj.get("tasks", []) if isinstance(obj, dict) else obj
+        self.append_many(tasks)
+        return len(tasks)
+
+    def export_json(self, path: Path) -> None:
+        """Write the live tasks in the legacy {"tasks": [...]} format."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"tasks": [t.to_dict() for t in self.all_tasks()]}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    # ---- queries -------------------------------------------------------
+
+    def _select(self, where: str = "", params: tuple = (), order: str = "rowid") -> List[Task]:
+        self.write_pending()
+        rows = self.conn.execute(f"SELECT doc FROM tasks {where} ORDER BY {order}", params)
+        return [_load_task(doc) for (doc,) in rows]
+
+    def __len__(self) -> int:
+        self.write_pending()
+        return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def get(self, task_id: str) -> Optional[Task]:
+        if task_id in self.held:
+            return self._held[task_id]
+        row = self.conn.execute("SELECT doc FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return _load_task(row[0]) if row else None
+
+    def all_tasks(self) -> List[Task]:
+        return self._select()
+
+    def by_source(self, source_email_id: str) -> List[Task]:
+        return self._select("WHERE source_email_id = ?", (source_email_id,))
+
+    def by_status(self, status: str, priority: Optional[str] = None) -> List[Task]:
+        if priority is None:
+            return self._select("WHERE status = ?", (status,))
+        return self._select("WHERE status = ? AND priority = ?", (status, priority))
+
+    def due_between(self, start: str, end: str) -> List[Task]:
+        """Tasks whose due ISO string sorts in [start, end)."""
+        return self._select("WHERE due >= ? AND due < ?", (start, end), order="due, rowid")
+
+    def due_on(self, date_key: str) -> List[Task]:
+        """Tasks due on a given YYYY-MM-DD day."""
+        return self.due_between(date_key, date_key + "\uffff")
+
+    def schedule_index(self, tz_name: Optional[str] = None) -> SqlScheduleIndex:
+        """Schedule index over the start_ts/end_ts columns; recomputed if the timezone changes."""
+        if self._schedule.tz_name != tz_name:
+            self.write_pending()
+            index = SqlScheduleIndex(self, tz_name)
+            rows = self.conn.execute("SELECT task_id, due, doc FROM tasks WHERE due IS NOT NULL").fetchall()
+            with transaction(self.conn):
+                self.conn.executemany("UPDATE tasks SET start_ts = ?, end_ts = ? WHERE task_id = ?",
+                                      [(*index.span(due, json.loads(doc).get("end")), tid) for tid, due, doc in rows])
+                _set_meta(self.conn, "schedule_tz", tz_name or "")
+            index._max_len = self.conn.execute("SELECT MAX(end_ts - start_ts) FROM tasks").fetchone()[0] or 0.0
+            self._schedule = index
+        return self._schedule
+
+    def dedup_index(self) -> SqlDuplicateIndex:
+        return self._dedup
+
+
+# ---- memory store ------------------------------------------------------
+
+
+class SqliteMemoryStore(MemoryStore):
+    """
+    MemoryStore persisted to SQLite. Reads are served from the same in-process
+    cache; flush() writes only the pending recent emails and task ids (or the
+    whole document after replace()) in one transaction, so several processes
+    can share the database without overwriting each other's updates.
+    """
+    delta_flush = True
+
+    def __init__(self, path: Path = DB_PATH, flush_interval: Optional[float] = None,
+                 recent_limit: int = RECENT_EMAILS_LIMIT, legacy_path: Optional[Path] = MEMORY_PATH):
+        self.conn = shared_connection(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        super().__init__(path, flush_interval, recent_limit)
+
+    def _load(self) -> None:
+        if _get_meta(self.conn, "memory_initialized") is None:
+            mem = None
+            if self.legacy_path and self.legacy_path.exists():
+                try:
+                    with open(self.legacy_path, "r", encoding="utf-8") as f:
+                        mem = json.load(f)
+                except Exception:
+                    mem = None
+            self.replace(mem if mem is not None else copy.deepcopy(DEFAULT_MEMORY))
+            return
+        mem = {k: json.loads(v) for k, v in self.conn.execute("SELECT key, value FROM memory_kv")}
+        mem["recent_emails"] = [json.loads(doc) for (doc,) in self.conn.execute(
+            "SELECT doc FROM recent_emails ORDER BY seq DESC LIMIT ?", (self.recent_limit,))]
+        mem["tasks_index"] = [tid for (tid,) in self.conn.execute("SELECT task_id FROM tasks_index ORDER BY seq")]
+        self._set(mem)
+
+    def flush(self) -> bool:
+        """Write pending changes in one transaction; returns True if anything was written."""
+        if not self.dirty:
+            return False
+        c = self.conn
+        with transaction(c):
+            if self._rewrite:
+                c.execute("DELETE FROM memory_kv")
+                c.execute("DELETE FROM recent_emails")
+                c.execute("DELETE FROM tasks_index")
+                c.executemany("INSERT INTO memory_kv (key, value) VALUES (?, ?)",
+                              [(k, json.dumps(v, ensure_ascii=False)) for k, v in self.other.items()])
+                emails = list(reversed(self.recent_emails))
+                tasks = self.tasks_index
+            else:
+                emails, tasks = self._pending_emails, self._pending_tasks
+            c.executemany("INSERT INTO recent_emails (doc) VALUES (?)",
+                          [(json.dumps(e, ensure_ascii=False),) for e in emails])
+            c.execute("DELETE FROM recent_emails WHERE seq NOT IN "
+                      "(SELECT seq FROM recent_emails ORDER BY seq DESC LIMIT ?)", (self.recent_limit,))
+            c.executemany("INSERT OR IGNORE INTO tasks_index (task_id) VALUES (?)", [(t,) for t in tasks])
+            _set_meta(c, "memory_initialized", datetime.now().isoformat(timespec="seconds"))
+        self._flushed()
+        return True
+
+    def import_json(self, path: Path) -> None:
+        """Replace the stored memory with a memory.json document."""
+        with open(path, "r", encoding="utf-8") as f:
+            self.replace(json.load(f))
+        self.flush()
+
+    def export_json(self, path: Path) -> None:
+        """Write the stored memory in the memory.json format."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+
+
+class SqliteContactDirectory(ContactDirectory):
+    """
+    ContactDirectory persisted to the contacts table. Lookups are served from
+    the in-process dict; flush() upserts the pending deltas in one transaction.
+    """
+
+    def __init__(self, path: Path = DB_PATH, flush_interval: Optional[float] = None,
+                 legacy_path: Optional[Path] = CONTACTS_PATH):
+        self.conn = shared_connection(path)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        super().__init__(path, flush_interval)
+
+    def _load(self) -> None:
+        if _get_meta(self.conn, "contacts_initialized") is None:
+            legacy = ContactDirectory(self.legacy_path) if self.legacy_path and self.legacy_path.exists() else None
+            self.entries = {}
+            self._pending = dict(legacy.entries) if legacy else {}
+            self.flush()
+        self.entries = {addr: {"name": name, "messages": messages, "sent": sent,
+                               "first_seen": first_seen, "last_seen": last_seen}
+                        for addr, name, messages, sent, first_seen, last_seen in self.conn.execute(
+                            "SELECT address, name, messages, sent, first_seen, last_seen FROM contacts")}
+
+    def flush(self) -> bool:
+        """Add pending changes in one transaction; returns True if anything was written."""
+        initialized = _get_meta(self.conn, "contacts_initialized") is not None
+        if not self._pending and initialized:
+            return False
+        with transaction(self.conn) as c:
+            c.executemany(_UPSERT_CONTACT, [(addr, d["name"], d["messages"], d["sent"], d["first_seen"], d["last_seen"])
+                                            for addr, d in self._pending.items()])
+            if not initialized:
+                _set_meta(c, "contacts_initialized", datetime.now().isoformat(timespec="seconds"))
+        self._flushed()
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import/export the MailSense SQLite store.")
+    parser.add_argument("command", choices=["import", "export", "compact"])
+    parser.add_argument("--db", type=Path, default=None, help="database file (default: storage.sqlite_path)")
+    parser.add_argument("--tasks", type=Path, default=LEGACY_TASKS_PATH)
+    parser.add_argument("--memory", type=Path, default=MEMORY_PATH)
+    cli = parser.parse_args()
+    db = cli.db or db_path()
+    tasks = SqliteTaskStore(db, legacy_dir=None, legacy_path=None)
+    if cli.command == "compact":
+        tasks.compact()
+        print(f"Compacted {db} ({len(tasks)} tasks)")
+    elif cli.command == "import":
+        n = tasks.import_json(cli.tasks) if cli.tasks.exists() else 0
+        memory = SqliteMemoryStore(db, legacy_path=None)
+        if cli.memory.exists():
+            memory.import_json(cli.memory)
+        print(f"Imported {n} tasks from {cli.tasks} and memory from {cli.memory} into {db}")
+    else:
+        tasks.export_json(cli.tasks)
+        SqliteMemoryStore(db, legacy_path=None).export_json(cli.memory)
+        print(f"Exported {len(tasks)} tasks to {cli.tasks} and memory to {cli.memory}")
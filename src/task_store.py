@@ -0,0 +1,419 @@
+"""
+Append-only task store.
+
+Tasks are written as JSON lines into numbered segment files under
+``task_store/`` instead of re-serialising the whole of ``tasks.json`` on every
+``create_task``. The segments are replayed once when the store is opened and an
+in-memory index (by task_id, due date and source_email_id) is kept up to date
+on every append.
+
+Tasks are held in memory as src.records.Task records and written in the
+task_schema.json shape. A later record with the same task_id supersedes an
+earlier one, so updates are appends as well. ``compact()`` rewrites the live tasks into a single segment.
+An existing ``tasks.json`` is imported once, the first time the store is opened
+with no segments on disk. With ``storage.backend: sqlite`` in the project config,
+get_store() returns a SqliteTaskStore (src/sqlite_store.py) instead.
+
+Shared mode (``storage.shared: true``) lets several agent processes use one
+store at once. Each process appends only to its own ``shard-<pid>.jsonl``, and
+reads pick up other processes' appends by tailing their shards from the last
+offset seen (refresh()). Appends and reads hold a shared flock on
+``task_store/.lock``. ``compact()`` holds it exclusively while it merges
+segments and shards into one new segment, so it never drops a concurrent
+append. Readers notice a compaction because the segment list changed, and
+reload.
+
+CLI:
+    python -m src.task_store compact
+    python -m src.task_store import [path/to/tasks.json]
+    python -m src.task_store export [path/to/tasks.json]
+"""
+import os
+import sys
+import json
+import bisect
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+from src.schedule_index import IntervalIndex, build_index
+from src.dedup_index import DuplicateIndex, build_duplicate_index
+from src.records import Task
+from src.config import get_section
+from src.file_lock import FileLock
+
+ROOT = Path(__file__).resolve().parents[1]
+STORE_DIR = ROOT / "task_store"
+LEGACY_TASKS_PATH = ROOT / "tasks.json"
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+SHARD_PREFIX = "shard-"
+LOCK_NAME = ".lock"
+# shared mode: compact on open once this many shard files have piled up
+MAX_SHARDS = 16
+
+
+def _segment_name(n: int) -> str:
+    return f"{SEGMENT_PREFIX}{n:06d}{SEGMENT_SUFFIX}"
+
+
+def _segment_number(p: Path) -> int:
+    return int(p.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+
+class TaskStore:
+    def __init__(self, directory: Path = STORE_DIR, legacy_path: Optional[Path] = LEGACY_TASKS_PATH,
+                 segment_max_bytes: int = SEGMENT_MAX_BYTES, shared: bool = False, max_shards: int = MAX_SHARDS):
+        self.directory = Path(directory)
+        self.legacy_path = Path(legacy_path) if legacy_path else None
+        self.segment_max_bytes = segment_max_bytes
+        self.shared = shared
+        self.max_shards = max_shards
+        self._lock = FileLock(self.directory / LOCK_NAME) if shared else None
+        self._shard = self.directory / f"{SHARD_PREFIX}{os.getpid()}{SEGMENT_SUFFIX}"
+        self._reset()
+        self._active: Optional[Path] = None
+        self._active_size = 0
+        # encoded appends held back by batch()
+        self._batched: Optional[List[bytes]] = None
+        self._open()
+
+    def _reset(self) -> None:
+        self._tasks: Dict[str, Task] = {}
+        # parallel sorted lists: due ISO strings and the task ids they belong to
+        self._due_keys: List[str] = []
+        self._due_ids: List[str] = []
+        self._by_source: Dict[str, List[str]] = {}
+        # interval index over due/end times, built lazily by schedule_index()
+        self._schedule: Optional[IntervalIndex] = None
+        # near-duplicate index over recently created tasks, built lazily by dedup_index()
+        self._dedup: Optional[DuplicateIndex] = None
+        # segment files loaded and bytes replayed per shard file, for refresh()
+        self._segment_names: List[str] = []
+        self._offsets: Dict[str, int] = {}
+
+    def _locked(self, exclusive: bool = False):
+        return self._lock.hold(exclusive) if self._lock is not None else nullcontext()
+
+    # ---- loading -------------------------------------------------------
+
+    def _segments(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"), key=_segment_number)
+
+    def _shards(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(self.directory.glob(f"{SHARD_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    def _replay(self, path: Path, offset: int = 0) -> int:
+        """Index the records in path after `offset`; returns the offset up to which it was consumed."""
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        pos = 0
+        while pos < len(data):
+            nl = data.find(b"\n", pos)
+            end = len(data) if nl < 0 else nl
+            line = data[pos:end].strip()
+            if line:
+                try:
+                    task = Task.from_dict(json.loads(line))
+                except ValueError:
+                    if nl < 0:
+                        # another process is still writing this line; read it next time
+                        break
+                    # torn write at the end of a segment; skip it
+                    pos = end + 1
+                    continue
+                self._index(task)
+            pos = end + 1
+        return offset + min(pos, len(data))
+
+    def _load(self) -> None:
+        self._reset()
+        segments = self._segments()
+        shards = self._shards()
+        if not segments and not shards:
+            if self.legacy_path and self.legacy_path.exists():
+                self.import_json(self.legacy_path)
+            return
+        for seg in segments:
+            self._replay(seg)
+        self._segment_names = [p.name for p in segments]
+        for shard in shards:
+            self._offsets[shard.name] = self._replay(shard)
+        if segments:
+            self._active = segments[-1]
+            self._active_size = self._active.stat().st_size
+
+    def _open(self) -> None:
+        with self._locked(exclusive=True):
+            self._load()
+            if self.shared and len(self._shards()) > self.max_shards:
+                self.compact()
+
+    def refresh(self) -> None:
+        """Shared mode: pick up tasks other processes appended since the last read."""
+        if not self.shared:
+            return
+        with self._locked():
+            if [p.name for p in self._segments()] != self._segment_names:
+                # another process compacted the store
+                self._load()
+                return
+            for shard in self._shards():
+                if shard == self._shard:
+                    continue
+                offset = self._offsets.get(shard.name, 0)
+                if shard.stat().st_size > offset:
+                    self._offsets[shard.name] = self._replay(shard, offset)
+
+    # ---- index maintenance --------------------------------------------
+
+    def _unindex(self, task: Task) -> None:
+        tid = task.task_id
+        due = task.due
+        if due:
+            i = bisect.bisect_left(self._due_keys, due)
+            while i < len(self._due_keys) and self._due_keys[i] == due:
+                if self._due_ids[i] == tid:
+                    del self._due_keys[i]
+                    del self._due_ids[i]
+                    break
+                i += 1
+        src = task.source_email_id
+        if src in self._by_source:
+            ids = self._by_source[src]
+            if tid in ids:
+                ids.remove(tid)
+            if not ids:
+                del self._by_source[src]
+        if self._schedule is not None and due:
+            self._schedule.remove(due, tid)
+        if self._dedup is not None:
+            self._dedup.remove(tid)
+
+    def _index(self, task: Task) -> None:
+        tid = task.task_id
+        if not tid:
+            return
+        old = self._tasks.get(tid)
+        if old is not None:
+            self._unindex(old)
+        self._tasks[tid] = task
+        due = task.due
+        if due:
+            i = bisect.bisect_right(self._due_keys, due)
+            self._due_keys.insert(i, due)
+            self._due_ids.insert(i, tid)
+        src = task.source_email_id
+        if src:
+            self._by_source.setdefault(src, []).append(tid)
+        if self._schedule is not None and due:
+            self._schedule.add(due, task.end, key=tid)
+        if self._dedup is not None:
+            self._dedup.add(task)
+
+    # ---- writes --------------------------------------------------------
+
+    def _next_segment(self) -> Path:
+        segments = self._segments()
+        n = _segment_number(segments[-1]) + 1 if segments else 1
+        return self.directory / _segment_name(n)
+
+    def append(self, task: Union[Task, Dict[str, Any]]) -> None:
+        """Append a task (or a newer version of an existing task)."""
+        self.append_many([task])
+
+    def append_many(self, tasks: List[Union[Task, Dict[str, Any]]]) -> None:
+        """Append several tasks (records or task_schema.json dicts) with a single write."""
+        if not tasks:
+            return
+        tasks = [Task.coerce(t) for t in tasks]
+        data = "".join(json.dumps(t.to_dict(), ensure_ascii=False) + "\n" for t in tasks).encode("utf-8")
+        if self._batched is not None:
+            self._batched.append(data)
+        else:
+            self._write(data)
+        for t in tasks:
+            self._index(t)
+
+    @contextmanager
+    def batch(self):
+        """
+        Hold back the appends made inside the block and write them with one
+        write at the end. They are indexed, and so visible to queries,
+        immediately. Nested blocks join the outermost one.
+        """
+        if self._batched is not None:
+            yield self
+            return
+        self._batched = []
+        try:
+            yield self
+        finally:
+            batched, self._batched = self._batched, None
+            if batched:
+                self._write(b"".join(batched))
+
+    def _write(self, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            if self.shared:
+                target = self._shard
+            else:
+                if self._active is None or self._active_size >= self.segment_max_bytes:
+                    self._active = self._next_segment()
+                    self._active_size = 0
+                target = self._active
+            # one unbuffered write per batch, so readers never see half a batch's lines interleaved
+            with open(target, "ab", buffering=0) as f:
+                f.write(data)
+        if not self.shared:
+            self._active_size += len(data)
+
+    def replace_all(self, tasks: List[Union[Task, Dict[str, Any]]]) -> None:
+        """Replace the whole store content with `tasks` (one new segment)."""
+        with self._locked(exclusive=True):
+            self._reset()
+            for t in tasks:
+                self._index(Task.coerce(t))
+            self._write_compacted()
+
+    def compact(self) -> None:
+        """Rewrite the live tasks (including every shard) into one fresh segment and drop the old files."""
+        with self._locked(exclusive=True):
+            if self.shared:
+                # merge whatever other processes appended up to now
+                self._load()
+            self._write_compacted()
+
+    def _write_compacted(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        old = self._segments() + self._shards()
+        target = self._next_segment()
+        tmp = target.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for t in self._tasks.values():
+                f.write(json.dumps(t.to_dict(), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+        for seg in old:
+            seg.unlink()
+        self._segment_names = [target.name]
+        self._offsets = {}
+        self._active = target
+        self._active_size = target.stat().st_size
+
+    # ---- import / export ----------------------------------------------
+
+    def import_json(self, path: Path) -> int:
+        """Import tasks from a legacy tasks.json file; returns the number imported."""
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        tasks = obj.get("tasks", []) if isinstance(obj, dict) else obj
+        self.append_many(tasks)
+        return len(tasks)
+
+    def export_json(self, path: Path) -> None:
+        """Write the live tasks in the legacy {"tasks": [...]} format."""
+        self.refresh()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"tasks": [t.to_dict() for t in self._tasks.values()]}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    # ---- queries -------------------------------------------------------
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._tasks)
+
+    def get(self, task_id: str) -> Optional[Task]:
+        self.refresh()
+        return self._tasks.get(task_id)
+
+    def all_tasks(self) -> List[Task]:
+        self.refresh()
+        return list(self._tasks.values())
+
+    def by_source(self, source_email_id: str) -> List[Task]:
+        self.refresh()
+        return [self._tasks[t] for t in self._by_source.get(source_email_id, [])]
+
+    def due_between(self, start: str, end: str) -> List[Task]:
+        """Tasks whose due ISO string sorts in [start, end)."""
+        self.refresh()
+        lo = bisect.bisect_left(self._due_keys, start)
+        hi = bisect.bisect_left(self._due_keys, end)
+        return [self._tasks[t] for t in self._due_ids[lo:hi]]
+
+    def schedule_index(self, tz_name: Optional[str] = None) -> IntervalIndex:
+        """Interval index over task times; built once and then kept up to date on append."""
+        self.refresh()
+        if self._schedule is None or self._schedule.tz_name != tz_name:
+            self._schedule = build_index(self._tasks.values(), tz_name)
+        return self._schedule
+
+    def dedup_index(self) -> DuplicateIndex:
+        """Near-duplicate index over tasks created in the detection window; kept up to date on append."""
+        self.refresh()
+        if self._dedup is None:
+            self._dedup = build_duplicate_index(self._tasks.values())
+        return self._dedup
+
+    def due_on(self, date_key: str) -> List[Task]:
+        """Tasks due on a given YYYY-MM-DD day."""
+        return self.due_between(date_key, date_key + "\uffff")
+
+    def by_status(self, status: str, priority: Optional[str] = None) -> List[Task]:
+        self.refresh()
+        return [t for t in self._tasks.values()
+                if t.status == status and (priority is None or t.priority == priority)]
+
+
+_STORE: Optional[TaskStore] = None
+
+
+def get_store() -> TaskStore:
+    """Return the process-wide task store, opening it on first use."""
+    global _STORE
+    if _STORE is None:
+        cfg = get_section("storage")
+        if cfg.get("backend", "files") == "sqlite":
+            from src.sqlite_store import SqliteTaskStore, db_path
+            _STORE = SqliteTaskStore(db_path())
+        else:
+            _STORE = TaskStore(shared=bool(cfg.get("shared", False)),
+                               max_shards=int(cfg.get("max_shards", MAX_SHARDS)))
+    return _STORE
+
+
+def set_store(store: Optional[TaskStore]) -> Optional[TaskStore]:
+    """Replace the process-wide task store (e.g. to point it at another directory); returns the previous one."""
+    global _STORE
+    prev, _STORE = _STORE, store
+    return prev
+
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else "compact"
+    store = get_store()
+    if cmd == "compact":
+        store.compact()
+        print(f"Compacted {len(store)} tasks into {store._active}")
+    elif cmd == "import":
+        p = Path(sys.argv[2]) if len(sys.argv) > 2 else LEGACY_TASKS_PATH
+        print(f"Imported {store.import_json(p)} tasks from {p}")
+    elif cmd == "export":
+        p = Path(sys.argv[2]) if len(sys.argv) > 2 else LEGACY_TASKS_PATH
+        store.export_json(p)
+        print(f"Exported {len(store)} tasks to {p}")
+    else:
+        print(f"Unknown command {cmd}; use compact, import or export.")
@@ -0,0 +1,127 @@
+"""
+Batched tool dispatch.
+
+A ToolBatch collects tool calls, groups them by tool and runs each group
+through one bulk implementation. For example, every task the batch creates
+goes to the task store in a single append. Results come back in the order the
+calls were added, in the same shape execute_tool_call gives for one call.
+
+Bulk implementations take a list of (args, source_email) pairs and return one
+result per pair:
+
+  create_task     tools.create_tasks_bulk
+  schedule_event  tools.schedule_events_bulk
+  compose_reply   compose_replies_bulk (one slot finder for the whole batch)
+  notify_user     notify_users_bulk
+
+The refined pipeline dispatches each email's plans as one batch: the next
+email's planning reads the tasks these calls create. It wraps runs of emails in
+TaskStore.batch(), so persistence is still one write per run of emails (see
+agent_main_refined.iter_reports).
+"""
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+from src.tools import create_tasks_bulk, schedule_events_bulk
+from src.free_slots import suggest_slots, format_slot, get_slot_finder
+from src.config import get_section
+
+# emails whose task writes are combined into one store write (config: tool_dispatch.batch_size)
+DISPATCH_BATCH_SIZE = 64
+
+Call = Tuple[Dict[str, Any], Dict[str, Any]]
+BulkTool = Callable[[List[Call]], List[Dict[str, Any]]]
+
+
+def dispatch_batch_size() -> int:
+    return max(1, int(get_section("tool_dispatch").get("batch_size", DISPATCH_BATCH_SIZE)))
+
+
+def _create_tasks(calls: List[Call]) -> List[Dict[str, Any]]:
+    # pass priority if provided (the action record itself is left untouched)
+    return create_tasks_bulk([{"action": args.get("action"), "source_email": source, "priority": args.get("priority")}
+                              for args, source in calls])
+
+
+def _schedule_events(calls: List[Call]) -> List[Dict[str, Any]]:
+    return schedule_events_bulk([{"action": args.get("action"), "source_email": source, "start": args.get("start")}
+                                 for args, source in calls])
+
+
+def compose_replies_bulk(calls: List[Call]) -> List[Dict[str, Any]]:
+    """Reply texts; scheduling replies without a preferred slot offer free slots from one shared SlotFinder."""
+    finder = None
+    results = []
+    for args, _ in calls:
+        action = args.get("action")
+        preferred = args.get("preferred_slot")
+        # craft a simple reply using available contact name
+        name = (action.get("contacts") or [{}])[0].get("name") or "there"
+        if preferred or action.get("type") != "schedule":
+            reply = f"Hi {name}, thanks — could you confirm: {preferred or 'which of these slots works for you?'}"
+            results.append({"status": "ok", "reply_text": reply})
+            continue
+        # offer free slots from the user's working hours around existing scheduled tasks
+        finder = finder or get_slot_finder()
+        slots = suggest_slots(action, finder=finder)
+        options = ", ".join(format_slot(s) for s in slots)
+        reply = f"Hi {name}, thanks — could you confirm which of these slots works for you? {options}".rstrip()
+        results.append({"status": "ok", "reply_text": reply, "suggested_slots": slots})
+    return results
+
+
+def notify_users_bulk(calls: List[Call]) -> List[Dict[str, Any]]:
+    # duplicate of an existing task: point the user at it instead of creating another
+    return [{"status": "ok", "task_id": args.get("task_id"), "message": f"Similar to existing task {args.get('task_id')}"}
+            for args, _ in calls]
+
+
+BULK_TOOLS: Dict[str, BulkTool] = {
+    "create_task": _create_tasks,
+    "schedule_event": _schedule_events,
+    "compose_reply": compose_replies_bulk,
+    "notify_user": notify_users_bulk,
+}
+
+
+class ToolBatch:
+    """Collects tool calls and runs them grouped by tool; `tools` overrides entries of BULK_TOOLS."""
+
+    def __init__(self, tools: Optional[Dict[str, BulkTool]] = None):
+        self.tools = dict(BULK_TOOLS)
+        self.tools.update(tools or {})
+        self._calls: List[Tuple[Optional[str], Call]] = []
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def add(self, tool_call: Optional[Dict[str, Any]], source_email: Dict[str, Any]) -> int:
+        """Queue a call; returns its position in run()'s results."""
+        name = (tool_call or {}).get("name") if tool_call else None
+        self._calls.append((name, ((tool_call or {}).get("args") or {}, source_email)))
+        return len(self._calls) - 1
+
+    def run(self) -> List[Dict[str, Any]]:
+        """Run every queued call (one bulk call per tool) and return their results in queue order."""
+        calls, self._calls = self._calls, []
+        results: List[Optional[Dict[str, Any]]] = [None] * len(calls)
+        groups: Dict[str, List[int]] = {}
+        for i, (name, _) in enumerate(calls):
+            if name is None:
+                results[i] = {"status": "noop", "message": "No tool call provided"}
+            elif name not in self.tools:
+                results[i] = {"status": "error", "message": f"Unknown tool {name}"}
+            else:
+                groups.setdefault(name, []).append(i)
+        for name, positions in groups.items():
+            for i, result in zip(positions, self.tools[name]([calls[i][1] for i in positions])):
+                results[i] = result
+        return results
+
+
+def dispatch(tool_calls: List[Optional[Dict[str, Any]]], source_emails: List[Dict[str, Any]],
+             tools: Optional[Dict[str, BulkTool]] = None) -> List[Dict[str, Any]]:
+    """Run tool_calls[i] for source_emails[i] as one batch; results in the same order."""
+    batch = ToolBatch(tools)
+    for call, source in zip(tool_calls, source_emails):
+        batch.add(call, source)
+    return batch.run()
@@ -1,31 +1,26 @@
 # src/tools.py
 import re
-import json
 import uuid
-from pathlib import Path
+from itertools import islice
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
-import dateparser.search
-from dateparser import parse as parse_date
+from src.memory import add_task_index  # relative import from package layout
+from src.task_store import get_store
+from src.date_extract import extract_dates
+from src.extract_cache import get_extract_cache
+from src.keywords import scan as scan_keywords
+from src.tools_enhanced import polite_name_from_email
+from src.large_body import body_config, is_large, iter_sentences, scan_window, clip
+from src.observability import timer
+from src.records import Action, Contact, Task
 
-from src.memory import add_task_index, add_recent_email  # relative import from package layout
-
-ROOT = Path(__file__).resolve().parents[1]
-TASKS_PATH = ROOT / "tasks.json"
-
-
-def _ensure_tasks_file():
-    if not TASKS_PATH.exists():
-        TASKS_PATH.write_text(json.dumps({"tasks": []}, indent=2, ensure_ascii=False))
+_EMAIL_RE = re.compile(r'[\w\.-]+@[\w\.-]+\.\w+')
 
 
 def summarise_by_sentences(text: str, max_sentences: int = 2) -> str:
-    # naive sentence splitter
-    parts = re.split(r'(?<=[.!?])\s+', text.strip())
-    if not parts:
-        return text.strip()
-    return " ".join(parts[:max_sentences])
+    # naive sentence splitter; stops after max_sentences instead of splitting the whole text
+    return " ".join(islice(iter_sentences(text.strip()), max_sentences))
 
 
 def summarize_email(subject: str, body: str) -> Dict[str, Any]:
@@ -35,8 +30,13 @@ def summarize_email(subject: str, body: str) -> Dict[str, Any]:
     # prioritize subject, then first two sentences of body
     subject = subject.strip() if subject else ""
     body = body.strip() if body else ""
-    if subject and len(subject) < 80 and ("request" in subject.lower() or "inv" in subject.lower() or "meeting" in subject.lower()):
+    if subject and len(subject) < 80 and scan_keywords(subject).has("summary.subject"):
         summary_text = subject
+    elif is_large(body):
+        # large body: sentences from the head window only, summary length capped
+        cfg = body_config()
+        summary_text = clip((subject + ". " if subject else "") +
+                            summarise_by_sentences(body[:cfg["head_chars"]], max_sentences=2), cfg["summary_chars"])
     else:
         # combine subject + first sentences of body
         summary_text = (subject + ". " if subject else "") + summarise_by_sentences(body, max_sentences=2)
@@ -44,44 +44,53 @@ def summarize_email(subject: str, body: str) -> Dict[str, Any]:
 
 
 def _detect_type_and_priority(text: str) -> (str, Optional[str]):
-    txt = text.lower()
-    if any(k in txt for k in ["invoice", "due", "payment", "amount", "invoice#"]):
+    # one pass over the text for every table (src/keywords.py)
+    hits = scan_keywords(text)
+    if hits.has("type.invoice"):
         return "invoice", "high"
-    if any(k in txt for k in ["schedule", "meet", "meeting", "call", "available", "free", "book"]):
+    if hits.has("type.schedule"):
         return "schedule", None
-    if any(k in txt for k in ["please", "kindly", "request", "could you", "can you", "send"]):
+    if hits.has("type.task"):
         return "task", None
-    if any(k in txt for k in ["forward", "delegate", "cc:", "please assign"]):
+    if hits.has("type.delegate"):
         return "delegate", None
     return "info", None
 
 
-def _extract_contact_candidates(text: str) -> List[Dict[str, str]]:
-    # very naive email extraction and name heuristics
-    emails = re.findall(r'[\w\.-]+@[\w\.-]+\.\w+', text)
-    contacts = []
-    for e in emails:
-        name_part = e.split("@")[0].replace(".", " ").replace("_", " ")
-        contacts.append({"name": name_part.title(), "email": e})
-    return contacts
+def _extract_contact_candidates(text: str, limit: Optional[int] = None) -> List[Contact]:
+    # very naive email extraction; names are guessed from the local part (cached per address)
+    # and replaced by display names from the contact directory at commit time (src/contacts.py)
+    emails = (m.group(0) for m in _EMAIL_RE.finditer(text))
+    return [Contact(polite_name_from_email(e), e) for e in islice(emails, limit)]
 
 
 def extract_actions(subject: str, body: str) -> Dict[str, Any]:
     """
     Return structured actions extracted from subject+body.
+    Actions are src.records.Action records (to_dict() gives the io_schemas.md shape).
+    Repeated content is served from the content-hash cache (src/extract_cache.py)
+    with fresh email/action ids.
     """
-    full = (subject + "\n\n" + body).strip()
-    # find dates using dateparser.search
+    cache = get_extract_cache()
+    if cache is None:
+        return _extract_actions_uncached(subject, body)
+    return cache.get_or_compute(subject, body, _extract_actions_uncached)
+
+
+def _extract_actions_uncached(subject: str, body: str) -> Dict[str, Any]:
+    # very large bodies are read through bounded windows with per-email budgets (src/large_body.py)
+    large = is_large(body)
+    cfg = body_config()
+    full = (subject + "\n\n" + (scan_window(body) if large else body)).strip()
+    # find dates: regex pre-scan + language-restricted dateparser (src/date_extract.py)
     dates_raw = []
     try:
-        search = dateparser.search.search_dates(full, settings={"PREFER_DATES_FROM": "future"})
-        if search:
-            dates_raw = [d[1].isoformat() for d in search]
+        dates_raw = extract_dates(full[:cfg["date_chars"]] if large else full)
     except Exception:
         dates_raw = []
 
     detected_type, priority = _detect_type_and_priority(full)
-    contacts = _extract_contact_candidates(full)
+    contacts = _extract_contact_candidates(full, cfg["max_contacts"] if large else None)
 
     # build a single action for now (simple)
     action_id = "a-" + uuid.uuid4().hex[:8]
@@ -96,71 +105,72 @@ def extract_actions(subject: str, body: str) -> Dict[str, Any]:
     else:
         title = subject if subject else full[:40]
 
-    action = {
-        "id": action_id,
-        "type": detected_type,
-        "title": title,
-        "description": (body[:280] + "...") if len(body) > 280 else body,
-        "dates": dates_raw,
-        "contacts": contacts,
-        "priority": priority,
-        "confidence": 0.9 if detected_type != "info" else 0.4
-    }
-    return {"email_id": "e-" + uuid.uuid4().hex[:8], "summary_text": summarize_email(subject, body)["summary_text"], "actions": [action]}
-
-
-def _read_tasks() -> Dict[str, Any]:
-    _ensure_tasks_file()
-    with open(TASKS_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _write_tasks(obj: Dict[str, Any]) -> None:
-    TASKS_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(TASKS_PATH, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, ensure_ascii=False)
-
-
-def create_task(action: Dict[str, Any], source_email: Dict[str, Any]) -> Dict[str, Any]:
+    action = Action(
+        id=action_id,
+        type=detected_type,
+        title=title,
+        description=(body[:280] + "...") if len(body) > 280 else body,
+        dates=tuple(dates_raw),
+        contacts=tuple(contacts),
+        priority=priority,
+        confidence=0.9 if detected_type != "info" else 0.4,
+    )
+    with timer("summarize"):
+        summary_text = summarize_email(subject, body)["summary_text"]
+    return {"email_id": "e-" + uuid.uuid4().hex[:8], "summary_text": summary_text, "actions": [action]}
+
+
+def create_task(action: Dict[str, Any], source_email: Dict[str, Any],
+                priority: Optional[str] = None, due: Optional[str] = None) -> Dict[str, Any]:
     """
-    Persist a task to tasks.json; return status dict.
-    action: single action dict returned by extract_actions
+    Persist a task to the append-only task store (see src/task_store.py); return status dict.
+    action: single action (Action record or dict) returned by extract_actions
     source_email: the original email object (id, subject, body)
+    priority / due: overrides chosen by the planner; the action itself is never modified
     """
-    _ensure_tasks_file()
-    tasks_obj = _read_tasks()
-    new_task_id = "t-" + uuid.uuid4().hex[:8]
-    now_iso = datetime.now().isoformat()
+    return create_tasks_bulk([{"action": action, "source_email": source_email, "priority": priority, "due": due}])[0]
 
-    # choose due date if available else None
-    due = action.get("dates", [None])[0] if action.get("dates") else None
 
-    new_task = {
-        "task_id": new_task_id,
-        "title": action.get("title"),
-        "description": action.get("description"),
-        "created_at": now_iso,
-        "due": due,
-        "status": "pending",
-        "source_email_id": source_email.get("email_id"),
-        "priority": action.get("priority") or "medium",
-        "tags": [action.get("type")]
-    }
+def create_tasks_bulk(requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    create_task for several {"action", "source_email", "priority"?, "due"?} requests,
+    persisted with one task-store append. Returns one status dict per request, in order.
+    """
+    tasks = [_new_task(r.get("action"), r.get("source_email") or {}, r.get("priority"), r.get("due"))
+             for r in requests]
+    with timer("persistence"):
+        get_store().append_many(tasks)
+        # update memory index
+        for t in tasks:
+            add_task_index(t.task_id)
+    return [{"status": "ok", "task_id": t.task_id, "message": "Task created"} for t in tasks]
 
-    tasks_obj.setdefault("tasks", []).append(new_task)
-    _write_tasks(tasks_obj)
 
-    # update memory index
-    add_task_index(new_task_id)
+def schedule_events_bulk(requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """schedule_event for several {"action", "source_email", "start"} requests: tasks due at their start."""
+    return create_tasks_bulk([{"action": r.get("action"), "source_email": r.get("source_email"),
+                               "due": r.get("start") or None} for r in requests])
 
-    return {"status": "ok", "task_id": new_task_id, "message": "Task created"}
 
+def _new_task(action: Dict[str, Any], source_email: Dict[str, Any],
+              priority: Optional[str] = None, due: Optional[str] = None) -> Task:
+    action = Action.coerce(action)
+    new_task_id = "t-" + uuid.uuid4().hex[:8]
+    now_iso = datetime.now().isoformat()
 
-# small helper to create_task_index since memory.add_task_index imported uses a different name
-def add_task_index(task_id: str) -> None:
-    try:
-        add_task_index  # noqa: F401
-    except Exception:
-        # avoid circular issue if imported badly; call memory function directly
-        from src.memory import add_task_index as _add
-        _add(task_id)
+    # choose due date if available else None
+    if due is None:
+        due = action.dates[0] if action.dates else None
+
+    new_task = Task(
+        task_id=new_task_id,
+        title=action.title,
+        description=action.description,
+        created_at=now_iso,
+        due=due,
+        status="pending",
+        source_email_id=source_email.get("email_id"),
+        priority=priority or action.priority or "medium",
+        tags=(action.type,),
+    )
+    return new_task
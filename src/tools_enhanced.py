@@ -1,7 +1,10 @@
 # src/tools_enhanced.py
 import re
+from functools import lru_cache
 from typing import Optional
 
+from src.keywords import scan as scan_keywords
+
 CURRENCY_RE = re.compile(r'([₹$€£]\s*\d+(?:[,.\d]*)|\d+\s*(?:INR|USD|EUR|GBP))', flags=re.I)
 
 def extract_amounts(text: str):
@@ -11,13 +14,14 @@ def extract_amounts(text: str):
     return CURRENCY_RE.findall(text or "")
 
 def infer_priority_from_text(text: str) -> str:
-    txt = (text or "").lower()
-    if any(k in txt for k in ["urgent", "asap", "immediately", "important", "high priority"]):
+    hits = scan_keywords(text or "")
+    if hits.has("priority.high"):
         return "high"
-    if any(k in txt for k in ["please", "when convenient", "whenever", "low", "minor"]):
+    if hits.has("priority.low"):
         return "low"
     return "medium"
 
+@lru_cache(maxsize=4096)
 def polite_name_from_email(email: str) -> str:
     if not email:
         return ""
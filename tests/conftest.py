@@ -0,0 +1,42 @@
+import re
+import json
+
+import pytest
+
+from src.task_store import TaskStore, set_store
+from src.memory import MemoryStore, set_memory_store
+from src.contacts import ContactDirectory, set_contact_directory
+from src.ledger import ProcessedLedger, set_ledger
+from src.observability import Observer, set_observer
+
+_ID = re.compile(r"[aet]-[0-9a-f]{8,16}")
+
+
+@pytest.fixture
+def stores(tmp_path):
+    """Fresh task store, memory, contacts, ledger and observer under tmp_path; returns a function that resets them."""
+    count = [0]
+    prev = {}
+
+    def reset():
+        count[0] += 1
+        d = tmp_path / f"run{count[0]}"
+        prev.setdefault("store", set_store(TaskStore(d / "task_store", legacy_path=None)))
+        prev.setdefault("memory", set_memory_store(MemoryStore(d / "memory.json")))
+        prev.setdefault("contacts", set_contact_directory(ContactDirectory(d / "contacts.json")))
+        prev.setdefault("ledger", set_ledger(ProcessedLedger(d / "ledger.jsonl")))
+        prev.setdefault("observer", set_observer(Observer(d / "logs" / "agent.log", d / "logs" / "metrics.json")))
+        return d
+
+    reset()
+    yield reset
+    set_store(prev["store"])
+    set_memory_store(prev["memory"])
+    set_contact_directory(prev["contacts"])
+    set_ledger(prev["ledger"])
+    set_observer(prev["observer"])
+
+
+def masked(reports) -> str:
+    """Reports as JSON with generated task/email/action ids masked, for comparing runs."""
+    return _ID.sub("ID", json.dumps(reports, sort_keys=True))
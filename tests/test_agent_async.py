@@ -0,0 +1,54 @@
+import json
+import asyncio
+
+import pytest
+
+from benchmarks.corpus import generate
+from src.agent_main_refined import run_batch
+from src.agent_async import ToolRegistry, iter_reports_async, run_batch_async
+from src.ingest import iter_emails
+from src.task_store import get_store
+from tests.conftest import masked
+
+
+@pytest.fixture
+def repeated_corpus(tmp_path):
+    # 20 distinct emails, each repeated 10 times in a row: later copies must see the earlier copies' tasks
+    path = tmp_path / "repeated.jsonl"
+    with open(path, "w", encoding="utf-8") as f:
+        for i, email in enumerate(generate(20, seed=3)):
+            for k in range(10):
+                f.write(json.dumps(dict(email, id=i * 10 + k)) + "\n")
+    return path
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"extract_concurrency": 16}, {"workers": 4, "extract_concurrency": 16}])
+def test_async_matches_run_batch(stores, repeated_corpus, kwargs):
+    expected = run_batch(repeated_corpus)
+    expected_tasks = len(get_store().all_tasks())
+    stores()
+    got = asyncio.run(run_batch_async(repeated_corpus, **kwargs))
+    assert len(got) == 200
+    assert masked(got) == masked(expected)
+    assert len(get_store().all_tasks()) == expected_tasks
+
+
+def test_unordered_tool_failure_ends_the_stream(stores, repeated_corpus):
+    calls = []
+
+    async def flaky(tool_call, source_email):
+        # the first call fails; every later one never returns
+        calls.append(tool_call["name"])
+        if len(calls) == 1:
+            raise RuntimeError("backend down")
+        await asyncio.Event().wait()
+
+    registry = ToolRegistry(timeout=None)
+    for name in ("create_task", "schedule_event", "compose_reply", "notify_user"):
+        registry.register(name, flaky)
+
+    async def consume():
+        return [r async for r in iter_reports_async(iter_emails(repeated_corpus), registry=registry)]
+
+    with pytest.raises(RuntimeError, match="backend down"):
+        asyncio.run(asyncio.wait_for(consume(), 30))
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from src.dedup_index import DuplicateIndex, jaccard, shingles
+
+
+def _task(tid, title, description):
+    return {"task_id": tid, "title": title, "description": description,
+            "created_at": datetime.now().isoformat(timespec="seconds")}
+
+
+def test_non_latin_words_are_tokenized():
+    assert shingles("Подготовить квартальный отчёт") == {"подготовить квартальный", "квартальный отчёт"}
+    assert len(shingles("准备 季度 报告")) == 2
+
+
+def test_unrelated_non_latin_tasks_do_not_match():
+    index = DuplicateIndex()
+    index.add(_task("t-ru", "Task", "Подготовить квартальный отчёт для совета директоров"))
+    assert index.find("Task", "准备 季度 报告 给 董事会") is None
+    assert index.find("Task", "Подготовить квартальный отчёт для совета директоров")[0] == "t-ru"
+
+
+def test_empty_or_single_word_texts_never_match():
+    assert jaccard(frozenset(), frozenset()) == 0.0
+    assert jaccard(frozenset({"task"}), frozenset({"task"})) == 0.0
+    index = DuplicateIndex()
+    index.add(_task("t-1", "Task", ""))
+    assert index.find("Task", "") is None
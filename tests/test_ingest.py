@@ -0,0 +1,19 @@
+import json
+
+from src.ingest import iter_emails, stable_email_id
+
+
+def test_stable_email_ids_are_scoped_to_their_source(tmp_path):
+    ids = {}
+    for name in ("a.jsonl", "b.jsonl"):
+        path = tmp_path / name
+        path.write_text(json.dumps({"id": 1, "subject": "s", "body": "b"}) + "\n", encoding="utf-8")
+        email = next(iter(iter_emails(path)))
+        ids[name] = stable_email_id(email.email_id, email.source)
+        assert ids[name] == stable_email_id(1, email.source)
+    assert ids["a.jsonl"] != ids["b.jsonl"]
+    assert len(ids["a.jsonl"]) == len("e-") + 16
+
+
+def test_message_ids_ignore_the_source():
+    assert stable_email_id("<m1@example.com>", "/x/a.jsonl") == stable_email_id("<m1@example.com>", "/x/b.jsonl")
@@ -0,0 +1,57 @@
+import json
+
+from src.ingest import iter_emails
+from src.ledger import ProcessedLedger, email_key, iter_incremental
+from src.records import Email
+
+
+def _write(path, emails):
+    with open(path, "w", encoding="utf-8") as f:
+        for e in emails:
+            f.write(json.dumps(e) + "\n")
+    return path
+
+
+def _run(source, ledger, every=2):
+    # one "report" per email, in input order, like iter_reports
+    return [r["id"] for r in iter_incremental(source, iter_emails, lambda emails: ({"id": e.email_id} for e in emails),
+                                              ledger=ledger, checkpoint_every=every)]
+
+
+def test_rerun_skips_processed_emails(stores, tmp_path):
+    source = _write(tmp_path / "a.jsonl", [{"id": i, "subject": f"s{i}", "body": "b"} for i in range(5)])
+    ledger = ProcessedLedger(tmp_path / "ledger.jsonl")
+    assert _run(source, ledger) == [0, 1, 2, 3, 4]
+    assert _run(source, ProcessedLedger(tmp_path / "ledger.jsonl")) == []
+
+
+def test_appended_emails_are_processed_after_resume(stores, tmp_path):
+    emails = [{"id": i, "subject": f"s{i}", "body": "b"} for i in range(6)]
+    source = _write(tmp_path / "a.jsonl", emails[:4])
+    assert _run(source, ProcessedLedger(tmp_path / "ledger.jsonl")) == [0, 1, 2, 3]
+    _write(source, emails)
+    assert _run(source, ProcessedLedger(tmp_path / "ledger.jsonl")) == [4, 5]
+
+
+def test_plain_ids_are_scoped_to_their_source(stores, tmp_path):
+    a = _write(tmp_path / "a.jsonl", [{"id": i, "subject": f"a{i}", "body": "b"} for i in range(3)])
+    b = _write(tmp_path / "b.jsonl", [{"id": i, "subject": f"b{i}", "body": "b"} for i in range(3)])
+    ledger = ProcessedLedger(tmp_path / "ledger.jsonl")
+    assert _run(a, ledger) == [0, 1, 2]
+    assert _run(b, ledger) == [0, 1, 2]
+
+
+def test_message_ids_are_shared_across_sources(stores, tmp_path):
+    mids = [{"id": f"<m{i}@example.com>", "subject": "s", "body": "b"} for i in range(3)]
+    a = _write(tmp_path / "a.jsonl", mids)
+    b = _write(tmp_path / "b.jsonl", mids[1:])
+    ledger = ProcessedLedger(tmp_path / "ledger.jsonl")
+    assert len(_run(a, ledger)) == 3
+    assert _run(b, ledger) == []
+
+
+def test_email_key_without_id_or_source_hashes_content():
+    plain = Email(email_id=7, subject="s", body="b")
+    assert email_key(plain).startswith("sha:")
+    assert email_key(plain, "/x/a.jsonl") != email_key(plain, "/x/b.jsonl")
+    assert email_key(Email(subject="s", body="b")) == email_key(Email(subject="s", body="b"))
@@ -0,0 +1,38 @@
+from src.memory import MemoryStore
+from src.sqlite_store import SqliteMemoryStore
+
+
+def _fill(store, n):
+    for i in range(n):
+        store.add_recent_email({"email_id": f"e-{i}", "subject": f"s{i}"})
+
+
+def test_private_store_keeps_no_deltas(tmp_path):
+    store = MemoryStore(tmp_path / "memory.json", recent_limit=5)
+    _fill(store, 100)
+    assert len(store.recent_emails) == 5
+    assert not store._pending_emails
+    store.flush()
+    assert [e["email_id"] for e in MemoryStore(tmp_path / "memory.json", recent_limit=5).recent_emails] == \
+        ["e-99", "e-98", "e-97", "e-96", "e-95"]
+
+
+def test_shared_stores_merge_bounded_deltas(tmp_path):
+    a = MemoryStore(tmp_path / "memory.json", recent_limit=5, shared=True)
+    b = MemoryStore(tmp_path / "memory.json", recent_limit=5, shared=True)
+    _fill(a, 100)
+    assert len(a._pending_emails) == 5
+    a.flush()
+    b.add_recent_email({"email_id": "e-b"})
+    b.flush()
+    ids = [e["email_id"] for e in MemoryStore(tmp_path / "memory.json", recent_limit=5).recent_emails]
+    assert ids == ["e-b", "e-99", "e-98", "e-97", "e-96"]
+
+
+def test_sqlite_store_keeps_bounded_deltas(tmp_path):
+    store = SqliteMemoryStore(tmp_path / "mailsense.db", recent_limit=5, legacy_path=None)
+    _fill(store, 100)
+    assert len(store._pending_emails) == 5
+    store.flush()
+    ids = [e["email_id"] for e in SqliteMemoryStore(tmp_path / "mailsense.db", recent_limit=5, legacy_path=None).recent_emails]
+    assert ids == ["e-99", "e-98", "e-97", "e-96", "e-95"]
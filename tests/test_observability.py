@@ -0,0 +1,21 @@
+import threading
+
+from src.observability import Observer
+
+
+def test_concurrent_recording_loses_nothing(tmp_path):
+    obs = Observer(tmp_path / "agent.log", tmp_path / "metrics.json", autoflush=False)
+
+    def record():
+        for _ in range(20000):
+            obs.incr("n")
+            with obs.timer("stage"):
+                pass
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert obs.counters["n"] == 80000
+    assert obs.stages["stage"].n == 80000
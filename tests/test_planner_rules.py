@@ -0,0 +1,71 @@
+import pytest
+
+from src import contacts
+from src import planner_refined
+from src.contacts import get_contact_directory
+from src.planner_refined import plan_actions_refined
+from src.planner_rules import plan_batch
+
+SENDER = "Priya <priya@example.com>"
+
+
+def _task(i: int):
+    # no priority field or keywords: the inferred priority is "medium"
+    return {"email_id": f"e-{i}", "actions": [{"id": f"a-{i}", "type": "task", "title": f"Send the slides {i}",
+                                               "description": f"Send the slides for section {i} to the team",
+                                               "dates": [], "contacts": []}]}
+
+
+def _priorities(result):
+    return [p.tool_call["args"].get("priority") for p in result["plans"]]
+
+
+@pytest.fixture
+def frequent_senders(monkeypatch):
+    def enable(n: int):
+        cfg = dict(contacts.contacts_config(), frequent_sender_messages=n)
+        monkeypatch.setattr(contacts, "contacts_config", lambda: cfg)
+        monkeypatch.setattr(planner_refined, "contacts_config", lambda: cfg)
+    return enable
+
+
+def test_frequent_sender_priority_is_off_by_default(stores):
+    for _ in range(10):
+        get_contact_directory().observe(SENDER)
+    assert _priorities(plan_actions_refined(_task(0), sender=SENDER)) == ["medium"]
+
+
+def test_batch_and_per_email_agree_on_frequent_senders(stores, frequent_senders):
+    frequent_senders(3)
+    for _ in range(3):
+        get_contact_directory().observe(SENDER)
+    outs = [_task(i) for i in range(4)]
+    senders = [SENDER, "someone@example.com", None, SENDER]
+    per_email = [plan_actions_refined(o, sender=s) for o, s in zip(outs, senders)]
+    assert [_priorities(r) for r in per_email] == [["high"], ["medium"], ["medium"], ["high"]]
+    assert plan_batch(outs, "refined", senders=senders) == per_email
+
+
+@pytest.mark.parametrize("planner", ["basic", "refined"])
+@pytest.mark.parametrize("sender_messages", [0, 5])
+def test_batch_evaluation_matches_per_action(stores, planner, sender_messages):
+    from benchmarks.corpus import generate
+    from src.agent_main_refined import iter_reports
+    from src.memory import get_memory_store
+    from src.schedule_index import user_timezone
+    from src.task_store import get_store
+    from src.tools import extract_actions
+    from src.planner_rules import PlanContext, RulePlanner
+
+    emails = list(generate(300, seed=5))
+    # earlier mail in the store, so conflicts and duplicates come up
+    for _ in iter_reports(emails[:100]):
+        pass
+    store = get_store()
+    ctx = PlanContext(store.schedule_index(user_timezone(get_memory_store().other)), store.dedup_index(),
+                      sender_messages, 5)
+    actions = [a for e in emails[100:] for a in extract_actions(e["subject"], e["body"])["actions"]]
+    rules = RulePlanner(planner)
+    batch = rules.plan_frame(actions, ctx)
+    assert batch == [rules.plan_one(a, ctx) for a in actions]
+    assert {p.recommendation for p in batch} >= {"create_task", "compose_reply", "notify_user"}
@@ -0,0 +1,29 @@
+import sqlite3
+from datetime import datetime
+
+from src.sqlite_store import SqliteTaskStore
+
+
+def _task(tid, title, due):
+    return {"task_id": tid, "title": title, "description": f"{title} with the finance team",
+            "created_at": datetime.now().isoformat(timespec="seconds"), "due": due, "status": "pending"}
+
+
+def test_batch_holds_no_write_lock_and_queries_see_held_tasks(tmp_path):
+    path = tmp_path / "mailsense.db"
+    store = SqliteTaskStore(path, legacy_dir=None, legacy_path=None)
+    store.append(_task("t-1", "Review the quarterly budget", "2026-11-02T10:00:00"))
+    other = sqlite3.connect(str(path), timeout=0.1, isolation_level=None)
+    with store.batch():
+        store.append(_task("t-2", "Prepare the board slides", "2026-11-03T10:00:00"))
+        # another process can still write while the batch is open
+        other.execute("BEGIN IMMEDIATE")
+        other.execute("COMMIT")
+        assert store.schedule_index().overlaps("2026-11-03T10:30:00")
+        assert store.schedule_index().overlaps("2026-11-02T10:30:00")
+        assert store.dedup_index().find("Prepare the board slides", "Prepare the board slides with the finance team")[0] == "t-2"
+        assert store.get("t-2").title == "Prepare the board slides"
+        assert other.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 1
+    assert other.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 2
+    assert [t.task_id for t in store.all_tasks()] == ["t-1", "t-2"]
+    assert store.dedup_index().find("Prepare the board slides", "Prepare the board slides with the finance team")[0] == "t-2"